@@ -0,0 +1,48 @@
+"""Content-addressed blobs
+
+Revision ID: 5c1d2e7a9b10
+Revises: 392805ee004d
+Create Date: 2026-10-16 09:12:41.118204
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "5c1d2e7a9b10"
+down_revision: Union[str, None] = "392805ee004d"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "blobs",
+        sa.Column("hash", sa.String(length=64), nullable=False),
+        sa.Column("path", sa.String(), nullable=False),
+        sa.Column("size", sa.BigInteger(), nullable=False),
+        sa.Column("ref_count", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint("hash"),
+    )
+    op.add_column(
+        "files", sa.Column("content_hash", sa.String(length=64), nullable=True)
+    )
+    op.create_index(
+        op.f("ix_files_content_hash"), "files", ["content_hash"], unique=False
+    )
+    op.create_foreign_key(
+        "files_content_hash_fkey", "files", "blobs", ["content_hash"], ["hash"]
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint("files_content_hash_fkey", "files", type_="foreignkey")
+    op.drop_index(op.f("ix_files_content_hash"), table_name="files")
+    op.drop_column("files", "content_hash")
+    op.drop_table("blobs")
@@ -0,0 +1,73 @@
+"""Indexes for permission, hierarchy and link lookups
+
+Revision ID: a4e7c3f9d815
+Revises: f3c6d8a1b2e4
+Create Date: 2026-10-17 10:03:51.288460
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "a4e7c3f9d815"
+down_revision: Union[str, None] = "f3c6d8a1b2e4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (name, table, columns, covered columns)
+INDEXES = [
+    (
+        "ix_file_permissions_user_file",
+        "file_permissions",
+        ["user_id", "file_id"],
+        ["role"],
+    ),
+    (
+        "ix_file_permissions_file_role",
+        "file_permissions",
+        ["file_id", "role"],
+        ["user_id"],
+    ),
+    (
+        "ix_folder_permissions_folder_role",
+        "folder_permissions",
+        ["folder_id", "role"],
+        ["user_id"],
+    ),
+    ("ix_files_folder_name", "files", ["folder_id", "name"], []),
+    ("ix_folders_parent_name", "folders", ["parent_id", "name"], []),
+    ("ix_links_user_id", "links", ["user_id"], []),
+    ("ix_links_file_id", "links", ["file_id"], []),
+    ("ix_links_folder_id", "links", ["folder_id"], []),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CREATE INDEX CONCURRENTLY does not lock writes but cannot run inside a
+    # transaction. A build that failed midway leaves an invalid index behind;
+    # drop it and run the migration again.
+    with op.get_context().autocommit_block():
+        for name, table, columns, include in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                postgresql_include=include,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(
+                name,
+                table_name=table,
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
@@ -0,0 +1,57 @@
+"""File versions
+
+Revision ID: b3f9a6d2c417
+Revises: 8e4b7f21c3d5
+Create Date: 2026-10-16 14:05:27.318440
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "b3f9a6d2c417"
+down_revision: Union[str, None] = "8e4b7f21c3d5"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "file_versions",
+        sa.Column("id", sa.UUID(), nullable=False),
+        sa.Column("file_id", sa.UUID(), nullable=False),
+        sa.Column("number", sa.Integer(), nullable=False),
+        sa.Column("content_hash", sa.String(length=64), nullable=True),
+        sa.Column("size", sa.BigInteger(), nullable=False),
+        sa.Column("mime_type", sa.String(length=55), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(["file_id"], ["files.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("file_id", "number", name="uq_file_version_number"),
+    )
+    op.create_index(
+        op.f("ix_file_versions_file_id"), "file_versions", ["file_id"], unique=False
+    )
+    op.create_table(
+        "file_version_chunks",
+        sa.Column("version_id", sa.UUID(), nullable=False),
+        sa.Column("position", sa.Integer(), nullable=False),
+        sa.Column("chunk_hash", sa.String(length=64), nullable=False),
+        sa.Column("size", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["chunk_hash"], ["blobs.hash"]),
+        sa.ForeignKeyConstraint(
+            ["version_id"], ["file_versions.id"], ondelete="CASCADE"
+        ),
+        sa.PrimaryKeyConstraint("version_id", "position"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("file_version_chunks")
+    op.drop_index(op.f("ix_file_versions_file_id"), table_name="file_versions")
+    op.drop_table("file_versions")
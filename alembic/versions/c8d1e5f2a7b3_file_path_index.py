@@ -0,0 +1,41 @@
+"""Index files by stored path
+
+Revision ID: c8d1e5f2a7b3
+Revises: a4e7c3f9d815
+Create Date: 2026-10-18 09:12:37.604512
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c8d1e5f2a7b3"
+down_revision: Union[str, None] = "a4e7c3f9d815"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Built concurrently, see a4e7c3f9d815.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_files_file",
+            "files",
+            ["file"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_files_file",
+            table_name="files",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
@@ -0,0 +1,49 @@
+"""User storage usage
+
+Revision ID: d7a2c9e41f60
+Revises: b3f9a6d2c417
+Create Date: 2026-10-16 22:10:41.502113
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "d7a2c9e41f60"
+down_revision: Union[str, None] = "b3f9a6d2c417"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "user_usage",
+        sa.Column("user_id", sa.UUID(), nullable=False),
+        sa.Column("used_bytes", sa.BigInteger(), nullable=False),
+        sa.Column("file_count", sa.Integer(), nullable=False),
+        sa.Column("quota_bytes", sa.BigInteger(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("user_id"),
+    )
+    # Backfill from the files each user owns.
+    op.execute(
+        """
+        INSERT INTO user_usage (user_id, used_bytes, file_count, updated_at)
+        SELECT file_permissions.user_id, COALESCE(SUM(files.size), 0),
+               COUNT(files.id), CURRENT_TIMESTAMP
+        FROM files
+        JOIN file_permissions ON file_permissions.file_id = files.id
+        WHERE file_permissions.role = 'owner'
+        GROUP BY file_permissions.user_id
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("user_usage")
@@ -0,0 +1,51 @@
+"""Materialized folder paths
+
+Revision ID: f3c6d8a1b2e4
+Revises: e5b81f3a7c92
+Create Date: 2026-10-17 09:12:37.604218
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "f3c6d8a1b2e4"
+down_revision: Union[str, None] = "e5b81f3a7c92"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("folders", sa.Column("path", sa.Text(), nullable=True))
+    # Backfill from the parent links, root folders first.
+    op.execute(
+        """
+        WITH RECURSIVE tree (id, path) AS (
+            SELECT id, CAST(id AS TEXT) || '/'
+            FROM folders
+            WHERE parent_id IS NULL
+            UNION ALL
+            SELECT folders.id, tree.path || CAST(folders.id AS TEXT) || '/'
+            FROM folders
+            JOIN tree ON folders.parent_id = tree.id
+        )
+        UPDATE folders SET path = tree.path FROM tree WHERE folders.id = tree.id
+        """
+    )
+    op.alter_column("folders", "path", nullable=False)
+    op.create_index(
+        "ix_folders_path",
+        "folders",
+        ["path"],
+        postgresql_ops={"path": "text_pattern_ops"},
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_folders_path", table_name="folders")
+    op.drop_column("folders", "path")
@@ -1,11 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.schemas.auth import Token, TokenData, TokenRequest, RefreshTokenRequest
-from app.database import get_db
-from app.models.user import User
+from app.database import get_async_db, get_db
+from app.services.user import authenticate_user_async
 from app.core.auth import (
     get_current_user,
-    verify_hash,
     create_access_token,
     create_refresh_token,
     decode_refresh_token,
@@ -15,9 +15,11 @@ router = APIRouter()
 
 
 @router.post("/token", response_model=Token)
-async def login_for_acces_token(data: TokenRequest, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == data.email).first()
-    if not user or not verify_hash(data.password, user.password):  # type: ignore
+async def login_for_acces_token(
+    data: TokenRequest, db: AsyncSession = Depends(get_async_db)
+):
+    user = await authenticate_user_async(data.email, data.password, db)
+    if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid credentials",
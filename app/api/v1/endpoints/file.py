@@ -1,44 +1,303 @@
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi.responses import FileResponse, StreamingResponse
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.services.file import get_user_file, generate_thumbnail
+from app.services.file import (
+    check_folder_access,
+    create_file,
+    file_extension,
+    get_user_file_meta_async,
+    list_user_files,
+)
+from app.services.folder import get_folder_archive, list_folders
+from app.services.storage import BlobTooLarge, store_stream
+from app.services.usage import check_quota, remaining_quota
+from app.services.version import (
+    add_file_version,
+    check_version_upload,
+    get_file_version,
+    get_file_versions,
+    iter_version_content,
+)
+from app.services.thumbnail import (
+    DEFAULT_FORMAT,
+    DEFAULT_SIZE,
+    THUMBNAIL_FORMATS,
+    THUMBNAIL_SIZES,
+    ensure_image_metadata,
+    is_thumbnailable,
+)
 from app.schemas.auth import TokenData
+from app.schemas.file import CreateFile, FileOut, FileVersionOut
+from app.schemas.folder import FolderItemOut
+from app.schemas.pagination import Page
 from app.core.auth import get_current_user
-from app.database import get_db
+from app.database import get_async_read_db, get_db, get_read_db
+from app.utils.http import (
+    content_etag,
+    declared_length,
+    file_response,
+    thumbnail_response,
+    zip_response,
+)
+from app.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, SortKey
 from uuid import UUID
 
 router = APIRouter()
 
+ERROR_STATUS = {
+    "NOT_FOUND": status.HTTP_404_NOT_FOUND,
+    "PERMISSION_DENIED": status.HTTP_403_FORBIDDEN,
+    "FILE_EXISTS": status.HTTP_409_CONFLICT,
+    "QUOTA_EXCEEDED": status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+    "INVALID_SORT": status.HTTP_400_BAD_REQUEST,
+    "INVALID_CURSOR": status.HTTP_400_BAD_REQUEST,
+}
+
+
+def _raise_for_error(error: str):
+    raise HTTPException(
+        status_code=ERROR_STATUS.get(error, status.HTTP_500_INTERNAL_SERVER_ERROR),
+        detail=error,
+    )
+
+
+def _check_upload(db: Session, user_id: UUID, folder_id: Optional[UUID], size: int):
+    """Returns (remaining_quota, error_code) for an upload of ``size`` bytes."""
+    error = check_folder_access(db, user_id, folder_id) or check_quota(
+        db, user_id, size
+    )
+    return remaining_quota(db, user_id), error
+
+
+@router.post("/upload", response_model=FileOut, status_code=status.HTTP_201_CREATED)
+async def upload_file(
+    request: Request,
+    name: str,
+    folder_id: Optional[UUID] = None,
+    current_user: TokenData = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Upload a file by streaming the raw request body into the blob store.
+
+    Unlike the GraphQL ``file.create`` mutation, the body is not spooled to a
+    temporary file by Starlette first, so each byte is written to disk once.
+    A ``Content-Length`` over the user's quota is rejected before reading,
+    and a body that grows past it is cut off while streaming.
+    """
+    user_id = UUID(str(current_user.sub))
+    remaining, error = await run_in_threadpool(
+        _check_upload, db, user_id, folder_id, declared_length(request)
+    )
+    if error:
+        _raise_for_error(error)
+
+    try:
+        blob = await store_stream(request.stream(), max_size=remaining)
+    except BlobTooLarge:
+        _raise_for_error("QUOTA_EXCEEDED")
+    file, error = await run_in_threadpool(
+        create_file,
+        db,
+        user_id,
+        CreateFile(
+            name=name,
+            folder_id=folder_id,
+            file=blob.path,
+            mime_type=blob.mime_type,
+            ext=file_extension(name),
+            size=blob.size,
+            content_hash=blob.content_hash,
+        ),
+    )
+    if error:
+        _raise_for_error(error)
+    return file
+
+
+@router.get("", response_model=Page[FileOut])
+def list_files(
+    folder_id: Optional[UUID] = None,
+    sort: SortKey = SortKey.name,
+    descending: bool = False,
+    after: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    current_user: TokenData = Depends(get_current_user),
+    db: Session = Depends(get_read_db),
+):
+    """
+    List the user's files in a folder (the root when ``folder_id`` is
+    omitted), one page at a time. Pass ``next_cursor`` as ``after`` to
+    continue.
+    """
+    page, error = list_user_files(
+        db, UUID(str(current_user.sub)), folder_id, sort, after, limit, descending
+    )
+    if error:
+        _raise_for_error(error)
+    return Page[FileOut].model_validate(page)
+
+
+@router.get("/folders", response_model=Page[FolderItemOut])
+def list_user_folders(
+    parent_id: Optional[UUID] = None,
+    sort: SortKey = SortKey.name,
+    descending: bool = False,
+    after: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    current_user: TokenData = Depends(get_current_user),
+    db: Session = Depends(get_read_db),
+):
+    """
+    List the user's folders under a parent (the root when ``parent_id`` is
+    omitted), one page at a time, with child counts and sizes.
+    """
+    page, error = list_folders(
+        db,
+        UUID(str(current_user.sub)),
+        parent_id,
+        sort,
+        after,
+        limit,
+        descending,
+        summary=True,
+    )
+    if error:
+        _raise_for_error(error)
+    return Page[FolderItemOut].model_validate(page)
+
 
 @router.get("/{id}")
 async def get_file(
     id: UUID,
+    request: Request,
     current_user: TokenData = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_read_db),
 ):
+    """
+    Download a file. Supports ``If-None-Match`` / ``If-Modified-Since``
+    revalidation and single or multi-range ``Range`` requests.
+    """
     user_id = current_user.sub
     if not user_id:
         raise HTTPException(status_code=401, detail="Not authenticated")
-    file, error = get_user_file(
+    file, error = await get_user_file_meta_async(
         db, UUID(user_id) if isinstance(user_id, str) else user_id, id
     )
     if error == "NOT_FOUND":
         raise HTTPException(status_code=404, detail="File not found")
     if error:
         raise HTTPException(status_code=500, detail=error)
-    return FileResponse(file.file, media_type=file.mime_type, filename=file.name)
+    return file_response(request, file)
+
+
+@router.put("/{id}", response_model=FileOut)
+async def upload_file_version(
+    id: UUID,
+    request: Request,
+    current_user: TokenData = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Replace a file's content with the raw request body. The previous content
+    is kept as a version, stored as deduplicated chunks. As with uploads, the
+    owner's quota is checked against ``Content-Length`` before reading and
+    enforced while streaming.
+    """
+    user_id = UUID(str(current_user.sub))
+    max_size, error = await run_in_threadpool(
+        check_version_upload, db, user_id, id, declared_length(request)
+    )
+    if error:
+        _raise_for_error(error)
+
+    try:
+        blob = await store_stream(request.stream(), max_size=max_size)
+    except BlobTooLarge:
+        _raise_for_error("QUOTA_EXCEEDED")
+    file, error = await run_in_threadpool(add_file_version, db, user_id, id, blob)
+    if error:
+        _raise_for_error(error)
+    return file
+
+
+@router.get("/{id}/versions", response_model=List[FileVersionOut])
+def list_file_versions(
+    id: UUID,
+    current_user: TokenData = Depends(get_current_user),
+    db: Session = Depends(get_read_db),
+):
+    """
+    List the versions of a file, newest first. Files that were never
+    replaced have no history.
+    """
+    versions, error = get_file_versions(db, UUID(str(current_user.sub)), id)
+    if error:
+        _raise_for_error(error)
+    return versions
+
+
+@router.get("/{id}/versions/{number}")
+def download_file_version(
+    id: UUID,
+    number: int,
+    current_user: TokenData = Depends(get_current_user),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Download a version of a file, reassembled from its chunks as it streams.
+    """
+    version, error = get_file_version(db, UUID(str(current_user.sub)), id, number)
+    if error:
+        _raise_for_error(error)
+    headers = {"Content-Length": str(version.size)}
+    if version.content_hash:
+        headers["ETag"] = content_etag(version.content_hash)
+    return StreamingResponse(
+        iter_version_content(db, version),
+        media_type=version.mime_type,
+        headers=headers,
+    )
+
+
+@router.get("/folder/{id}/zip")
+def download_folder(
+    id: UUID,
+    current_user: TokenData = Depends(get_current_user),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Download a folder and everything below it as a streamed ZIP archive.
+    """
+    archive, error = get_folder_archive(db, UUID(str(current_user.sub)), id)
+    if error == "NOT_FOUND":
+        raise HTTPException(status_code=404, detail="Folder not found")
+    folder, entries = archive
+    return zip_response(folder.name, entries)
 
 
 @router.get("/t/{id}")
 async def get_thumbnail(
     id: UUID,
+    request: Request,
+    size: str = DEFAULT_SIZE,
+    format: str = DEFAULT_FORMAT,
     current_user: TokenData = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_read_db),
 ):
+    """
+    Serve a thumbnail from the thumbnail store, rendering it on first use.
+    ``size`` is one of the ``THUMBNAIL_SIZES`` presets.
+    """
     user_id = current_user.sub
     if not user_id:
         raise HTTPException(status_code=401, detail="Not authenticated")
-    file, error = get_user_file(
+    if size not in THUMBNAIL_SIZES or format not in THUMBNAIL_FORMATS:
+        raise HTTPException(status_code=400, detail="Unsupported thumbnail preset")
+    file, error = await get_user_file_meta_async(
         db, UUID(user_id) if isinstance(user_id, str) else user_id, id
     )
     if error == "NOT_FOUND":
@@ -46,13 +305,36 @@ async def get_thumbnail(
     if error:
         raise HTTPException(status_code=500, detail=error)
 
-    if not file.mime_type.startswith("image/"):
+    if not is_thumbnailable(file.mime_type):
+        raise HTTPException(status_code=400, detail="File is not an image")
+
+    return await thumbnail_response(request, file, size, format)
+
+
+@router.get("/{id}/metadata")
+async def get_image_metadata(
+    id: UUID,
+    current_user: TokenData = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """
+    Dimensions, format and EXIF of an image, as extracted after upload.
+    """
+    file, error = await get_user_file_meta_async(db, UUID(str(current_user.sub)), id)
+    if error:
+        _raise_for_error(error)
+    if not is_thumbnailable(file.mime_type):
         raise HTTPException(status_code=400, detail="File is not an image")
 
-    thumbnail_io, error = generate_thumbnail(file.file)
+    metadata, error = await ensure_image_metadata(file)
+    if error == "BUSY":
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Image processing queue is full, retry later",
+            headers={"Retry-After": "1"},
+        )
     if error:
         raise HTTPException(
-            status_code=500, detail=f"Thumbnail generation failed: {error}"
+            status_code=500, detail=f"Metadata extraction failed: {error}"
         )
-
-    return StreamingResponse(thumbnail_io, media_type="image/png")
+    return metadata
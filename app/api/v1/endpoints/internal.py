@@ -0,0 +1,36 @@
+import secrets
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+
+from app.core.config import settings
+from app.database import async_engine, engine
+from app.utils.pool import pool_status
+
+# /internal routes for operators and monitoring
+router = APIRouter()
+
+
+def require_internal_token(
+    x_internal_token: Optional[str] = Header(default=None),
+) -> None:
+    if not settings.INTERNAL_API_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    if not x_internal_token or not secrets.compare_digest(
+        x_internal_token, settings.INTERNAL_API_TOKEN
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Invalid internal token"
+        )
+
+
+@router.get("/db/pool", dependencies=[Depends(require_internal_token)])
+def get_pool_stats():
+    """
+    Live connection pool gauges and checkout wait histograms of the sync and
+    async engines.
+    """
+    return {
+        "sync": pool_status(engine),
+        "async": pool_status(async_engine.sync_engine),
+    }
@@ -1,25 +1,31 @@
 from typing import Optional
 from datetime import datetime, timezone
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
 
-from sqlalchemy.orm import Session
-from app.database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload
+from app.database import get_async_read_db, get_read_db
+from app.models.file import File
 from app.models.link import Link
 from app.schemas.file import FileOut
 from app.schemas.folder import FolderOut
+from app.services.folder import folder_archive_entries
+from app.services.link import get_link_async
+from app.services.thumbnail import (
+    DEFAULT_FORMAT,
+    DEFAULT_SIZE,
+    THUMBNAIL_FORMATS,
+    THUMBNAIL_SIZES,
+    is_thumbnailable,
+)
+from app.utils.http import file_response, thumbnail_response, zip_response
 
 # /s routes for shared links
 router = APIRouter()
 
 
-@router.get("/{token}")
-async def read_share(
-    token: str, password: Optional[str] = None, db: Session = Depends(get_db)
-):
-    """
-    Retrieve a share by its token.
-    """
-    link = db.query(Link).filter(Link.token == token).first()
+def _check_link(link: Optional[Link]) -> Link:
     if not link:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -33,7 +39,10 @@ async def read_share(
             status_code=status.HTTP_410_GONE,
             detail="Share has expired",
         )
+    return link
 
+
+def _check_password(link: Link, password: Optional[str]) -> None:
     if link.password:
         if not password or not link.check_password(password):
             raise HTTPException(
@@ -41,6 +50,38 @@ async def read_share(
                 detail="Valid password required to access this share",
             )
 
+
+def _resolve_link(db: Session, token: str, password: Optional[str]) -> Link:
+    link = _check_link(
+        db.query(Link)
+        .options(joinedload(Link.file), joinedload(Link.folder))
+        .filter(Link.token == token)
+        .first()
+    )
+    _check_password(link, password)
+    return link
+
+
+async def _resolve_link_async(
+    db: AsyncSession, token: str, password: Optional[str]
+) -> Link:
+    link = _check_link(await get_link_async(db, token))
+    # Password hashes are checked off the event loop.
+    await run_in_threadpool(_check_password, link, password)
+    return link
+
+
+@router.get("/{token}")
+async def read_share(
+    token: str,
+    password: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """
+    Retrieve a share by its token.
+    """
+    link = await _resolve_link_async(db, token, password)
+
     target = link.file or link.folder
     if not target:
         raise HTTPException(
@@ -48,8 +89,66 @@ async def read_share(
             detail="Target not found for this share",
         )
 
-    return (
-        FileOut.model_validate(target)
-        if link.file
-        else FolderOut.model_validate(target)
-    )
+    if link.file:
+        return FileOut.model_validate(target)
+    # Subfolders are loaded lazily while the tree is serialised.
+    return await db.run_sync(lambda _: FolderOut.model_validate(target))
+
+
+@router.get("/{token}/zip")
+def download_share(
+    token: str, password: Optional[str] = None, db: Session = Depends(get_read_db)
+):
+    """
+    Download a shared folder as a streamed ZIP archive.
+    """
+    link = _resolve_link(db, token, password)
+    if not link.folder:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Shared folder not found",
+        )
+    return zip_response(link.folder.name, folder_archive_entries(db, link.folder))
+
+
+def _shared_file(link: Link) -> File:
+    if not link.file:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Shared file not found",
+        )
+    return link.file
+
+
+@router.get("/{token}/download")
+def download_shared_file(
+    token: str,
+    request: Request,
+    password: Optional[str] = None,
+    db: Session = Depends(get_read_db),
+):
+    """
+    Download a shared file. Supports the same conditional and ``Range``
+    requests as ``/f/{id}``, and proxy offload when ``SENDFILE_HEADER`` is set.
+    """
+    return file_response(request, _shared_file(_resolve_link(db, token, password)))
+
+
+@router.get("/{token}/t")
+async def get_shared_thumbnail(
+    token: str,
+    request: Request,
+    size: str = DEFAULT_SIZE,
+    format: str = DEFAULT_FORMAT,
+    password: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """
+    Serve a thumbnail of a shared image from the thumbnail store.
+    """
+    if size not in THUMBNAIL_SIZES or format not in THUMBNAIL_FORMATS:
+        raise HTTPException(status_code=400, detail="Unsupported thumbnail preset")
+    file = _shared_file(await _resolve_link_async(db, token, password))
+    if not is_thumbnailable(file.mime_type):
+        raise HTTPException(status_code=400, detail="File is not an image")
+    return await thumbnail_response(request, file, size, format)
@@ -0,0 +1,132 @@
+from uuid import UUID
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.core.auth import get_current_user
+from app.database import get_async_db, get_db
+from app.schemas.auth import TokenData
+from app.schemas.file import FileOut
+from app.schemas.upload import UploadSessionCreate, UploadSessionOut
+from app.services.upload import (
+    complete_upload_session,
+    create_upload_session,
+    delete_upload_session,
+    get_upload_session,
+    get_upload_session_async,
+    received_chunks,
+    write_chunk,
+)
+from app.services.usage import check_quota
+
+# /f/uploads routes for resumable chunked uploads
+router = APIRouter()
+
+ERROR_STATUS = {
+    "NOT_FOUND": status.HTTP_404_NOT_FOUND,
+    "PERMISSION_DENIED": status.HTTP_403_FORBIDDEN,
+    "EXPIRED": status.HTTP_410_GONE,
+    "FILE_EXISTS": status.HTTP_409_CONFLICT,
+    "QUOTA_EXCEEDED": status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+    "INCOMPLETE": status.HTTP_409_CONFLICT,
+    "INVALID_CHUNK": status.HTTP_400_BAD_REQUEST,
+    "INVALID_CHUNK_SIZE": status.HTTP_400_BAD_REQUEST,
+}
+
+
+def _raise_for_error(error: str):
+    raise HTTPException(
+        status_code=ERROR_STATUS.get(error, status.HTTP_500_INTERNAL_SERVER_ERROR),
+        detail=error,
+    )
+
+
+def _session_out(upload) -> UploadSessionOut:
+    out = UploadSessionOut.model_validate(upload)
+    out.received = received_chunks(upload)
+    return out
+
+
+def _get_session(db: Session, current_user: TokenData, id: UUID):
+    upload, error = get_upload_session(db, UUID(str(current_user.sub)), id)
+    if error:
+        _raise_for_error(error)
+    return upload
+
+
+@router.post("", response_model=UploadSessionOut, status_code=status.HTTP_201_CREATED)
+def create_session(
+    data: UploadSessionCreate,
+    current_user: TokenData = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Open an upload session for a file of ``size`` bytes. The response gives
+    the chunk size and number of chunks the client must send.
+    """
+    upload, error = create_upload_session(db, UUID(str(current_user.sub)), data)
+    if error:
+        _raise_for_error(error)
+    return _session_out(upload)
+
+
+@router.get("/{id}", response_model=UploadSessionOut)
+def read_session(
+    id: UUID,
+    current_user: TokenData = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Session status. ``received`` lists the indexes of stored chunks; chunk
+    ``i`` covers bytes ``i * chunk_size`` up to the next chunk.
+    """
+    return _session_out(_get_session(db, current_user, id))
+
+
+@router.put("/{id}/{index}", status_code=status.HTTP_204_NO_CONTENT)
+async def upload_chunk(
+    id: UUID,
+    index: int,
+    request: Request,
+    current_user: TokenData = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Store one chunk from the raw request body. Chunks may be sent in parallel.
+    Chunks are refused once the file no longer fits the user's quota.
+    """
+    upload, error = await get_upload_session_async(
+        db, UUID(str(current_user.sub)), id
+    )
+    if error:
+        _raise_for_error(error)
+    error = await db.run_sync(check_quota, upload.user_id, upload.size)
+    if error:
+        _raise_for_error(error)
+    error = await write_chunk(upload, index, request.stream())
+    if error:
+        _raise_for_error(error)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+@router.post("/{id}/complete", response_model=FileOut)
+async def complete_session(
+    id: UUID,
+    current_user: TokenData = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    upload = await run_in_threadpool(_get_session, db, current_user, id)
+    file, error = await complete_upload_session(db, upload)
+    if error:
+        _raise_for_error(error)
+    return file
+
+
+@router.delete("/{id}", status_code=status.HTTP_204_NO_CONTENT)
+def cancel_session(
+    id: UUID,
+    current_user: TokenData = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    delete_upload_session(db, _get_session(db, current_user, id))
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -1,18 +1,27 @@
-from fastapi import APIRouter, Depends
+from uuid import UUID
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.services.user import (
     create_user as create_user_service,
-    get_user_by_sub,
-    change_password as change_password_service,
+    get_user_by_sub_async,
+    change_password_async,
 )
+from app.services.link import list_user_links
+from app.services.usage import get_usage, quota_for
 from app.schemas.user import (
     User as UserSchema,
     UserCreate,
     UserPasswordChange,
+    UserUsageOut,
 )
 from app.schemas.auth import TokenData
+from app.schemas.link import LinkOut
+from app.schemas.pagination import Page
 from app.core.auth import get_current_user
-from app.database import get_db
+from app.database import get_async_db, get_db, get_read_db
+from app.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, SortKey
 
 router = APIRouter()
 
@@ -24,17 +33,56 @@ def create_user(data: UserCreate, db: Session = Depends(get_db)):
 
 @router.get("/me", response_model=UserSchema)
 async def read_users_me(
-    current_user: TokenData = Depends(get_current_user), db: Session = Depends(get_db)
+    current_user: TokenData = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    return get_user_by_sub(str(current_user.sub) if current_user.sub else None, db)
+    return await get_user_by_sub_async(
+        str(current_user.sub) if current_user.sub else None, db
+    )
 
 
 @router.post("/me/change-password")
 async def change_password(
     data: UserPasswordChange,
     current_user: TokenData = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    return change_password_service(
+    return await change_password_async(
         str(current_user.sub) if current_user.sub else None, data, db
     )
+
+
+@router.get("/me/usage", response_model=UserUsageOut)
+def read_usage(
+    current_user: TokenData = Depends(get_current_user), db: Session = Depends(get_db)
+):
+    """
+    Storage used by the files the current user owns, and their quota
+    (null when unlimited).
+    """
+    usage = get_usage(db, UUID(str(current_user.sub)))
+    return UserUsageOut(
+        used_bytes=usage.used_bytes,
+        file_count=usage.file_count,
+        quota_bytes=quota_for(usage),
+    )
+
+
+@router.get("/me/links", response_model=Page[LinkOut])
+def read_links(
+    sort: SortKey = SortKey.created_at,
+    descending: bool = False,
+    after: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    current_user: TokenData = Depends(get_current_user),
+    db: Session = Depends(get_read_db),
+):
+    """
+    The current user's share links, one page at a time.
+    """
+    page, error = list_user_links(
+        db, UUID(str(current_user.sub)), sort, after, limit, descending
+    )
+    if error:
+        raise HTTPException(status_code=400, detail=error)
+    return Page[LinkOut].model_validate(page)
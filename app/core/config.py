@@ -1,3 +1,5 @@
+from typing import Optional
+
 from pydantic_settings import BaseSettings
 
 
@@ -6,6 +8,38 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
 
+    # Connection pool of each engine (sync and async). Connections are
+    # pinged before use and replaced after DB_POOL_RECYCLE seconds.
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    # Postgres statement_timeout for every connection; None leaves it unset.
+    DB_STATEMENT_TIMEOUT_MS: Optional[int] = None
+    # How long a client's reads stay on the primary after it wrote, when
+    # DATABASE_REPLICA_URLS names read replicas.
+    DB_READ_YOUR_WRITES_SECONDS: int = 10
+
+    # Shared secret for /internal endpoints, sent as X-Internal-Token. The
+    # endpoints are disabled while it is unset.
+    INTERNAL_API_TOKEN: Optional[str] = None
+
+    # Root directory of every stored byte: blobs, thumbnails, uploads.
+    # Stored paths start with it, so it cannot change once bytes are stored;
+    # the app refuses to start if blobs.path lies outside it.
+    MEDIA_ROOT: str = "media"
+
+    # Let a fronting proxy send file bodies: "x-accel-redirect" (nginx) or
+    # "x-sendfile" (Apache, lighttpd). Unset, the app sends them itself.
+    SENDFILE_HEADER: Optional[str] = None
+    # Internal location the proxy maps onto MEDIA_ROOT (X-Accel-Redirect only).
+    SENDFILE_PREFIX: str = "/protected/"
+
+    # Bytes each user may own; None is unlimited. Overridable per user in
+    # the user_usage table.
+    STORAGE_QUOTA_BYTES: Optional[int] = None
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
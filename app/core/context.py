@@ -1,8 +1,19 @@
 from fastapi import Request, Depends
+from sqlalchemy.orm import Session
 from app.core.auth import get_current_user_from_request
+from app.database import get_db
 
 
-async def get_context(request: Request, user=Depends(get_current_user_from_request)):
+async def get_context(
+    request: Request,
+    user=Depends(get_current_user_from_request),
+    db: Session = Depends(get_db),
+):
+    """
+    GraphQL context. Every resolver of a request shares ``db``, and with it
+    one identity map. The session only checks out a connection on its first
+    query, and ``get_db`` closes it once the response has been sent.
+    """
     if request and user:
-        return {"request": request, "user": user}
-    return {}
+        return {"request": request, "user": user, "db": db}
+    return {"db": db}
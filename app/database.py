@@ -1,25 +1,223 @@
 import os
-from sqlalchemy import create_engine
-from sqlalchemy.orm import scoped_session, sessionmaker, declarative_base
+import random
+import time
+from typing import Optional
+
+from fastapi import Depends
+from starlette.requests import HTTPConnection
+from sqlalchemy import Select, create_engine
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, scoped_session, sessionmaker, declarative_base
 from dotenv import load_dotenv
 
+from app.core.config import settings
+from app.utils.pool import InstrumentedAsyncQueuePool, InstrumentedQueuePool
+
 load_dotenv()
 
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     raise RuntimeError("DATABASE_URL is missing from the environmental variables")
-engine = create_engine(DATABASE_URL)
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def engine_options(url: str, asyncio: bool = False) -> dict:
+    """
+    Pool and statement timeout settings from ``Settings`` for an engine on
+    ``url``.
+    """
+    url = make_url(url)
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        # In-memory databases live in a single connection.
+        return {}
+    options = {
+        "poolclass": InstrumentedAsyncQueuePool if asyncio else InstrumentedQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+    timeout = settings.DB_STATEMENT_TIMEOUT_MS
+    if timeout is not None and url.get_backend_name() == "postgresql":
+        if asyncio:
+            server_settings = {"statement_timeout": str(timeout)}
+            options["connect_args"] = {"server_settings": server_settings}
+        else:
+            options["connect_args"] = {"options": f"-c statement_timeout={timeout}"}
+    return options
+
+
+# Dialects whose INSERT supports ON CONFLICT, by dialect name.
+UPSERT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+# Comma separated read replicas of DATABASE_URL.
+DATABASE_REPLICA_URLS = [
+    url.strip()
+    for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",")
+    if url.strip()
+]
+
+# Set on responses to requests that wrote; while it lasts the client's reads
+# go to the primary, so it sees its own writes despite replication lag.
+READ_PRIMARY_COOKIE = "db_read_primary"
+
+# Authenticated users who wrote recently, by id, mapped to when their reads
+# may leave the primary again. Covers API clients that drop cookies; the map
+# is per process, so the cookie still matters behind several workers.
+_recent_writers: dict[str, float] = {}
+# Expired entries are swept once the map grows past this many users.
+RECENT_WRITERS_SWEEP_SIZE = 10_000
+
+
+def _is_plain_read(clause) -> bool:
+    return isinstance(clause, Select) and clause._for_update_arg is None
+
+
+class RoutingSession(Session):
+    """
+    A session over a primary engine and its read replicas. While
+    ``info["read_only"]`` is set, plain SELECTs go to one replica, picked at
+    random per session so its reads see a single consistent copy.
+    Flushes, DML and locking reads go to the primary, and once the session
+    has written, so does everything after it.
+    """
+
+    def __init__(self, *args, replicas=(), **kw):
+        super().__init__(*args, **kw)
+        self.replicas = list(replicas)
+        self.replica = random.choice(self.replicas) if self.replicas else None
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if not self._flushing and _is_plain_read(clause):
+            if (
+                self.replicas
+                and self.info.get("read_only")
+                and not self.info.get("wrote")
+            ):
+                return self.replica
+        else:
+            self._mark_written()
+        return super().get_bind(mapper=mapper, clause=clause, **kw)
+
+    def _mark_written(self) -> None:
+        if self.info.get("wrote"):
+            return
+        self.info["wrote"] = True
+        request: Optional[HTTPConnection] = self.info.get("request")
+        if request is not None:
+            request.state.db_wrote = True
+
+
+def remember_writer(user_id: str) -> None:
+    """Keep ``user_id``'s reads on the primary for ``DB_READ_YOUR_WRITES_SECONDS``."""
+    now = time.monotonic()
+    if len(_recent_writers) > RECENT_WRITERS_SWEEP_SIZE:
+        for writer, until in list(_recent_writers.items()):
+            if until <= now:
+                _recent_writers.pop(writer, None)
+    _recent_writers[user_id] = now + settings.DB_READ_YOUR_WRITES_SECONDS
+
+
+def wrote_recently(request: Optional[HTTPConnection]) -> bool:
+    """
+    Whether the client behind ``request`` wrote recently: it sends the
+    cookie, or the user it authenticated as (``request.state.user_id``)
+    wrote through this process.
+    """
+    if request is None:
+        return False
+    if READ_PRIMARY_COOKIE in request.cookies:
+        return True
+    user_id = getattr(request.state, "user_id", None)
+    return user_id is not None and _recent_writers.get(user_id, 0) > time.monotonic()
+
+
+def use_replicas(db) -> None:
+    """
+    Route the reads of ``db`` to replicas, unless its request comes from a
+    client that wrote within the last ``DB_READ_YOUR_WRITES_SECONDS``.
+    """
+    if not wrote_recently(db.info.get("request")):
+        db.info["read_only"] = True
+
+
+engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL))
+replica_engines = [
+    create_engine(url, **engine_options(url)) for url in DATABASE_REPLICA_URLS
+]
+
+SessionLocal = sessionmaker(
+    autocommit=False,
+    autoflush=False,
+    bind=engine,
+    class_=RoutingSession,
+    replicas=replica_engines,
+)
 db_session = scoped_session(SessionLocal)
 
+# asyncio drivers for the sync drivers DATABASE_URL may name.
+ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+
+def async_database_url(url: str) -> str:
+    """Point ``url`` at the asyncio driver of its backend."""
+    url = make_url(url)
+    driver = ASYNC_DRIVERS.get(url.get_backend_name(), url.drivername)
+    return url.set(drivername=driver).render_as_string(hide_password=False)
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or async_database_url(
+    DATABASE_URL
+)
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL, **engine_options(ASYNC_DATABASE_URL, asyncio=True)
+)
+async_replica_engines = [
+    create_async_engine(url, **engine_options(url, asyncio=True))
+    for url in map(async_database_url, DATABASE_REPLICA_URLS)
+]
+
+# Objects stay usable after commit: async code cannot lazy-load expired
+# attributes.
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    autoflush=False,
+    expire_on_commit=False,
+    sync_session_class=RoutingSession,
+    replicas=[replica.sync_engine for replica in async_replica_engines],
+)
+
 Base = declarative_base()
 
 
-def get_db():
+def get_db(request: HTTPConnection):
     db = SessionLocal()
+    db.info["request"] = request
     try:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db(request: HTTPConnection):
+    async with AsyncSessionLocal() as db:
+        db.info["request"] = request
+        yield db
+
+
+def get_read_db(db: Session = Depends(get_db)) -> Session:
+    """``get_db`` for read-only endpoints, which may use a replica."""
+    use_replicas(db)
+    return db
+
+
+async def get_async_read_db(
+    db: AsyncSession = Depends(get_async_db),
+) -> AsyncSession:
+    """``get_async_db`` for read-only endpoints, which may use a replica."""
+    use_replicas(db)
+    return db
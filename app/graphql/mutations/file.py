@@ -1,11 +1,14 @@
+from typing import List
 from uuid import UUID
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.exc import SQLAlchemyError
 import strawberry
 from strawberry.exceptions import StrawberryGraphQLError
 
-from app.database import get_db
 from app.graphql.types import (
     FileType,
+    FileBatchInput,
+    FileBatchResult,
     FileCopyInput,
     FileMoveInput,
     FileUpdateInput,
@@ -16,13 +19,17 @@ from pydantic import ValidationError
 from app.schemas.file import UpdateFile, CreateFile
 from app.services.file import (
     create_file,
+    create_files,
     get_user_file,
     update_file,
     save_uploaded_file,
+    save_uploaded_files,
 )
 from app.services.folder import get_folder
 from app.services.copy import CopyService
-from app.services.move import move_files
+from app.services.move import bulk_move_files
+from app.services.storage import BlobTooLarge
+from app.services.usage import remaining_quota
 
 
 @strawberry.type
@@ -30,9 +37,16 @@ class FileMutations:
     @strawberry.mutation
     async def create(self, info: strawberry.Info, input: FileInput) -> FileType:
         user = info.context.get("user")
-        db = next(get_db())
+        db = info.context["db"]
+        remaining = await run_in_threadpool(remaining_quota, db, UUID(user.sub))
         try:
-            file_path, mime_type, extension, size = await save_uploaded_file(input.file)
+            (
+                file_path,
+                mime_type,
+                extension,
+                size,
+                content_hash,
+            ) = await save_uploaded_file(input.file, remaining)
             data = CreateFile(
                 name=input.name,
                 folder_id=input.folder_id,
@@ -40,12 +54,18 @@ class FileMutations:
                 mime_type=mime_type,
                 ext=extension,
                 size=size,
+                content_hash=content_hash,
             )
         except ValidationError as exc:
             raise StrawberryGraphQLError(
                 "Invalid input data for file creation",
                 extensions={"code": "INVALID_INPUT"},
             ) from exc
+        except BlobTooLarge as exc:
+            raise StrawberryGraphQLError(
+                "File does not fit the storage quota",
+                extensions={"code": "QUOTA_EXCEEDED"},
+            ) from exc
         except Exception as exc:
             raise StrawberryGraphQLError(
                 f"Failed to save uploaded file: {exc}",
@@ -53,7 +73,9 @@ class FileMutations:
             ) from exc
 
         try:
-            file, error = create_file(db, UUID(user.sub), data)
+            file, error = await run_in_threadpool(
+                create_file, db, UUID(user.sub), data
+            )
             if error:
                 raise StrawberryGraphQLError(
                     message="Could not create file", extensions={"code": error}
@@ -65,8 +87,53 @@ class FileMutations:
                 "Database error occurred while creating file",
                 extensions={"code": "INTERNAL_ERROR"},
             )
-        finally:
-            db.close()
+
+    @strawberry.mutation
+    async def create_batch(
+        self, info: strawberry.Info, input: FileBatchInput
+    ) -> List[FileBatchResult]:
+        """
+        Upload many files into one folder. Files are stored concurrently and
+        created in a single transaction; failures are reported per file.
+        """
+        user = info.context.get("user")
+        db = info.context["db"]
+        remaining = await run_in_threadpool(remaining_quota, db, UUID(user.sub))
+        saved = await save_uploaded_files(
+            [item.file for item in input.files], max_size=remaining
+        )
+        data = []
+        for item, result in zip(input.files, saved):
+            if isinstance(result, BaseException):
+                data.append(None)
+                continue
+            file_path, mime_type, extension, size, content_hash = result
+            try:
+                data.append(
+                    CreateFile(
+                        name=item.name,
+                        folder_id=input.folder_id,
+                        file=file_path,
+                        mime_type=mime_type,
+                        ext=extension,
+                        size=size,
+                        content_hash=content_hash,
+                    )
+                )
+            except ValidationError:
+                data.append(None)
+
+        results, error = await run_in_threadpool(
+            create_files, db, UUID(user.sub), input.folder_id, data
+        )
+        if error:
+            raise StrawberryGraphQLError(
+                message="Could not create files", extensions={"code": error}
+            )
+        return [
+            FileBatchResult(name=item.name, file=file, error=error)
+            for item, (file, error) in zip(input.files, results)
+        ]
 
     @strawberry.mutation
     def update(
@@ -80,7 +147,7 @@ class FileMutations:
                 "Invalid input data for file update",
                 extensions={"code": "INVALID_INPUT"},
             ) from exc
-        db = next(get_db())
+        db = info.context["db"]
         try:
             file, error = update_file(
                 db, UUID(user.sub), id, name=data.name, starred=data.starred
@@ -96,13 +163,11 @@ class FileMutations:
                 "Database error occurred while updating file",
                 extensions={"code": "INTERNAL_ERROR"},
             )
-        finally:
-            db.close()
 
     @strawberry.mutation
     def copy(self, info: strawberry.Info, input: FileCopyInput) -> FileCopyResponse:
         user = info.context.get("user")
-        db = next(get_db())
+        db = info.context["db"]
         try:
             copied_files = []
             destination_folder = get_folder(
@@ -142,50 +207,28 @@ class FileMutations:
                 "Database error occurred while copying file",
                 extensions={"code": "INTERNAL_ERROR"},
             )
-        finally:
-            db.close()
 
     @strawberry.mutation
     def move(self, info: strawberry.Info, input: FileMoveInput) -> FileCopyResponse:
         user = info.context.get("user")
-        db = next(get_db())
+        db = info.context["db"]
         try:
-            source_files = []
-            for source_id in input.source_ids:
-                source_file, error = get_user_file(db, UUID(user.sub), source_id)
-                if error:
-                    raise StrawberryGraphQLError(
-                        f"Source file with id {source_id} not found",
-                        extensions={"code": "NOT_FOUND"},
-                    )
-                source_files.append(source_file)
-
-            destination_folder = get_folder(
-                db, UUID(user.sub), input.destination_folder_id
+            moved_files, error = bulk_move_files(
+                db,
+                UUID(user.sub),
+                input.source_ids,
+                input.destination_folder_id,
+                on_conflict=input.on_conflict,
             )
-            if not destination_folder:
+            if error:
                 raise StrawberryGraphQLError(
-                    "Destination folder not found", extensions={"code": "NOT_FOUND"}
+                    message="Could not move files", extensions={"code": error}
                 )
-
-            moved_files = move_files(
-                db,
-                source_files=source_files,
-                destination_folder=destination_folder,
-                user=user,
-            )
             db.commit()
             return FileCopyResponse(files=moved_files)
-        except (PermissionError, ValueError) as e:
-            db.rollback()
-            raise StrawberryGraphQLError(
-                str(e), extensions={"code": "PERMISSION_DENIED"}
-            )
         except SQLAlchemyError:
             db.rollback()
             raise StrawberryGraphQLError(
                 "Database error occurred while moving file",
                 extensions={"code": "INTERNAL_ERROR"},
             )
-        finally:
-            db.close()
@@ -4,7 +4,6 @@ from sqlalchemy.exc import SQLAlchemyError
 import strawberry
 from strawberry.exceptions import StrawberryGraphQLError
 
-from app.database import get_db
 from app.schemas.folder import FolderCreate, FolderUpdate
 from app.graphql.types import (
     FolderCreationInput,
@@ -17,7 +16,7 @@ from app.graphql.types import (
 )
 from app.services.folder import create_folder, update_folder, delete_folder, get_folder
 from app.services.copy import CopyService
-from app.services.move import move_folders
+from app.services.move import bulk_move_folders
 
 
 @strawberry.type
@@ -32,7 +31,7 @@ class FolderMutations:
                 "Invalid input data", extensions={"code": "INVALID_INPUT"}
             ) from exc
 
-        db = next(get_db())
+        db = info.context["db"]
         try:
             folder, error = create_folder(
                 db=db, folder_data=data, user_id=UUID(user.sub)
@@ -48,8 +47,6 @@ class FolderMutations:
                 "Database error occurred while creating folder",
                 extensions={"code": "INTERNAL_ERROR"},
             )
-        finally:
-            db.close()
 
     @strawberry.mutation
     def update(
@@ -63,7 +60,7 @@ class FolderMutations:
                 "Invalid input data for folder update",
                 extensions={"code": "INVALID_INPUT"},
             ) from exc
-        db = next(get_db())
+        db = info.context["db"]
         try:
             folder, error = update_folder(db, UUID(user.sub), data)
             if error:
@@ -77,8 +74,6 @@ class FolderMutations:
                 "Database error occurred while updating folder",
                 extensions={"code": "INTERNAL_ERROR"},
             )
-        finally:
-            db.close()
 
     @strawberry.mutation
     def delete(
@@ -87,7 +82,7 @@ class FolderMutations:
         id: UUID,
     ) -> DeleteResponse:
         user = info.context.get("user")
-        db = next(get_db())
+        db = info.context["db"]
         try:
             success, error = delete_folder(db, UUID(user.sub), id)
             if error:
@@ -101,13 +96,11 @@ class FolderMutations:
                 "Database error occurred while deleting folder",
                 extensions={"code": "INTERNAL_ERROR"},
             )
-        finally:
-            db.close()
 
     @strawberry.mutation
     def copy(self, info: strawberry.Info, input: FolderCopyInput) -> FolderCopyResponse:
         user = info.context.get("user")
-        db = next(get_db())
+        db = info.context["db"]
         try:
             copied_folders = []
             for source_id in input.source_ids:
@@ -150,50 +143,28 @@ class FolderMutations:
                 "Database error occurred while copying folder",
                 extensions={"code": "INTERNAL_ERROR"},
             )
-        finally:
-            db.close()
 
     @strawberry.mutation
     def move(self, info: strawberry.Info, input: FolderMoveInput) -> FolderCopyResponse:
         user = info.context.get("user")
-        db = next(get_db())
+        db = info.context["db"]
         try:
-            source_folders = []
-            for source_id in input.source_ids:
-                source_folder = get_folder(db, UUID(user.sub), source_id)
-                if not source_folder:
-                    raise StrawberryGraphQLError(
-                        f"Source folder with id {source_id} not found",
-                        extensions={"code": "NOT_FOUND"},
-                    )
-                source_folders.append(source_folder)
-
-            destination_folder = get_folder(
-                db, UUID(user.sub), input.destination_folder_id
+            moved_folders, error = bulk_move_folders(
+                db,
+                UUID(user.sub),
+                input.source_ids,
+                input.destination_folder_id,
+                on_conflict=input.on_conflict,
             )
-            if not destination_folder:
+            if error:
                 raise StrawberryGraphQLError(
-                    "Destination folder not found", extensions={"code": "NOT_FOUND"}
+                    message="Could not move folders", extensions={"code": error}
                 )
-
-            moved_folders = move_folders(
-                db,
-                source_folders=source_folders,
-                destination_folder=destination_folder,
-                user=user,
-            )
             db.commit()
             return FolderCopyResponse(folders=moved_folders)
-        except (PermissionError, ValueError) as e:
-            db.rollback()
-            raise StrawberryGraphQLError(
-                str(e), extensions={"code": "PERMISSION_DENIED"}
-            )
         except SQLAlchemyError:
             db.rollback()
             raise StrawberryGraphQLError(
                 "Database error occurred while moving folder",
                 extensions={"code": "INTERNAL_ERROR"},
             )
-        finally:
-            db.close()
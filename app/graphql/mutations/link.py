@@ -5,7 +5,6 @@ from strawberry import Info
 from sqlalchemy.exc import SQLAlchemyError
 from strawberry.exceptions import StrawberryGraphQLError
 
-from app.database import get_db
 from app.graphql.types import LinkInput, LinkType
 from app.schemas.link import LinkCreate
 from app.services.link import create_link
@@ -23,7 +22,7 @@ class LinkMutations:
                 "Invalid input data", extensions={"code": "BAD_INPUT"}
             ) from e
 
-        db = next(get_db())
+        db = info.context["db"]
         try:
             link, error = create_link(db=db, data=data, user_id=UUID(user.sub))
             if error:
@@ -36,5 +35,3 @@ class LinkMutations:
             raise StrawberryGraphQLError(
                 "Internal server error", extensions={"code": "INTERNAL_ERROR"}
             )
-        finally:
-            db.close()
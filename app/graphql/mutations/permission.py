@@ -5,7 +5,6 @@ from sqlalchemy.exc import SQLAlchemyError
 import strawberry
 from strawberry.exceptions import StrawberryGraphQLError
 
-from app.database import get_db
 from app.graphql.types import (
     FilePermissionType,
     FolderPermissionType,
@@ -55,7 +54,7 @@ class FolderPermissionMutations:
                 exc.title, extensions={"code": "BAD_USER_INPUT"}
             ) from exc
 
-        db = next(get_db())
+        db = info.context["db"]
         try:
             permission, error = create_folder_permission(
                 db=db, user_id=UUID(user.sub), data=data
@@ -70,8 +69,6 @@ class FolderPermissionMutations:
             raise StrawberryGraphQLError(
                 "Internal server error", extensions={"code": "INTERNAL_ERROR"}
             )
-        finally:
-            db.close()
 
     @strawberry.mutation
     def update(
@@ -85,7 +82,7 @@ class FolderPermissionMutations:
                 exc.title, extensions={"code": "BAD_USER_INPUT"}
             ) from exc
 
-        db = next(get_db())
+        db = info.context["db"]
         try:
             permission, error = update_folder_permission(
                 db=db, user_id=UUID(user.sub), data=data
@@ -100,13 +97,11 @@ class FolderPermissionMutations:
             raise StrawberryGraphQLError(
                 "Internal server error", extensions={"code": "INTERNAL_ERROR"}
             )
-        finally:
-            db.close()
 
     @strawberry.mutation
     def delete(self, info: strawberry.Info, permission_id: UUID) -> DeleteResponse:
         user = info.context.get("user")
-        db = next(get_db())
+        db = info.context["db"]
         try:
             success, error = delete_folder_permission(
                 db=db, user_id=UUID(user.sub), permission_id=permission_id
@@ -123,8 +118,6 @@ class FolderPermissionMutations:
             raise StrawberryGraphQLError(
                 "Internal server error", extensions={"code": "INTERNAL_ERROR"}
             )
-        finally:
-            db.close()
 
 
 @strawberry.input
@@ -155,7 +148,7 @@ class FilePermissionMutations:
                 exc.title, extensions={"code": "BAD_USER_INPUT"}
             ) from exc
 
-        db = next(get_db())
+        db = info.context["db"]
         try:
             permission, error = create_file_permission(
                 db=db, user_id=UUID(user.sub), data=data
@@ -170,8 +163,6 @@ class FilePermissionMutations:
             raise StrawberryGraphQLError(
                 "Internal server error", extensions={"code": "INTERNAL_ERROR"}
             )
-        finally:
-            db.close()
 
     @strawberry.mutation
     def update(
@@ -185,7 +176,7 @@ class FilePermissionMutations:
                 exc.title, extensions={"code": "BAD_USER_INPUT"}
             ) from exc
 
-        db = next(get_db())
+        db = info.context["db"]
         try:
             permission, error = update_file_permission(
                 db=db, user_id=UUID(user.sub), data=data
@@ -200,13 +191,11 @@ class FilePermissionMutations:
             raise StrawberryGraphQLError(
                 "Internal server error", extensions={"code": "INTERNAL_ERROR"}
             )
-        finally:
-            db.close()
 
     @strawberry.mutation
     def delete(self, info: strawberry.Info, permission_id: UUID) -> DeleteResponse:
         user = info.context.get("user")
-        db = next(get_db())
+        db = info.context["db"]
         try:
             success, error = delete_file_permission(
                 db=db, user_id=UUID(user.sub), permission_id=permission_id
@@ -223,5 +212,3 @@ class FilePermissionMutations:
             raise StrawberryGraphQLError(
                 "Internal server error", extensions={"code": "INTERNAL_ERROR"}
             )
-        finally:
-            db.close()
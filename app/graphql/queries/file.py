@@ -5,9 +5,9 @@ import strawberry
 from sqlalchemy.exc import SQLAlchemyError
 from strawberry.exceptions import StrawberryGraphQLError
 
-from app.database import get_db
-from app.graphql.types import FileType
-from app.services.file import get_user_file, get_user_files
+from app.graphql.types import FileType, Page, SortKey
+from app.services.file import get_user_file, get_user_files, list_user_files
+from app.utils.pagination import DEFAULT_PAGE_SIZE
 from sqlalchemy.orm import Session
 
 
@@ -16,7 +16,7 @@ class FileQueries:
     @strawberry.field
     def get(self, info: strawberry.Info, id: UUID) -> Optional[FileType]:
         user = info.context.get("user")
-        db: Session = next(get_db())
+        db: Session = info.context["db"]
         try:
             file_instance, error = get_user_file(db=db, user_id=UUID(user.sub), id=id)
             if error:
@@ -35,15 +35,41 @@ class FileQueries:
                 "Database error occurred while retrieving file",
                 extensions={"code": "INTERNAL_ERROR"},
             )
-        finally:
-            db.close()
 
     @strawberry.field
+    def page(
+        self,
+        info: strawberry.Info,
+        folder_id: Optional[UUID] = None,
+        first: int = DEFAULT_PAGE_SIZE,
+        after: Optional[str] = None,
+        sort: SortKey = SortKey.name,
+        descending: bool = False,
+    ) -> Page[FileType]:
+        user = info.context.get("user")
+        db: Session = info.context["db"]
+        try:
+            result, error = list_user_files(
+                db, UUID(user.sub), folder_id, sort, after, first, descending
+            )
+            if error:
+                raise StrawberryGraphQLError(
+                    message="Invalid page request", extensions={"code": error}
+                )
+            return Page(items=result.items, next_cursor=result.next_cursor)
+        except SQLAlchemyError:
+            db.rollback()
+            raise StrawberryGraphQLError(
+                "Database error occurred while retrieving files",
+                extensions={"code": "INTERNAL_ERROR"},
+            )
+
+    @strawberry.field(deprecation_reason="Unbounded; use page")
     def get_all(
         self, info: strawberry.Info, folder_id: Optional[UUID] = None
     ) -> Sequence[FileType]:
         user = info.context.get("user")
-        db: Session = next(get_db())
+        db: Session = info.context["db"]
         try:
             files = get_user_files(db=db, user_id=UUID(user.sub), folder_id=folder_id)
             return files
@@ -53,5 +79,3 @@ class FileQueries:
                 "Database error occurred while retrieving files",
                 extensions={"code": "INTERNAL_ERROR"},
             )
-        finally:
-            db.close()
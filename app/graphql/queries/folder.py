@@ -6,10 +6,10 @@ from sqlalchemy.orm import Session
 import strawberry
 from strawberry.exceptions import StrawberryGraphQLError
 
-from app.database import get_db
-from app.graphql.types import FolderType
-from app.services.folder import get_folder, get_folders
-from app.utils.helpers import get_folder_path_cte
+from app.graphql.types import FolderSummaryType, FolderType, Page, SortKey
+from app.services.folder import get_folder, get_folders, list_folders
+from app.utils.pagination import DEFAULT_PAGE_SIZE
+from app.utils.helpers import get_folder_path
 
 
 @strawberry.type
@@ -17,9 +17,8 @@ class FolderQueries:
     @strawberry.field
     def get(self, info: strawberry.Info, id: UUID) -> Optional[FolderType]:
         user = info.context.get("user")
-        db: Session = next(get_db())
+        db: Session = info.context["db"]
         try:
-            print(get_folder_path_cte(db, id))
             folder = get_folder(db=db, user_id=UUID(user.sub), id=id)
             if not folder:
                 raise StrawberryGraphQLError(
@@ -37,7 +36,7 @@ class FolderQueries:
                 is_shared=folder.is_shared,
                 permissions=folder.permissions,
                 owner=folder.owner,
-                path=get_folder_path_cte(db, id),
+                path=get_folder_path(db, folder),
             )
         except SQLAlchemyError:
             db.rollback()
@@ -45,15 +44,77 @@ class FolderQueries:
                 message="Database error occurred while retrieving folder",
                 extensions={"code": "INTERNAL_ERROR"},
             )
-        finally:
-            db.close()
 
     @strawberry.field
+    def page(
+        self,
+        info: strawberry.Info,
+        parent_id: Optional[UUID] = None,
+        first: int = DEFAULT_PAGE_SIZE,
+        after: Optional[str] = None,
+        sort: SortKey = SortKey.name,
+        descending: bool = False,
+    ) -> Page[FolderType]:
+        user = info.context.get("user")
+        db: Session = info.context["db"]
+        try:
+            result, error = list_folders(
+                db, UUID(user.sub), parent_id, sort, after, first, descending
+            )
+            if error:
+                raise StrawberryGraphQLError(
+                    message="Invalid page request", extensions={"code": error}
+                )
+            return Page(items=result.items, next_cursor=result.next_cursor)
+        except SQLAlchemyError:
+            db.rollback()
+            raise StrawberryGraphQLError(
+                message="Database error occurred while retrieving folders",
+                extensions={"code": "INTERNAL_ERROR"},
+            )
+
+    @strawberry.field
+    def summaries(
+        self,
+        info: strawberry.Info,
+        parent_id: Optional[UUID] = None,
+        first: int = DEFAULT_PAGE_SIZE,
+        after: Optional[str] = None,
+        sort: SortKey = SortKey.name,
+        descending: bool = False,
+    ) -> Page[FolderSummaryType]:
+        """Flat listing rows for folder views; nothing below the folders."""
+        user = info.context.get("user")
+        db: Session = info.context["db"]
+        try:
+            result, error = list_folders(
+                db,
+                UUID(user.sub),
+                parent_id,
+                sort,
+                after,
+                first,
+                descending,
+                summary=True,
+            )
+            if error:
+                raise StrawberryGraphQLError(
+                    message="Invalid page request", extensions={"code": error}
+                )
+            return Page(items=result.items, next_cursor=result.next_cursor)
+        except SQLAlchemyError:
+            db.rollback()
+            raise StrawberryGraphQLError(
+                message="Database error occurred while retrieving folders",
+                extensions={"code": "INTERNAL_ERROR"},
+            )
+
+    @strawberry.field(deprecation_reason="Unbounded; use page")
     def get_all(
         self, info: strawberry.Info, parent_id: Optional[UUID] = None
     ) -> Sequence[FolderType]:
         user = info.context.get("user")
-        db = next(get_db())
+        db: Session = info.context["db"]
         try:
             folders = list(
                 get_folders(db=db, user_id=UUID(user.sub), parent_id=parent_id)
@@ -65,5 +126,3 @@ class FolderQueries:
                 message="Database error occurred while retrieving folders",
                 extensions={"code": "INTERNAL_ERROR"},
             )
-        finally:
-            db.close()
@@ -3,23 +3,51 @@ from uuid import UUID
 from sqlalchemy.exc import SQLAlchemyError
 import strawberry
 from strawberry.exceptions import StrawberryGraphQLError
-from app.database import get_db
-from app.graphql.types import LinkType
+from app.graphql.types import LinkType, Page, SortKey
 from app.services.link import (
     get_user_link,
     get_user_links,
     get_link,
     get_links_by_file_id,
     get_links_by_folder_id,
+    list_user_links,
 )
+from app.utils.pagination import DEFAULT_PAGE_SIZE
 
 
 @strawberry.type
 class LinkQueries:
     @strawberry.field
+    def page(
+        self,
+        info: strawberry.Info,
+        first: int = DEFAULT_PAGE_SIZE,
+        after: Optional[str] = None,
+        sort: SortKey = SortKey.created_at,
+        descending: bool = False,
+    ) -> Page[LinkType]:
+        user = info.context.get("user")
+        db = info.context["db"]
+        try:
+            result, error = list_user_links(
+                db, UUID(user.sub), sort, after, first, descending
+            )
+            if error:
+                raise StrawberryGraphQLError(
+                    message="Invalid page request", extensions={"code": error}
+                )
+            return Page(items=result.items, next_cursor=result.next_cursor)
+        except SQLAlchemyError:
+            db.rollback()
+            raise StrawberryGraphQLError(
+                "Database error occurred while retrieving links",
+                extensions={"code": "INTERNAL_ERROR"},
+            )
+
+    @strawberry.field(deprecation_reason="Unbounded; use page")
     def get_all(self, info: strawberry.Info) -> Sequence[LinkType]:
         user = info.context.get("user")
-        db = next(get_db())
+        db = info.context["db"]
         try:
             links = get_user_links(db=db, user_id=UUID(user.sub))
             return links
@@ -29,14 +57,12 @@ class LinkQueries:
                 "Database error occurred while retrieving links",
                 extensions={"code": "INTERNAL_ERROR"},
             )
-        finally:
-            db.close()
 
     @strawberry.field
     def get(self, info: strawberry.Info, id: UUID) -> Optional[LinkType]:
         user = info.context.get("user")
 
-        db = next(get_db())
+        db = info.context["db"]
         try:
             link = get_user_link(db=db, user_id=UUID(user.sub), id=id)
             if not link:
@@ -51,8 +77,6 @@ class LinkQueries:
                 "Database error occurred while retrieving link",
                 extensions={"code": "INTERNAL_ERROR"},
             )
-        finally:
-            db.close()
 
     @strawberry.field
     def get_by_token(
@@ -61,7 +85,7 @@ class LinkQueries:
         """
         Get a link by its token, optionally checking for a password.
         """
-        db = next(get_db())
+        db = info.context["db"]
         try:
             link = get_link(db=db, token=token)
             if not link:
@@ -82,13 +106,11 @@ class LinkQueries:
                 "Database error occurred while retrieving link by token",
                 extensions={"code": "INTERNAL_ERROR"},
             )
-        finally:
-            db.close()
 
     @strawberry.field
     def get_by_file(self, info: strawberry.Info, file_id: UUID) -> Sequence[LinkType]:
         user = info.context.get("user")
-        db = next(get_db())
+        db = info.context["db"]
         try:
             links, error = get_links_by_file_id(
                 db=db, user_id=UUID(user.sub), file_id=file_id
@@ -109,8 +131,6 @@ class LinkQueries:
                 "Database error occurred while retrieving links",
                 extensions={"code": "INTERNAL_ERROR"},
             )
-        finally:
-            db.close()
 
     @strawberry.field
     def get_by_folder(
@@ -118,7 +138,7 @@ class LinkQueries:
     ) -> Sequence[LinkType]:
         user = info.context.get("user")
 
-        db = next(get_db())
+        db = info.context["db"]
         try:
             links, error = get_links_by_folder_id(
                 db=db, user_id=UUID(user.sub), folder_id=folder_id
@@ -140,5 +160,3 @@ class LinkQueries:
                 "Database error occurred while retrieving links",
                 extensions={"code": "INTERNAL_ERROR"},
             )
-        finally:
-            db.close()
@@ -5,8 +5,7 @@ import strawberry
 from strawberry.exceptions import StrawberryGraphQLError
 from sqlalchemy.orm import Session
 
-from app.database import get_db
-from app.graphql.types import FilePermissionType, FolderPermissionType
+from app.graphql.types import FilePermissionType, FolderPermissionType, Page
 from app.services.permission import (
     get_all_file_permissions,
     get_all_folder_permissions,
@@ -14,7 +13,10 @@ from app.services.permission import (
     get_file_permissions_by_file_id,
     get_folder_permission_by_id,
     get_folder_permissions_by_folder_id,
+    list_file_permissions,
+    list_folder_permissions,
 )
+from app.utils.pagination import DEFAULT_PAGE_SIZE
 
 
 @strawberry.type
@@ -22,58 +24,65 @@ class FilePermissionQueries:
     @strawberry.field
     def get(self, info: strawberry.Info, id: UUID) -> Optional[FilePermissionType]:
         user = info.context.get("user")
-        db: Session = next(get_db())
-        try:
-            permission, error = get_file_permission_by_id(db, UUID(user.sub), id)
-            if error:
-                raise StrawberryGraphQLError(
-                    message="Permission does not exist", extensions={"code": error}
-                )
-            return permission
-        finally:
-            db.close()
+        db: Session = info.context["db"]
+        permission, error = get_file_permission_by_id(db, UUID(user.sub), id)
+        if error:
+            raise StrawberryGraphQLError(
+                message="Permission does not exist", extensions={"code": error}
+            )
+        return permission
 
     @strawberry.field
     def get_by_file(
         self, info: strawberry.Info, file_id: UUID
     ) -> Sequence[FilePermissionType]:
         user = info.context.get("user")
-        db: Session = next(get_db())
-        try:
-            permissions, error = get_file_permissions_by_file_id(
-                db, UUID(user.sub), file_id
+        db: Session = info.context["db"]
+        permissions, error = get_file_permissions_by_file_id(
+            db, UUID(user.sub), file_id
+        )
+        if error:
+            raise StrawberryGraphQLError(
+                message="Unable to retrieve permissions", extensions={"code": error}
+            )
+        if not permissions:
+            raise StrawberryGraphQLError(
+                message="Unable to process the request",
+                extensions={"code": "INTERNAL_ERROR"},
             )
-            if error:
-                raise StrawberryGraphQLError(
-                    message="Unable to retrieve permissions", extensions={"code": error}
-                )
-            if not permissions:
-                raise StrawberryGraphQLError(
-                    message="Unable to process the request",
-                    extensions={"code": "INTERNAL_ERROR"},
-                )
-            return permissions
-        finally:
-            db.close()
+        return permissions
 
     @strawberry.field
+    def page(
+        self,
+        info: strawberry.Info,
+        first: int = DEFAULT_PAGE_SIZE,
+        after: Optional[str] = None,
+    ) -> Page[FilePermissionType]:
+        user = info.context.get("user")
+        db: Session = info.context["db"]
+        result, error = list_file_permissions(db, UUID(user.sub), after, first)
+        if error:
+            raise StrawberryGraphQLError(
+                message="Unable to retrieve permissions", extensions={"code": error}
+            )
+        return Page(items=result.items, next_cursor=result.next_cursor)
+
+    @strawberry.field(deprecation_reason="Unbounded; use page")
     def get_all(self, info: strawberry.Info) -> Sequence[FilePermissionType]:
         user = info.context.get("user")
-        db: Session = next(get_db())
-        try:
-            permissions, error = get_all_file_permissions(db, UUID(user.sub))
-            if error:
-                raise StrawberryGraphQLError(
-                    message="Unable to retrieve permissions", extensions={"code": error}
-                )
-            if not permissions:
-                raise StrawberryGraphQLError(
-                    message="Unable to process the request",
-                    extensions={"code": "INTERNAL_ERROR"},
-                )
-            return permissions
-        finally:
-            db.close()
+        db: Session = info.context["db"]
+        permissions, error = get_all_file_permissions(db, UUID(user.sub))
+        if error:
+            raise StrawberryGraphQLError(
+                message="Unable to retrieve permissions", extensions={"code": error}
+            )
+        if not permissions:
+            raise StrawberryGraphQLError(
+                message="Unable to process the request",
+                extensions={"code": "INTERNAL_ERROR"},
+            )
+        return permissions
 
 
 @strawberry.type
@@ -81,55 +90,62 @@ class FolderPermissionQueries:
     @strawberry.field
     def get(self, info: strawberry.Info, id: UUID) -> Optional[FolderPermissionType]:
         user = info.context.get("user")
-        db: Session = next(get_db())
-        try:
-            permission, error = get_folder_permission_by_id(db, UUID(user.sub), id)
-            if error:
-                raise StrawberryGraphQLError(
-                    message="Permission does not exist", extensions={"code": error}
-                )
-            return permission
-        finally:
-            db.close()
+        db: Session = info.context["db"]
+        permission, error = get_folder_permission_by_id(db, UUID(user.sub), id)
+        if error:
+            raise StrawberryGraphQLError(
+                message="Permission does not exist", extensions={"code": error}
+            )
+        return permission
 
     @strawberry.field
     def get_by_folder(
         self, info: strawberry.Info, folder_id: UUID
     ) -> Sequence[FolderPermissionType]:
         user = info.context.get("user")
-        db: Session = next(get_db())
-        try:
-            permissions, error = get_folder_permissions_by_folder_id(
-                db, UUID(user.sub), folder_id
+        db: Session = info.context["db"]
+        permissions, error = get_folder_permissions_by_folder_id(
+            db, UUID(user.sub), folder_id
+        )
+        if error:
+            raise StrawberryGraphQLError(
+                message="Unable to retrieve permissions", extensions={"code": error}
+            )
+        if not permissions:
+            raise StrawberryGraphQLError(
+                message="Unable to process the request",
+                extensions={"code": "INTERNAL_ERROR"},
             )
-            if error:
-                raise StrawberryGraphQLError(
-                    message="Unable to retrieve permissions", extensions={"code": error}
-                )
-            if not permissions:
-                raise StrawberryGraphQLError(
-                    message="Unable to process the request",
-                    extensions={"code": "INTERNAL_ERROR"},
-                )
-            return permissions
-        finally:
-            db.close()
+        return permissions
 
     @strawberry.field
+    def page(
+        self,
+        info: strawberry.Info,
+        first: int = DEFAULT_PAGE_SIZE,
+        after: Optional[str] = None,
+    ) -> Page[FolderPermissionType]:
+        user = info.context.get("user")
+        db: Session = info.context["db"]
+        result, error = list_folder_permissions(db, UUID(user.sub), after, first)
+        if error:
+            raise StrawberryGraphQLError(
+                message="Unable to retrieve permissions", extensions={"code": error}
+            )
+        return Page(items=result.items, next_cursor=result.next_cursor)
+
+    @strawberry.field(deprecation_reason="Unbounded; use page")
     def get_all(self, info: strawberry.Info) -> Sequence[FolderPermissionType]:
         user = info.context.get("user")
-        db: Session = next(get_db())
-        try:
-            permissions, error = get_all_folder_permissions(db, UUID(user.sub))
-            if error:
-                raise StrawberryGraphQLError(
-                    message="Unable to retrieve permissions", extensions={"code": error}
-                )
-            if not permissions:
-                raise StrawberryGraphQLError(
-                    message="Unable to process the request",
-                    extensions={"code": "INTERNAL_ERROR"},
-                )
-            return permissions
-        finally:
-            db.close()
+        db: Session = info.context["db"]
+        permissions, error = get_all_folder_permissions(db, UUID(user.sub))
+        if error:
+            raise StrawberryGraphQLError(
+                message="Unable to retrieve permissions", extensions={"code": error}
+            )
+        if not permissions:
+            raise StrawberryGraphQLError(
+                message="Unable to process the request",
+                extensions={"code": "INTERNAL_ERROR"},
+            )
+        return permissions
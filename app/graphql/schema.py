@@ -1,10 +1,13 @@
 from typing import AsyncGenerator
 import strawberry
 import asyncio
+from strawberry.extensions import SchemaExtension
 from strawberry.fastapi import GraphQLRouter
+from strawberry.types.graphql import OperationType
 
 
 from app.core.context import get_context
+from app.database import use_replicas
 from app.graphql.mutations.file import FileMutations
 from app.graphql.mutations.folder import FolderMutations
 from app.graphql.mutations.link import LinkMutations
@@ -79,10 +82,21 @@ class Subscription:
             await asyncio.sleep(1)
 
 
+class ReplicaReads(SchemaExtension):
+    """Let query operations read from the database replicas."""
+
+    def on_execute(self):
+        execution_context = self.execution_context
+        if execution_context.operation_type == OperationType.QUERY:
+            use_replicas(execution_context.context["db"])
+        yield
+
+
 schema = strawberry.Schema(
     query=Query,
     mutation=Mutation,
     subscription=Subscription,
+    extensions=[ReplicaReads],
 )
 graphql_app = GraphQLRouter(
     schema, multipart_uploads_enabled=True, context_getter=get_context
@@ -1,14 +1,29 @@
 from __future__ import annotations
 import enum
 from datetime import datetime
-from typing import List, Optional, Tuple
+from typing import Generic, List, Optional, Tuple, TypeVar
 from uuid import UUID
 
 import strawberry
 from strawberry.file_uploads import Upload
 
+from app.services import move
+from app.utils import pagination
 from app.utils.graphql import FromModelMixin
 
+T = TypeVar("T")
+
+SortKey = strawberry.enum(pagination.SortKey)
+OnConflict = strawberry.enum(move.OnConflict)
+
+
+@strawberry.type
+class Page(Generic[T]):
+    """A page of a list; pass next_cursor as `after` to get the next one."""
+
+    items: List[T]
+    next_cursor: Optional[str]
+
 
 @strawberry.type
 class UserType:
@@ -45,6 +60,23 @@ class FolderType(FromModelMixin):
     #    ]
 
 
+@strawberry.type
+class FolderSummaryType:
+    """A folder in a listing, with counts instead of its contents."""
+
+    id: UUID
+    name: str
+    parent_id: Optional[UUID]
+    starred: bool
+    created_at: datetime
+    updated_at: Optional[datetime]
+    folder_count: int
+    file_count: int
+    total_size: int
+    is_shared: bool
+    owner_id: Optional[UUID]
+
+
 @strawberry.type
 class FileType(FromModelMixin):
     id: UUID
@@ -146,6 +178,27 @@ class FileInput:
     file: Upload
 
 
+@strawberry.input
+class FileBatchItemInput:
+    name: str
+    file: Upload
+
+
+@strawberry.input
+class FileBatchInput:
+    folder_id: Optional[UUID] = None
+    files: List[FileBatchItemInput]
+
+
+@strawberry.type
+class FileBatchResult:
+    """Outcome of one file of a batch upload; ``error`` is a code like FILE_EXISTS"""
+
+    name: str
+    file: Optional[FileType] = None
+    error: Optional[str] = None
+
+
 @strawberry.input
 class FileCopyInput:
     source_ids: List[UUID]
@@ -156,12 +209,14 @@ class FileCopyInput:
 class FolderMoveInput:
     source_ids: List[UUID]
     destination_folder_id: UUID
+    on_conflict: OnConflict = OnConflict.fail
 
 
 @strawberry.input
 class FileMoveInput:
     source_ids: List[UUID]
     destination_folder_id: UUID
+    on_conflict: OnConflict = OnConflict.fail
 
 
 @strawberry.type
@@ -1,23 +1,61 @@
-from fastapi import FastAPI, APIRouter
-from app.database import Base, engine
+from fastapi import FastAPI, APIRouter, Request
+from app.core.config import settings
+from app.core.auth import get_current_user_from_request
+from app.database import (
+    READ_PRIMARY_COOKIE,
+    Base,
+    SessionLocal,
+    engine,
+    remember_writer,
+)
 from app.graphql.schema import graphql_app
 from app.api.v1.endpoints.user import router as users_router
 from app.api.v1.endpoints.auth import router as auth_router
 from app.api.v1.endpoints.share import router as share_router
 from app.api.v1.endpoints.consent import router as consent_router
 from app.api.v1.endpoints.file import router as file_router
+from app.api.v1.endpoints.upload import router as upload_router
+from app.api.v1.endpoints.internal import router as internal_router
+from app.services.storage import check_media_root
 
 Base.metadata.create_all(bind=engine)
+with SessionLocal() as db:
+    check_media_root(db)
 
 app = FastAPI()
 
+
+@app.middleware("http")
+async def read_your_writes(request: Request, call_next):
+    """
+    Keep a client's reads on the primary for a while after it wrote, by
+    cookie and, for clients that drop cookies, by authenticated user.
+    """
+    user = get_current_user_from_request(request)
+    request.state.user_id = user.sub if user else None
+    response = await call_next(request)
+    if getattr(request.state, "db_wrote", False):
+        if request.state.user_id:
+            remember_writer(request.state.user_id)
+        response.set_cookie(
+            READ_PRIMARY_COOKIE,
+            "1",
+            max_age=settings.DB_READ_YOUR_WRITES_SECONDS,
+            httponly=True,
+            samesite="lax",
+        )
+    return response
+
+
 api_v1_router = APIRouter()
 
 api_v1_router.include_router(users_router, prefix="/users", tags=["users"])
 api_v1_router.include_router(share_router, prefix="/s", tags=["shares"])
 api_v1_router.include_router(auth_router, prefix="", tags=["authentications", "auth"])
 api_v1_router.include_router(consent_router, prefix="/consent", tags=["consent"])
+app.include_router(upload_router, prefix="/f/uploads", tags=["uploads"])
 app.include_router(file_router, prefix="/f", tags=["files"])
+app.include_router(internal_router, prefix="/internal", tags=["internal"])
 
 app.include_router(graphql_app, prefix="/graphql", tags=["GraphQL"])
 app.include_router(api_v1_router, prefix="/api/v1")
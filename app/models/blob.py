@@ -0,0 +1,25 @@
+from datetime import datetime, timezone
+from sqlalchemy import BigInteger, Column, DateTime, Integer, String
+from app.database import Base
+
+
+class Blob(Base):
+    """
+    Content-addressed payload shared by every ``File`` with the same bytes.
+
+    ``ref_count`` is the number of ``File`` rows pointing at this blob; the
+    bytes on disk are removed once it drops to zero.
+    """
+
+    __tablename__ = "blobs"
+
+    hash = Column(String(64), primary_key=True)
+    path = Column(String, nullable=False)
+    size = Column(BigInteger, nullable=False, default=0)
+    ref_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(
+        DateTime(timezone=True), default=lambda: datetime.now(timezone.utc)
+    )
+
+    def __repr__(self):
+        return f"<Blob(hash={self.hash}, ref_count={self.ref_count})>"
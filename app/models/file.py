@@ -9,17 +9,26 @@ from sqlalchemy import (
     UUID,
     DateTime,
     ForeignKey,
+    Index,
     String,
     UniqueConstraint,
 )
 from typing import Optional
+from app.models.blob import Blob  # noqa: F401
+from app.models.file_version import FileVersion
 from app.models.permission import RoleEnum
 from app.models.user import User
 
 
 class File(Base):
     __tablename__ = "files"
-    __table_args__ = (UniqueConstraint("name", "folder_id", name="uq_name_parent"),)
+    __table_args__ = (
+        UniqueConstraint("name", "folder_id", name="uq_name_parent"),
+        # Folder listings and name checks within a folder.
+        Index("ix_files_folder_name", "folder_id", "name"),
+        # Storage reconciliation and relayout match rows by stored path.
+        Index("ix_files_file", "file"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid4)
     folder_id = Column(
@@ -28,6 +37,9 @@ class File(Base):
         nullable=True,
     )
     file = Column(String, nullable=False)
+    content_hash = Column(
+        String(64), ForeignKey("blobs.hash"), nullable=True, index=True
+    )
     name = Column(String(255), nullable=False)
     mime_type = Column(String(55), nullable=False)
     ext = Column(String, nullable=False)
@@ -49,6 +61,11 @@ class File(Base):
     permissions = relationship(
         "FilePermission", back_populates="file", cascade="all, delete-orphan"
     )
+    versions = relationship(
+        FileVersion,
+        order_by=FileVersion.number.desc(),
+        cascade="all, delete-orphan",
+    )
 
     @property
     def owner(self) -> Optional[User]:
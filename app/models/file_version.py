@@ -0,0 +1,69 @@
+from datetime import datetime, timezone
+from uuid import uuid4
+
+from sqlalchemy import (
+    UUID,
+    BigInteger,
+    Column,
+    DateTime,
+    ForeignKey,
+    Integer,
+    String,
+    UniqueConstraint,
+)
+from sqlalchemy.orm import relationship
+
+from app.database import Base
+
+
+class FileVersion(Base):
+    """
+    One revision of a file's content.
+
+    The current version is served from the file's full blob and has no
+    chunks. Older versions are kept as an ordered list of content-defined
+    chunks, each stored as a blob, so revisions share unchanged chunks.
+    """
+
+    __tablename__ = "file_versions"
+    __table_args__ = (
+        UniqueConstraint("file_id", "number", name="uq_file_version_number"),
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid4)
+    file_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("files.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+    number = Column(Integer, nullable=False)
+    # SHA-256 of the whole content, also the ETag of the version.
+    content_hash = Column(String(64), nullable=True)
+    size = Column(BigInteger, nullable=False, default=0)
+    mime_type = Column(String(55), nullable=False)
+    created_at = Column(
+        DateTime(timezone=True), default=lambda: datetime.now(timezone.utc)
+    )
+
+    chunks = relationship(
+        "FileVersionChunk",
+        order_by="FileVersionChunk.position",
+        cascade="all, delete-orphan",
+    )
+
+    def __repr__(self):
+        return f"<FileVersion(file_id={self.file_id}, number={self.number})>"
+
+
+class FileVersionChunk(Base):
+    __tablename__ = "file_version_chunks"
+
+    version_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("file_versions.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    position = Column(Integer, primary_key=True)
+    chunk_hash = Column(String(64), ForeignKey("blobs.hash"), nullable=False)
+    size = Column(Integer, nullable=False)
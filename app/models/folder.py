@@ -2,7 +2,18 @@ from datetime import datetime, timezone
 from typing import Optional
 import uuid
 
-from sqlalchemy import Boolean, Column, DateTime, ForeignKey, String, UniqueConstraint
+from sqlalchemy import (
+    Boolean,
+    Column,
+    DateTime,
+    ForeignKey,
+    Index,
+    String,
+    Text,
+    UniqueConstraint,
+    event,
+    select,
+)
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import backref, relationship
 
@@ -16,6 +27,12 @@ class Folder(Base):
     __table_args__ = (
         # Ensures a folder's name is unique within its parent.
         UniqueConstraint("name", "parent_id", name="uq_folder_name_parent"),
+        # Child listings and name checks within a parent.
+        Index("ix_folders_parent_name", "parent_id", "name"),
+        # Prefix searches on the materialized path find a folder's subtree.
+        Index(
+            "ix_folders_path", "path", postgresql_ops={"path": "text_pattern_ops"}
+        ),
     )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
@@ -33,6 +50,10 @@ class Folder(Base):
         nullable=True,
     )
 
+    # Materialized path: the ids from the root down to this folder, each
+    # followed by "/". Descendants are the folders whose path starts with it.
+    path = Column(Text, nullable=False)
+
     starred = Column(Boolean, default=False, nullable=False)
     created_at = Column(
         DateTime(timezone=True), default=lambda: datetime.now(timezone.utc)
@@ -74,6 +95,22 @@ class Folder(Base):
         passive_deletes=True,
     )
 
+    def place_under(self, parent: Optional["Folder"]) -> None:
+        """Set ``parent_id`` and ``path`` for a folder under ``parent``."""
+        if self.id is None:
+            self.id = uuid.uuid4()
+        self.parent_id = parent.id if parent else None
+        self.path = f"{parent.path if parent else ''}{self.id}/"
+
+    @property
+    def ancestor_ids(self) -> list[uuid.UUID]:
+        """Ids from the root down to and including this folder."""
+        return [uuid.UUID(part) for part in self.path.split("/") if part]
+
+    def is_within(self, other: "Folder") -> bool:
+        """Whether this folder is ``other`` or one of its descendants."""
+        return self.path.startswith(other.path)
+
     @property
     def owner(self) -> Optional["User"]:
         """Convenience property to get the folder's owner."""
@@ -88,3 +125,18 @@ class Folder(Base):
 
     def __repr__(self):
         return f"<Folder(id={self.id}, name='{self.name}', parent_id={self.parent_id})>"
+
+
+@event.listens_for(Folder, "before_insert")
+def _set_path(mapper, connection, target: Folder) -> None:
+    # Folders created with only a parent_id take the path from the parent row.
+    if target.path is not None:
+        return
+    if target.id is None:
+        target.id = uuid.uuid4()
+    parent_path = ""
+    if target.parent_id is not None:
+        parent_path = connection.scalar(
+            select(Folder.path).where(Folder.id == target.parent_id)
+        )
+    target.path = f"{parent_path or ''}{target.id}/"
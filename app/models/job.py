@@ -0,0 +1,60 @@
+import enum
+from datetime import datetime, timezone
+from uuid import uuid4
+
+from sqlalchemy import (
+    JSON,
+    UUID,
+    Column,
+    DateTime,
+    Enum as SQLAEnum,
+    Index,
+    Integer,
+    String,
+    Text,
+)
+
+from app.database import Base
+
+
+class JobStatus(str, enum.Enum):
+    queued = "queued"
+    running = "running"
+    done = "done"
+    failed = "failed"
+
+
+class Job(Base):
+    """
+    A unit of background work, run by ``python -m app.services.jobs``.
+
+    ``kind`` names the handler and ``args`` holds its JSON positional
+    arguments. Jobs with the same ``key`` are only queued once. Failed runs
+    are retried with exponential backoff until ``max_attempts`` is reached.
+    """
+
+    __tablename__ = "jobs"
+    __table_args__ = (Index("ix_jobs_queue", "status", "priority", "run_at"),)
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid4)
+    kind = Column(String(64), nullable=False)
+    key = Column(String(255), unique=True, nullable=True)
+    args = Column(JSON, nullable=False, default=list)
+    priority = Column(Integer, nullable=False, default=0)
+    status = Column(SQLAEnum(JobStatus), nullable=False, default=JobStatus.queued)
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=5)
+    last_error = Column(Text, nullable=True)
+    run_at = Column(
+        DateTime(timezone=True),
+        nullable=False,
+        default=lambda: datetime.now(timezone.utc),
+    )
+    locked_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(
+        DateTime(timezone=True), default=lambda: datetime.now(timezone.utc)
+    )
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    def __repr__(self):
+        return f"<Job(kind={self.kind}, status={self.status}, key={self.key})>"
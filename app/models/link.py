@@ -27,13 +27,22 @@ class Link(Base):
     )
 
     file_id = Column(
-        UUID(as_uuid=True), ForeignKey("files.id", ondelete="CASCADE"), nullable=True
+        UUID(as_uuid=True),
+        ForeignKey("files.id", ondelete="CASCADE"),
+        index=True,
+        nullable=True,
     )
     folder_id = Column(
-        UUID(as_uuid=True), ForeignKey("folders.id", ondelete="CASCADE"), nullable=True
+        UUID(as_uuid=True),
+        ForeignKey("folders.id", ondelete="CASCADE"),
+        index=True,
+        nullable=True,
     )
     user_id = Column(
-        UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False
+        UUID(as_uuid=True),
+        ForeignKey("users.id", ondelete="CASCADE"),
+        index=True,
+        nullable=False,
     )
     permisssion = Column(
         SQLAEnum(LinkPermission), default=LinkPermission.view, nullable=False
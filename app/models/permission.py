@@ -3,6 +3,7 @@ from uuid import uuid4
 from sqlalchemy import (
     Column,
     ForeignKey,
+    Index,
     UUID,
     UniqueConstraint,
     Enum as SQLAEnum,
@@ -30,6 +31,20 @@ class FilePermission(Base):
     role = Column(SQLAEnum(RoleEnum), nullable=False)
     __table_args__ = (
         UniqueConstraint("user_id", "role", "file_id", name="uq_user_file_role"),
+        # Access checks: the user's permission on one file.
+        Index(
+            "ix_file_permissions_user_file",
+            "user_id",
+            "file_id",
+            postgresql_include=["role"],
+        ),
+        # Permissions of a file and its owner lookup, without the table.
+        Index(
+            "ix_file_permissions_file_role",
+            "file_id",
+            "role",
+            postgresql_include=["user_id"],
+        ),
     )
     file = relationship("File", back_populates="permissions")
     user = relationship(
@@ -50,6 +65,13 @@ class FolderPermission(Base):
     role = Column(SQLAEnum(RoleEnum), nullable=False)
     __table_args__ = (
         UniqueConstraint("user_id", "folder_id", "role", name="uq_user_folder_role"),
+        # Permissions of a folder and its owner lookup, without the table.
+        Index(
+            "ix_folder_permissions_folder_role",
+            "folder_id",
+            "role",
+            postgresql_include=["user_id"],
+        ),
     )
 
     folder = relationship("Folder", back_populates="permissions")
@@ -0,0 +1,52 @@
+from datetime import datetime, timezone
+from uuid import uuid4
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    UUID,
+    DateTime,
+    ForeignKey,
+    Integer,
+    String,
+)
+from app.database import Base
+
+
+class UploadSession(Base):
+    """
+    A resumable upload. The client PUTs fixed-size chunks in any order; the
+    chunks live on disk until the session is completed into a ``File`` or
+    expires.
+    """
+
+    __tablename__ = "upload_sessions"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid4)
+    user_id = Column(
+        UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False
+    )
+    folder_id = Column(
+        UUID(as_uuid=True), ForeignKey("folders.id", ondelete="CASCADE"), nullable=True
+    )
+    name = Column(String(255), nullable=False)
+    size = Column(BigInteger, nullable=False)
+    chunk_size = Column(Integer, nullable=False)
+    created_at = Column(
+        DateTime(timezone=True), default=lambda: datetime.now(timezone.utc)
+    )
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+    @property
+    def chunk_count(self) -> int:
+        return -(-self.size // self.chunk_size)
+
+    def chunk_length(self, index: int) -> int:
+        return min(self.chunk_size, self.size - index * self.chunk_size)
+
+    @property
+    def is_expired(self) -> bool:
+        expires_at = self.expires_at
+        # SQLite returns naive datetimes; they are stored in UTC.
+        if expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
+        return expires_at < datetime.now(timezone.utc)
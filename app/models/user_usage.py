@@ -0,0 +1,31 @@
+from datetime import datetime, timezone
+from sqlalchemy import BigInteger, Column, DateTime, ForeignKey, Integer, UUID
+from app.database import Base
+
+
+class UserUsage(Base):
+    """
+    Storage used by the files a user owns, kept up to date by the services
+    that create and delete files so reading it is a primary-key lookup.
+
+    ``quota_bytes`` overrides ``settings.STORAGE_QUOTA_BYTES`` for this user.
+    """
+
+    __tablename__ = "user_usage"
+
+    user_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("users.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    used_bytes = Column(BigInteger, nullable=False, default=0)
+    file_count = Column(Integer, nullable=False, default=0)
+    quota_bytes = Column(BigInteger, nullable=True)
+    updated_at = Column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc),
+    )
+
+    def __repr__(self):
+        return f"<UserUsage(user_id={self.user_id}, used_bytes={self.used_bytes})>"
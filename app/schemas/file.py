@@ -11,6 +11,7 @@ class CreateFile(BaseModel):
     mime_type: str
     ext: str
     size: int
+    content_hash: Optional[str] = None
 
 
 class UpdateFile(BaseModel):
@@ -33,3 +34,13 @@ class FileOut(BaseModel):
 
 
 FileOut.model_rebuild()
+
+
+class FileVersionOut(BaseModel):
+    number: int
+    content_hash: Optional[str]
+    size: int
+    mime_type: str
+    created_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
@@ -29,3 +29,20 @@ class FolderOut(FolderBase):
 
 
 FolderOut.model_rebuild()
+
+
+class FolderItemOut(FolderBase):
+    """A folder in a listing: a summary instead of its subtree."""
+
+    id: UUID
+    starred: bool
+    created_at: datetime
+    updated_at: Optional[datetime]
+    folder_count: int
+    file_count: int
+    # Bytes of the files directly in the folder.
+    total_size: int
+    is_shared: bool
+    owner_id: Optional[UUID]
+
+    model_config = ConfigDict(from_attributes=True)
@@ -1,6 +1,6 @@
 import enum
 from datetime import datetime
-from pydantic import BaseModel, UUID4, model_validator, ConfigDict
+from pydantic import AliasChoices, BaseModel, Field, UUID4, model_validator, ConfigDict
 from typing import Optional
 
 
@@ -32,6 +32,9 @@ class LinkOut(BaseModel):
     token: str
     created_at: datetime
     expires_at: Optional[datetime]
-    permission: LinkPermission
+    # The model column is spelled ``permisssion``.
+    permission: LinkPermission = Field(
+        validation_alias=AliasChoices("permission", "permisssion")
+    )
 
     model_config = ConfigDict(from_attributes=True)
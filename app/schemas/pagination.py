@@ -0,0 +1,13 @@
+from typing import Generic, List, Optional, TypeVar
+
+from pydantic import BaseModel, ConfigDict
+
+T = TypeVar("T")
+
+
+class Page(BaseModel, Generic[T]):
+    items: List[T]
+    # Pass as ``after`` for the next page; null on the last page.
+    next_cursor: Optional[str]
+
+    model_config = ConfigDict(from_attributes=True)
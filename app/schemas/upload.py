@@ -0,0 +1,24 @@
+from datetime import datetime
+from typing import List, Optional
+from uuid import UUID
+from pydantic import BaseModel, ConfigDict, Field
+
+
+class UploadSessionCreate(BaseModel):
+    name: str = Field(..., max_length=255)
+    size: int = Field(..., ge=0)
+    folder_id: Optional[UUID] = None
+    chunk_size: Optional[int] = None
+
+
+class UploadSessionOut(BaseModel):
+    id: UUID
+    name: str
+    folder_id: Optional[UUID]
+    size: int
+    chunk_size: int
+    chunk_count: int
+    expires_at: datetime
+    received: List[int] = []
+
+    model_config = ConfigDict(from_attributes=True)
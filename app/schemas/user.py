@@ -1,5 +1,6 @@
+from typing import Optional
 from uuid import UUID
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, ConfigDict, EmailStr
 
 
 class User(BaseModel):
@@ -16,3 +17,11 @@ class UserCreate(BaseModel):
 class UserPasswordChange(BaseModel):
     old_password: str
     new_password: str
+
+
+class UserUsageOut(BaseModel):
+    used_bytes: int
+    file_count: int
+    quota_bytes: Optional[int] = None
+
+    model_config = ConfigDict(from_attributes=True)
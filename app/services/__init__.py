@@ -1,4 +1,17 @@
 from .copy import CopyService
-from .move import move_files, move_folders
+from .move import (
+    OnConflict,
+    bulk_move_files,
+    bulk_move_folders,
+    move_files,
+    move_folders,
+)
 
-__all__ = ["CopyService", "move_files", "move_folders"]
+__all__ = [
+    "CopyService",
+    "OnConflict",
+    "bulk_move_files",
+    "bulk_move_folders",
+    "move_files",
+    "move_folders",
+]
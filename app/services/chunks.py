@@ -0,0 +1,103 @@
+"""
+Content-defined chunking.
+
+Content is split where a gear rolling hash over the last bytes matches a
+mask, so boundaries move with the data: an edit only changes the chunks it
+touches, and inserting bytes does not shift every boundary after it. Each
+chunk is stored in the blob store under its SHA-256, so identical chunks are
+stored once across all versions of all files.
+
+The parameters follow FastCDC: no boundary is looked for in the first
+``MIN_CHUNK_SIZE`` bytes of a chunk (which also skips hashing them), a
+16-bit mask gives ``AVG_CHUNK_SIZE`` on average and ``MAX_CHUNK_SIZE``
+bounds every chunk.
+"""
+
+import hashlib
+import os
+from collections import Counter
+from typing import BinaryIO, Iterable, Iterator
+
+from sqlalchemy.orm import Session
+
+from app.services.storage import acquire_blob, blob_path, commit_blob, temp_path
+
+MIN_CHUNK_SIZE = 16 * 1024
+AVG_CHUNK_SIZE = 64 * 1024
+MAX_CHUNK_SIZE = 256 * 1024
+READ_SIZE = 1024 * 1024
+
+# The top bits of the hash depend on the last 32 bytes only; a boundary is
+# declared when 16 of them are zero.
+_MASK = 0xFFFF0000
+_GEAR = [
+    int.from_bytes(hashlib.sha256(bytes([i])).digest()[:4], "big") for i in range(256)
+]
+
+
+def _find_cut(buf: bytearray) -> int:
+    end = min(len(buf), MAX_CHUNK_SIZE)
+    if end <= MIN_CHUNK_SIZE:
+        return end
+    h = 0
+    gear = _GEAR
+    for i, byte in enumerate(memoryview(buf)[MIN_CHUNK_SIZE:end], MIN_CHUNK_SIZE):
+        h = ((h << 1) + gear[byte]) & 0xFFFFFFFF
+        if not h & _MASK:
+            return i + 1
+    return end
+
+
+def iter_chunks(stream: BinaryIO) -> Iterator[bytes]:
+    """Split a binary stream into content-defined chunks."""
+    buf = bytearray()
+    eof = False
+    while not eof:
+        data = stream.read(READ_SIZE)
+        eof = not data
+        buf += data
+        while len(buf) >= MAX_CHUNK_SIZE or (eof and buf):
+            cut = _find_cut(buf)
+            yield bytes(buf[:cut])
+            del buf[:cut]
+
+
+def write_chunks(path: str) -> list[tuple[str, int]]:
+    """
+    Chunk the file at ``path``, writing chunks the store does not hold yet.
+    Returns the ordered (chunk_hash, size) list. Touches no database rows,
+    so callers can run it before taking locks.
+    """
+    manifest = []
+    with open(path, "rb") as f:
+        for chunk in iter_chunks(f):
+            digest = hashlib.sha256(chunk).hexdigest()
+            try:
+                # A fresh mtime keeps bytes that a concurrent release is
+                # about to unlink in place (see ``storage.UNLINK_GRACE``).
+                os.utime(blob_path(digest))
+            except FileNotFoundError:
+                tmp_path = temp_path()
+                with open(tmp_path, "wb") as out:
+                    out.write(chunk)
+                commit_blob(tmp_path, digest)
+            manifest.append((digest, len(chunk)))
+    return manifest
+
+
+def acquire_chunks(db: Session, manifest: list[tuple[str, int]]) -> None:
+    """Take one blob reference per entry of a manifest from ``write_chunks``."""
+    refs = Counter(digest for digest, _ in manifest)
+    sizes = dict(manifest)
+    for digest, count in refs.items():
+        acquire_blob(db, digest, sizes[digest], refs=count)
+
+
+def iter_chunk_files(
+    paths: Iterable[str], read_size: int = READ_SIZE
+) -> Iterator[bytes]:
+    """Stream the concatenation of chunk files without loading them whole."""
+    for path in paths:
+        with open(path, "rb") as f:
+            while data := f.read(read_size):
+                yield data
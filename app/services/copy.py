@@ -1,9 +1,14 @@
+from collections import Counter
 from typing import Optional, Dict, Any
+from uuid import uuid4
+from sqlalchemy import insert, select
 from sqlalchemy.orm import Session
 from app.models.folder import Folder
 from app.models.file import File
 from app.models.user import User
 from app.models.permission import FolderPermission, FilePermission, RoleEnum
+from app.services.storage import acquire_blob
+from app.services.usage import add_usage
 
 
 class CopyService:
@@ -69,7 +74,15 @@ class CopyService:
         preserve_timestamps: bool = False,
         **kwargs,
     ) -> Folder:
-        """Internal method to perform the actual folder copy."""
+        """
+        Internal method to perform the actual folder copy.
+
+        The source subtree is read with one query on its materialized path,
+        the copies get their ids and paths in memory, and folders, files and
+        permissions are then written with one multi-row insert each.
+        """
+        # Make pending changes visible to the subtree queries below.
+        self.session.flush()
 
         # Generate name
         if new_name is None:
@@ -77,64 +90,148 @@ class CopyService:
                 source_folder.name, destination_parent, suffix=" (Copy)"
             )
 
-        # Create the folder copy
-        folder_copy = Folder(
-            name=new_name,
-            parent_id=destination_parent.id if destination_parent else None,
-            starred=source_folder.starred,
+        scope = (
+            Folder.path.startswith(source_folder.path)
+            if copy_children
+            else Folder.id == source_folder.id
         )
 
-        # Preserve timestamps if requested
-        if preserve_timestamps:
-            folder_copy.created_at = source_folder.created_at
-            folder_copy.updated_at = source_folder.updated_at
-
-        self.session.add(folder_copy)
-        self.session.flush()
-
-        # Copy permissions
-        if copy_permissions:
-            self._copy_folder_permissions(source_folder, folder_copy, user)
+        # Ordering by path puts every folder after its parent.
+        folder_ids = {}
+        paths = {}
+        folder_rows = []
+        for source in self.session.execute(
+            select(
+                Folder.id,
+                Folder.parent_id,
+                Folder.name,
+                Folder.starred,
+                Folder.created_at,
+                Folder.updated_at,
+                Folder.path,
+            )
+            .where(scope)
+            .order_by(Folder.path)
+        ):
+            new_id = uuid4()
+            folder_ids[source.id] = new_id
+            row = {"id": new_id, "name": source.name, "starred": source.starred}
+            if source.id == source_folder.id:
+                row["name"] = new_name
+                row["parent_id"] = destination_parent.id if destination_parent else None
+                parent_path = destination_parent.path if destination_parent else ""
+                # Preserve timestamps if requested
+                if preserve_timestamps:
+                    row["created_at"] = source.created_at
+                    row["updated_at"] = source.updated_at
+            else:
+                row["parent_id"] = folder_ids[source.parent_id]
+                parent_path = paths[row["parent_id"]]
+            paths[new_id] = row["path"] = f"{parent_path}{new_id}/"
+            folder_rows.append(row)
+
+        folder_permission_rows = [
+            {
+                "id": uuid4(),
+                "folder_id": folder_ids[perm.folder_id],
+                "user_id": perm.user_id,
+                "role": perm.role,
+            }
+            for perm in self.session.execute(
+                select(
+                    FolderPermission.folder_id,
+                    FolderPermission.user_id,
+                    FolderPermission.role,
+                )
+                .join(Folder, Folder.id == FolderPermission.folder_id)
+                .where(scope)
+            )
+            if (copy_permissions or perm.folder_id != source_folder.id)
+            and self._may_grant(user, perm.role)
+        ]
 
-        # Copy children
+        file_ids = {}
+        file_rows = []
+        file_permission_rows = []
         if copy_children:
-            self._copy_folder_children(source_folder, folder_copy, user)
-
-        return folder_copy
-
-    def _copy_folder_permissions(
-        self, source: Folder, target: Folder, user: Optional[User]
-    ) -> None:
-        """Copy folder permissions with user context."""
-        for perm in source.permissions:
-            # Skip if user doesn't have permission to grant this role
-            if user and not self._can_grant_permission(user, perm.role):
-                continue
-
-            new_perm = FolderPermission(
-                folder_id=target.id, user_id=perm.user_id, role=perm.role
-            )
-            self.session.add(new_perm)
+            for source in self.session.execute(
+                select(
+                    File.id,
+                    File.folder_id,
+                    File.name,
+                    File.file,
+                    File.content_hash,
+                    File.mime_type,
+                    File.ext,
+                    File.size,
+                    File.starred,
+                )
+                .join(Folder, Folder.id == File.folder_id)
+                .where(scope)
+            ):
+                file_ids[source.id] = uuid4()
+                file_rows.append(
+                    {
+                        "id": file_ids[source.id],
+                        "folder_id": folder_ids[source.folder_id],
+                        # The folders are new and the suffix keeps distinct
+                        # names distinct, so these cannot conflict.
+                        "name": f"{source.name} (Copy)",
+                        "file": source.file,
+                        "content_hash": source.content_hash,
+                        "mime_type": source.mime_type,
+                        "ext": source.ext,
+                        "size": source.size,
+                        "starred": source.starred,
+                    }
+                )
+            file_permission_rows = [
+                {
+                    "id": uuid4(),
+                    "file_id": file_ids[perm.file_id],
+                    "user_id": perm.user_id,
+                    "role": perm.role,
+                }
+                for perm in self.session.execute(
+                    select(
+                        FilePermission.file_id,
+                        FilePermission.user_id,
+                        FilePermission.role,
+                    )
+                    .join(File, File.id == FilePermission.file_id)
+                    .join(Folder, Folder.id == File.folder_id)
+                    .where(scope)
+                )
+                if self._may_grant(user, perm.role)
+            ]
+
+        # Copies share the source blobs and count towards their owners'
+        # storage usage, as with single file copies.
+        sizes = {row["id"]: row["size"] for row in file_rows}
+        blob_sizes = {row["content_hash"]: row["size"] for row in file_rows}
+        refs = Counter(row["content_hash"] for row in file_rows if row["content_hash"])
+        for digest, count in refs.items():
+            acquire_blob(self.session, digest, blob_sizes[digest], refs=count)
+        owned_bytes = Counter()
+        owned_files = Counter()
+        for perm in file_permission_rows:
+            if perm["role"] == RoleEnum.owner:
+                owned_bytes[perm["user_id"]] += sizes[perm["file_id"]]
+                owned_files[perm["user_id"]] += 1
+        for owner_id, count in owned_files.items():
+            add_usage(self.session, owner_id, owned_bytes[owner_id], count)
         self.session.flush()
 
-    def _copy_folder_children(
-        self, source: Folder, target: Folder, user: Optional[User]
-    ) -> None:
-        """Copy all children of a folder recursively."""
-        # Copy subfolders
-        for subfolder in source.folders:
-            self._perform_folder_copy(
-                source_folder=subfolder,
-                destination_parent=target,
-                new_name=subfolder.name,
-                user=user,
-                copy_permissions=True,
-                copy_children=True,
-            )
+        self.session.execute(insert(Folder), folder_rows)
+        for model, rows in (
+            (FolderPermission, folder_permission_rows),
+            (File, file_rows),
+            (FilePermission, file_permission_rows),
+        ):
+            if rows:
+                self.session.execute(insert(model), rows)
 
-        # Copy files
-        for file in source.files:
-            self.copy_file(file, target, user=user)
+        return self.session.get(Folder, folder_ids[source_folder.id])
 
     def copy_file(
         self,
@@ -200,13 +297,19 @@ class CopyService:
         file_copy = File(
             name=new_name,
             folder_id=destination_folder.id,
-            file=source_file.file,  # This assumes the file path is the same
+            file=source_file.file,
+            content_hash=source_file.content_hash,
             mime_type=source_file.mime_type,
             ext=source_file.ext,
             size=source_file.size,
             starred=source_file.starred,
         )
 
+        # Copies share the source blob; take a reference so deleting either
+        # file leaves the bytes in place for the other.
+        if source_file.content_hash:
+            acquire_blob(self.session, source_file.content_hash, source_file.size)
+
         # Preserve timestamps if requested
         if preserve_timestamps:
             file_copy.created_at = source_file.created_at
@@ -234,53 +337,47 @@ class CopyService:
                 file_id=target.id, user_id=perm.user_id, role=perm.role
             )
             self.session.add(new_perm)
+            # The copy counts towards its owner's storage usage.
+            if perm.role == RoleEnum.owner:
+                add_usage(self.session, perm.user_id, target.size)
 
     def _generate_unique_folder_name(
         self, base_name: str, parent: Optional[Folder], suffix: str = " (Copy)"
     ) -> str:
         """Generate a unique name for the folder copy."""
-        candidate_name = f"{base_name}{suffix}"
-        counter = 1
-
-        while self._folder_name_exists(candidate_name, parent):
-            candidate_name = f"{base_name}{suffix} ({counter})"
-            counter += 1
-
-        return candidate_name
-
-    def _folder_name_exists(self, name: str, parent: Optional[Folder]) -> bool:
-        """Check if a folder name already exists in the parent folder."""
-        query = self.session.query(Folder).filter(Folder.name == name)
+        query = self.session.query(Folder.name).filter(
+            Folder.name.startswith(f"{base_name}{suffix}", autoescape=True)
+        )
 
         if parent:
             query = query.filter(Folder.parent_id == parent.id)
         else:
             query = query.filter(Folder.parent_id.is_(None))
 
-        return query.first() is not None
+        return self._first_free_name(base_name, suffix, {name for (name,) in query})
 
     def _generate_unique_file_name(
         self, base_name: str, parent: Folder, suffix: str = " (Copy)"
     ) -> str:
         """Generate a unique name for the file copy."""
+        query = self.session.query(File.name).filter(
+            File.folder_id == parent.id,
+            File.name.startswith(f"{base_name}{suffix}", autoescape=True),
+        )
+        return self._first_free_name(base_name, suffix, {name for (name,) in query})
+
+    @staticmethod
+    def _first_free_name(base_name: str, suffix: str, taken: set) -> str:
+        """First of "name (Copy)", "name (Copy) (1)", ... not in ``taken``."""
         candidate_name = f"{base_name}{suffix}"
         counter = 1
 
-        while self._file_name_exists(candidate_name, parent):
+        while candidate_name in taken:
             candidate_name = f"{base_name}{suffix} ({counter})"
             counter += 1
 
         return candidate_name
 
-    def _file_name_exists(self, name: str, parent: Folder) -> bool:
-        """Check if a file name already exists in the parent folder."""
-        return (
-            self.session.query(File)
-            .filter(File.name == name, File.folder_id == parent.id)
-            .first()
-            is not None
-        )
-
     def _can_copy_folder(self, folder: Folder, user: User) -> bool:
         """Check if user can copy this folder."""
         # Implementation depends on your permission system
@@ -300,3 +397,7 @@ class CopyService:
         """Check if user can grant this permission role."""
         # Implementation depends on your permission system
         return True
+
+    def _may_grant(self, user: Optional[User], role: RoleEnum) -> bool:
+        """Whether a copy made by ``user`` keeps a permission with ``role``."""
+        return user is None or self._can_grant_permission(user, role)
@@ -1,43 +1,85 @@
-import os
+import asyncio
+from collections import Counter
 from pathlib import Path
+from types import SimpleNamespace
 from uuid import UUID, uuid4
-from typing import Optional
-import aiofiles
-import magic
+from typing import List, Optional, Sequence
+from sqlalchemy import insert, select
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import joinedload, Session, selectinload
 from strawberry.file_uploads import Upload
-from PIL import Image
-import io
 from app.models.file import File
 from app.models.folder import Folder
 from app.models.permission import FilePermission, FolderPermission, RoleEnum
 
 from app.schemas.file import CreateFile
+from app.services.storage import (
+    acquire_blob,
+    discard_blob,
+    iter_upload,
+    release_blob,
+    store_stream,
+)
+from app.services.thumbnail import schedule_post_processing
+from app.services.usage import add_usage, check_quota, remaining_quota
+from app.utils.pagination import DEFAULT_PAGE_SIZE, SortKey, keyset_page
+from app.services.version import release_file_versions
 
-MEDIA_ROOT = "media"
-os.makedirs(MEDIA_ROOT, exist_ok=True)
+# Uploads of one batch written to the blob store at the same time.
+BATCH_UPLOAD_CONCURRENCY = 8
+
+
+def check_folder_access(
+    db: Session, user_id: UUID, folder_id: Optional[UUID]
+) -> Optional[str]:
+    """
+    Check that the user may create files in the folder (None is the root).
+    Returns None or the error code "NOT_FOUND" / "PERMISSION_DENIED".
+    """
+    if not folder_id:
+        return None
+    folder = db.query(Folder).get(folder_id)
+    if not folder:
+        return "NOT_FOUND"
+
+    permission = (
+        db.query(FolderPermission)
+        .filter(
+            FolderPermission.folder_id == folder_id,
+            FolderPermission.user_id == user_id,
+            FolderPermission.role.in_([RoleEnum.owner, RoleEnum.editor]),
+        )
+        .first()
+    )
+    if not permission:
+        return "PERMISSION_DENIED"
+    return None
+
+
+def file_extension(filename: str) -> str:
+    return Path(filename).suffix.lower().lstrip(".")
 
 
 def create_file(db: Session, user_id: UUID, file_data: CreateFile):
+    """
+    Create a file for stored upload bytes. Returns (file, error_code); on
+    error the bytes are removed unless another file references them.
+    """
+    file, error = _create_file(db, user_id, file_data)
+    if error:
+        discard_blob(db, file_data.content_hash, file_data.file)
+    return file, error
+
+
+def _create_file(db: Session, user_id: UUID, file_data: CreateFile):
     try:
         parent_folder_id = file_data.folder_id
-        if parent_folder_id:
-            folder = db.query(Folder).get(parent_folder_id)
-            if not folder:
-                return None, "NOT_FOUND"
-
-            permission = (
-                db.query(FolderPermission)
-                .filter(
-                    FolderPermission.folder_id == parent_folder_id,
-                    FolderPermission.user_id == user_id,
-                    FolderPermission.role.in_([RoleEnum.owner, RoleEnum.editor]),
-                )
-                .first()
-            )
-            if not permission:
-                return None, "PERMISSION_DENIED"
+        error = check_folder_access(db, user_id, parent_folder_id) or check_quota(
+            db, user_id, file_data.size
+        )
+        if error:
+            return None, error
 
         file_instance = File(
             name=file_data.name,
@@ -46,14 +88,19 @@ def create_file(db: Session, user_id: UUID, file_data: CreateFile):
             mime_type=file_data.mime_type,
             size=file_data.size,
             ext=file_data.ext,
+            content_hash=file_data.content_hash,
         )
         db.add(file_instance)
+        if file_data.content_hash:
+            acquire_blob(db, file_data.content_hash, file_data.size)
+        add_usage(db, user_id, file_data.size)
         db.flush()
 
         permission = FilePermission(
             user_id=user_id, file_id=file_instance.id, role=RoleEnum.owner
         )
         db.add(permission)
+        schedule_post_processing(db, file_instance)
         db.commit()
 
         file_instance = (
@@ -68,7 +115,6 @@ def create_file(db: Session, user_id: UUID, file_data: CreateFile):
         )
         if not file_instance:
             return None, "INTERNAL_ERROR"
-
         return file_instance, None
     except IntegrityError:
         db.rollback()
@@ -78,17 +124,159 @@ def create_file(db: Session, user_id: UUID, file_data: CreateFile):
         return None, "INTERNAL_ERROR"
 
 
-async def save_uploaded_file(file: Upload) -> tuple[str, str, str, int]:
-    filename_uuid = f"{uuid4()}_{file.filename}"
-    file_path = os.path.join(MEDIA_ROOT, filename_uuid)
-    async with aiofiles.open(file_path, "wb") as out_file:
-        while chunk := await file.read(1024):
-            await out_file.write(chunk)
-    async with aiofiles.open(file_path, "rb") as f:
-        sample = await f.read(2048)
-        mime_type = magic.from_buffer(sample, mime=True)
-    extension = Path(file.filename).suffix.lower().lstrip(".")
-    return file_path, mime_type, extension, file.size
+async def save_uploaded_file(
+    file: Upload, max_size: Optional[int] = None
+) -> tuple[str, str, str, int, str]:
+    """
+    Store an upload in the blob store, raising ``BlobTooLarge`` once it
+    passes ``max_size`` bytes.
+
+    Returns (file_path, mime_type, extension, size, content_hash). The blob is
+    not referenced until ``create_file`` is called with the returned hash.
+    """
+    blob = await store_stream(iter_upload(file), max_size)
+    extension = file_extension(file.filename)
+    return blob.path, blob.mime_type, extension, blob.size, blob.content_hash
+
+
+async def save_uploaded_files(
+    files: Sequence[Upload],
+    limit: int = BATCH_UPLOAD_CONCURRENCY,
+    max_size: Optional[int] = None,
+) -> list:
+    """
+    Store several uploads, at most ``limit`` at a time and each at most
+    ``max_size`` bytes. Each item is the ``save_uploaded_file`` tuple, or
+    the exception that upload raised.
+    """
+    semaphore = asyncio.Semaphore(limit)
+
+    async def save(file: Upload):
+        async with semaphore:
+            return await save_uploaded_file(file, max_size)
+
+    return await asyncio.gather(
+        *(save(file) for file in files), return_exceptions=True
+    )
+
+
+def create_files(
+    db: Session,
+    user_id: UUID,
+    folder_id: Optional[UUID],
+    items: List[Optional[CreateFile]],
+):
+    """
+    Create many files in one folder in a single transaction.
+
+    Folder access is checked once and the ``File`` and ``FilePermission`` rows
+    are written with one multi-row insert each. ``None`` items (uploads that
+    failed) and names already taken in the folder or earlier in the batch are
+    skipped, as are files that no longer fit the user's quota. Returns
+    (results, error_code): ``results`` has one (file, error_code) pair per
+    item, and error_code is set when the batch is rejected as a whole. The
+    bytes of items that did not become files are removed.
+    """
+    results, error = _create_files(db, user_id, folder_id, items)
+    for index, item in enumerate(items):
+        if item is not None and (error or results[index][0] is None):
+            discard_blob(db, item.content_hash, item.file)
+    return results, error
+
+
+def _create_files(
+    db: Session,
+    user_id: UUID,
+    folder_id: Optional[UUID],
+    items: List[Optional[CreateFile]],
+):
+    error = check_folder_access(db, user_id, folder_id)
+    if error:
+        return None, error
+
+    # Names are unique per folder; files at the root are not constrained.
+    taken = set()
+    if folder_id:
+        names = [item.name for item in items if item]
+        taken = {
+            name
+            for (name,) in db.query(File.name).filter(
+                File.folder_id == folder_id, File.name.in_(names)
+            )
+        }
+
+    remaining = remaining_quota(db, user_id)
+    results = []
+    rows = []
+    for item in items:
+        if item is None:
+            results.append((None, "FILE_UPLOAD_ERROR"))
+            continue
+        if folder_id and item.name in taken:
+            results.append((None, "FILE_EXISTS"))
+            continue
+        if remaining is not None:
+            if item.size > remaining:
+                results.append((None, "QUOTA_EXCEEDED"))
+                continue
+            remaining -= item.size
+        taken.add(item.name)
+        row = {
+            "id": uuid4(),
+            "name": item.name,
+            "file": item.file,
+            "folder_id": folder_id,
+            "mime_type": item.mime_type,
+            "size": item.size,
+            "ext": item.ext,
+            "content_hash": item.content_hash,
+        }
+        rows.append(row)
+        results.append((row["id"], None))
+    if not rows:
+        return results, None
+
+    try:
+        sizes = {row["content_hash"]: row["size"] for row in rows}
+        refs = Counter(row["content_hash"] for row in rows if row["content_hash"])
+        for digest, count in refs.items():
+            acquire_blob(db, digest, sizes[digest], refs=count)
+        add_usage(db, user_id, sum(row["size"] for row in rows), len(rows))
+        db.flush()
+        db.execute(insert(File), rows)
+        db.execute(
+            insert(FilePermission),
+            [
+                {
+                    "id": uuid4(),
+                    "user_id": user_id,
+                    "file_id": row["id"],
+                    "role": RoleEnum.owner,
+                }
+                for row in rows
+            ],
+        )
+        for row in rows:
+            schedule_post_processing(db, SimpleNamespace(**row))
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        return None, "FILE_EXISTS"
+    except SQLAlchemyError:
+        db.rollback()
+        return None, "INTERNAL_ERROR"
+
+    created = {
+        file.id: file
+        for file in db.query(File)
+        .options(
+            joinedload(File.folder),
+            selectinload(File.permissions).selectinload(FilePermission.user),
+            selectinload(File.links),
+        )
+        .filter(File.id.in_([row["id"] for row in rows]))
+    }
+    return [(created.get(id), error) for id, error in results], None
 
 
 def delete_file(db: Session, user_id: UUID, file_id: UUID):
@@ -107,11 +295,9 @@ def delete_file(db: Session, user_id: UUID, file_id: UUID):
         )
         if not permission:
             return False, "PERMISSION_DENIED"
-        if os.path.exists(file_obj.file):
-            try:
-                os.remove(file_obj.file)
-            except OSError:
-                return False, "FAILED_DELETE"
+        release_blob(db, file_obj.content_hash)
+        release_file_versions(db, file_obj)
+        add_usage(db, user_id, -file_obj.size, -1)
         db.query(FilePermission).filter(FilePermission.file_id == file_id).delete()
         db.delete(file_obj)
         db.commit()
@@ -141,25 +327,43 @@ def get_user_file(db: Session, user_id: UUID, id: UUID):
     return query, None
 
 
-def generate_thumbnail(file_path: str, size: tuple[int, int] = (128, 128)):
-    try:
-        img = Image.open(file_path)
-        img.thumbnail(size)
-        thumb_io = io.BytesIO()
-        img.save(thumb_io, format="PNG")
-        thumb_io.seek(0)
-        return thumb_io, None
-    except Exception as e:
-        return None, str(e)
+def _file_meta_select(user_id: UUID, id: UUID):
+    return (
+        select(
+            File.id,
+            File.file,
+            File.name,
+            File.mime_type,
+            File.size,
+            File.content_hash,
+            File.created_at,
+            File.updated_at,
+        )
+        .join(FilePermission)
+        .where(FilePermission.user_id == user_id, File.id == id)
+    )
 
 
-def get_user_files(db: Session, user_id: UUID, folder_id: Optional[UUID] = None):
+def get_user_file_meta(db: Session, user_id: UUID, id: UUID):
     """
-    Get user's files filtered by folder_id.
-
-    Args:
-        parent_id: None for root folders, UUID string for subfolders
+    Get the columns needed to serve the user's file, without loading any
+    relationships. Returns (row, error_code).
     """
+    row = db.execute(_file_meta_select(user_id, id)).first()
+    if not row:
+        return None, "NOT_FOUND"
+    return row, None
+
+
+async def get_user_file_meta_async(db: AsyncSession, user_id: UUID, id: UUID):
+    """``get_user_file_meta`` on an ``AsyncSession``."""
+    row = (await db.execute(_file_meta_select(user_id, id))).first()
+    if not row:
+        return None, "NOT_FOUND"
+    return row, None
+
+
+def _user_files_query(db: Session, user_id: UUID, folder_id: Optional[UUID]):
     query = (
         db.query(File)
         .options(
@@ -175,7 +379,49 @@ def get_user_files(db: Session, user_id: UUID, folder_id: Optional[UUID] = None)
         query.filter(File.folder_id.is_(None))
         if folder_id is None
         else query.filter(File.folder_id == folder_id)
-    ).all()
+    )
+
+
+def get_user_files(db: Session, user_id: UUID, folder_id: Optional[UUID] = None):
+    """
+    Get user's files filtered by folder_id.
+
+    Args:
+        parent_id: None for root folders, UUID string for subfolders
+    """
+    return _user_files_query(db, user_id, folder_id).all()
+
+
+FILE_SORT_COLUMNS = {
+    SortKey.name: File.name,
+    SortKey.created_at: File.created_at,
+    SortKey.size: File.size,
+}
+
+
+def list_user_files(
+    db: Session,
+    user_id: UUID,
+    folder_id: Optional[UUID] = None,
+    sort: SortKey = SortKey.name,
+    after: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    descending: bool = False,
+):
+    """
+    One page of the user's files in a folder (None is the root).
+    Returns (page, error_code) where error_code is None, "INVALID_SORT" or
+    "INVALID_CURSOR".
+    """
+    return keyset_page(
+        _user_files_query(db, user_id, folder_id),
+        File.id,
+        FILE_SORT_COLUMNS,
+        sort,
+        after,
+        limit,
+        descending,
+    )
 
 
 def update_file(
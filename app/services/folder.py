@@ -1,13 +1,20 @@
 from typing import Optional
 from uuid import UUID
 
+from sqlalchemy import exists, func, or_, select, union_all
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
-from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.orm import Session, aliased, selectinload
 
 from app.models.folder import Folder
 from app.models.file import File
+from app.models.file_version import FileVersion, FileVersionChunk
+from app.models.link import Link
 from app.models.permission import FolderPermission, FilePermission, RoleEnum
 from app.schemas.folder import FolderCreate
+from app.services.storage import release_blob
+from app.services.usage import add_usage, owned_usage
+from app.utils.pagination import DEFAULT_PAGE_SIZE, SortKey, keyset_page
+from app.utils.zipstream import ZipEntry, member_segment
 
 
 def get_folder(db: Session, user_id: UUID, id: UUID):
@@ -35,6 +42,122 @@ def get_folder(db: Session, user_id: UUID, id: UUID):
     return query
 
 
+def folder_archive_entries(db: Session, folder: Folder) -> list[ZipEntry]:
+    """
+    List the ZIP entries of a folder's subtree, rooted at the folder name.
+
+    The subtree is resolved with a single recursive query; archive paths are
+    joined from sanitised names so no entry can escape the archive root.
+    Empty folders become directory entries.
+    """
+    folders = Folder.__table__
+    tree = (
+        select(folders.c.id, folders.c.parent_id, folders.c.name)
+        .where(folders.c.id == folder.id)
+        .cte(name="folder_tree", recursive=True)
+    )
+    children = folders.alias("children")
+    tree = tree.union_all(
+        select(children.c.id, children.c.parent_id, children.c.name).where(
+            children.c.parent_id == tree.c.id
+        )
+    )
+    rows = db.execute(
+        select(
+            tree.c.id.label("folder_id"),
+            tree.c.parent_id,
+            tree.c.name.label("folder_name"),
+            File.name,
+            File.file,
+            File.size,
+            File.mime_type,
+            File.updated_at,
+        )
+        .select_from(tree)
+        .outerjoin(File, File.folder_id == tree.c.id)
+    ).all()
+
+    parents = {row.folder_id: (row.parent_id, row.folder_name) for row in rows}
+    paths = {folder.id: member_segment(folder.name)}
+
+    def folder_path(folder_id):
+        # Walk up to the nearest folder with a known path, then back down.
+        pending = []
+        while folder_id not in paths:
+            pending.append(folder_id)
+            folder_id = parents[folder_id][0]
+        for child_id in reversed(pending):
+            segment = member_segment(parents[child_id][1])
+            paths[child_id] = f"{paths[folder_id]}/{segment}"
+            folder_id = child_id
+        return paths[folder_id]
+
+    entries = []
+    for row in rows:
+        path = folder_path(row.folder_id)
+        if row.file is None:
+            entries.append(ZipEntry(name=f"{path}/"))
+        else:
+            entries.append(
+                ZipEntry(
+                    name=f"{path}/{member_segment(row.name)}",
+                    path=row.file,
+                    size=row.size,
+                    mime_type=row.mime_type,
+                    modified=row.updated_at,
+                )
+            )
+    entries.sort(key=lambda entry: entry.name)
+    return entries
+
+
+def get_folder_archive(db: Session, user_id: UUID, id: UUID):
+    """
+    Get the folder and its ZIP entries if the user may read it.
+    Returns ((folder, entries), error_code) where error_code is None or "NOT_FOUND".
+    """
+    folder = (
+        db.query(Folder)
+        .join(FolderPermission)
+        .filter(FolderPermission.user_id == user_id, Folder.id == id)
+        .first()
+    )
+    if not folder:
+        return None, "NOT_FOUND"
+    return (folder, folder_archive_entries(db, folder)), None
+
+
+def subtree_file_ids(path: str):
+    """
+    Select the ids of every file in the folder with materialized ``path``
+    and its descendants.
+    """
+    return (
+        select(File.id)
+        .join(Folder, File.folder_id == Folder.id)
+        .where(Folder.path.startswith(path))
+    )
+
+
+def subtree_content_hashes(db: Session, path: str) -> list[str]:
+    """
+    Blob hashes referenced by every file in the folder with materialized
+    ``path`` and its descendants: one per file plus one per chunk of their
+    older versions.
+    """
+    files = subtree_file_ids(path)
+    return db.scalars(
+        union_all(
+            select(File.content_hash).where(
+                File.id.in_(files), File.content_hash.is_not(None)
+            ),
+            select(FileVersionChunk.chunk_hash)
+            .join(FileVersion)
+            .where(FileVersion.file_id.in_(files)),
+        )
+    ).all()
+
+
 def get_folders(db: Session, user_id: UUID, parent_id: Optional[UUID] = None):
     """
     Get user's folders filtered by parent_id.
@@ -61,6 +184,109 @@ def get_folders(db: Session, user_id: UUID, parent_id: Optional[UUID] = None):
     )
 
 
+def get_folder_summaries(
+    db: Session, user_id: UUID, parent_id: Optional[UUID] = None
+):
+    """
+    Flat listing rows of the user's folders under a parent: the folder's own
+    columns plus child folder count, file count, total size of those files,
+    is_shared and owner_id, each from a correlated subquery of one
+    statement. Nothing is loaded as ORM objects.
+    """
+    child = aliased(Folder)
+    other_permission = aliased(FolderPermission)
+    owner_permission = aliased(FolderPermission)
+
+    child_count = (
+        select(func.count(child.id))
+        .where(child.parent_id == Folder.id)
+        .scalar_subquery()
+    )
+    file_count = (
+        select(func.count(File.id)).where(File.folder_id == Folder.id).scalar_subquery()
+    )
+    total_size = (
+        select(func.coalesce(func.sum(File.size), 0))
+        .where(File.folder_id == Folder.id)
+        .scalar_subquery()
+    )
+    # Shared once another user has a permission or a link points at it,
+    # like Folder.is_shared.
+    is_shared = or_(
+        exists().where(
+            other_permission.folder_id == Folder.id,
+            other_permission.user_id != user_id,
+        ),
+        exists().where(Link.folder_id == Folder.id),
+    )
+    owner_id = (
+        select(owner_permission.user_id)
+        .where(
+            owner_permission.folder_id == Folder.id,
+            owner_permission.role == RoleEnum.owner,
+        )
+        .limit(1)
+        .scalar_subquery()
+    )
+
+    query = (
+        db.query(
+            Folder.id,
+            Folder.name,
+            Folder.parent_id,
+            Folder.starred,
+            Folder.created_at,
+            Folder.updated_at,
+            child_count.label("folder_count"),
+            file_count.label("file_count"),
+            total_size.label("total_size"),
+            is_shared.label("is_shared"),
+            owner_id.label("owner_id"),
+        )
+        .join(FolderPermission, FolderPermission.folder_id == Folder.id)
+        .filter(FolderPermission.user_id == user_id)
+    )
+    return (
+        query.filter(Folder.parent_id.is_(None))
+        if parent_id is None
+        else query.filter(Folder.parent_id == parent_id)
+    )
+
+
+FOLDER_SORT_COLUMNS = {
+    SortKey.name: Folder.name,
+    SortKey.created_at: Folder.created_at,
+}
+
+
+def list_folders(
+    db: Session,
+    user_id: UUID,
+    parent_id: Optional[UUID] = None,
+    sort: SortKey = SortKey.name,
+    after: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    descending: bool = False,
+    summary: bool = False,
+):
+    """
+    One page of the user's folders under a parent (None is the root), as
+    ORM objects or, with ``summary``, as ``get_folder_summaries`` rows.
+    Returns (page, error_code) where error_code is None, "INVALID_SORT" or
+    "INVALID_CURSOR".
+    """
+    query = (get_folder_summaries if summary else get_folders)(db, user_id, parent_id)
+    return keyset_page(
+        query,
+        Folder.id,
+        FOLDER_SORT_COLUMNS,
+        sort,
+        after,
+        limit,
+        descending,
+    )
+
+
 def create_folder(db: Session, folder_data: FolderCreate, user_id: UUID):
     """
     Create a folder and assign owner permission.
@@ -70,13 +296,15 @@ def create_folder(db: Session, folder_data: FolderCreate, user_id: UUID):
     from app.models.permission import FolderPermission
 
     # If parent_id is provided, check if parent exists
+    parent = None
     if folder_data.parent_id:
         parent = db.query(Folder).filter(Folder.id == folder_data.parent_id).first()
         if not parent:
             return None, "NOT_FOUND"
 
     try:
-        folder = Folder(name=folder_data.name, parent_id=folder_data.parent_id)
+        folder = Folder(name=folder_data.name)
+        folder.place_under(parent)
         db.add(folder)
         db.flush()
 
@@ -188,6 +416,14 @@ def delete_folder(db: Session, user_id: UUID, folder_id: UUID):
         else:
             return False, "NOT_FOUND"
 
+    # Files below the folder are removed by cascades, which bypass the
+    # service layer, so drop their blob references and usage explicitly.
+    for content_hash in subtree_content_hashes(db, folder_obj.path):
+        release_blob(db, content_hash)
+    owners = db.execute(owned_usage(File.id.in_(subtree_file_ids(folder_obj.path))))
+    for owner_id, size, count in owners.all():
+        add_usage(db, owner_id, -size, -count)
+
     db.delete(folder_obj)
     db.commit()
     return True, None
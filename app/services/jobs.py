@@ -0,0 +1,288 @@
+"""
+Database-backed background jobs.
+
+Services call ``enqueue`` inside the transaction that creates the work, so a
+job exists exactly when the rows it refers to were committed. The worker
+(``python -m app.services.jobs``) claims queued jobs by priority, runs their
+handlers in a pool of worker processes and records the outcome. A failed run
+is retried after an exponential backoff until the job's ``max_attempts`` is
+used up. Workers renew the lease of their running jobs every
+``LEASE_RENEW_INTERVAL``, so jobs whose worker died are put back in the queue
+after ``JOB_TIMEOUT`` however long the others take, and completed jobs are
+deleted after ``JOB_RETENTION``.
+
+Handlers are plain functions of JSON arguments, registered in
+``JOB_HANDLERS``, so they can run in spawned processes without touching the
+database.
+"""
+
+import argparse
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional
+from uuid import UUID, uuid4
+
+from sqlalchemy.orm import Session
+
+from app.database import UPSERT_INSERTS
+from app.models.job import Job, JobStatus
+from app.utils.imaging import extract_image_metadata, render_thumbnails
+
+logger = logging.getLogger(__name__)
+
+JOB_HANDLERS: dict[str, Callable] = {
+    "metadata": extract_image_metadata,
+    "thumbnails": render_thumbnails,
+}
+
+# Higher runs first.
+PRIORITY_HIGH = 10
+PRIORITY_NORMAL = 0
+PRIORITY_LOW = -10
+
+RETRY_BASE_DELAY = timedelta(seconds=10)
+RETRY_MAX_DELAY = timedelta(hours=1)
+# Running jobs whose lease was not renewed for this long are assumed lost.
+JOB_TIMEOUT = timedelta(minutes=15)
+LEASE_RENEW_INTERVAL = JOB_TIMEOUT / 3
+POLL_INTERVAL = 1.0
+# Completed jobs are kept this long, then deleted by the worker. Failed jobs
+# are kept for inspection.
+JOB_RETENTION = timedelta(days=7)
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def enqueue(
+    db: Session,
+    kind: str,
+    args: list,
+    key: Optional[str] = None,
+    priority: int = PRIORITY_NORMAL,
+    max_attempts: int = 5,
+) -> Job:
+    """
+    Queue a job in the caller's transaction. When ``key`` is given and a job
+    with that key exists it is returned instead; a permanently failed one is
+    queued again. Concurrent transactions enqueueing the same key end up
+    with the same job rather than a unique violation.
+    """
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"Unknown job kind {kind!r}")
+    insert = UPSERT_INSERTS.get(db.get_bind().dialect.name)
+    if key is not None and insert is not None:
+        db.execute(
+            insert(Job)
+            .values(
+                id=uuid4(),
+                kind=kind,
+                args=args,
+                key=key,
+                priority=priority,
+                max_attempts=max_attempts,
+                run_at=_now(),
+            )
+            .on_conflict_do_nothing(index_elements=[Job.key])
+        )
+    if key is not None:
+        job = db.query(Job).filter(Job.key == key).first()
+        if job is not None:
+            if job.status == JobStatus.failed:
+                job.status = JobStatus.queued
+                job.attempts = 0
+                job.run_at = _now()
+            return job
+    job = Job(
+        kind=kind,
+        args=args,
+        key=key,
+        priority=priority,
+        max_attempts=max_attempts,
+        run_at=_now(),
+    )
+    db.add(job)
+    if key is not None:
+        # Let a second enqueue with this key in the same transaction find it.
+        db.flush()
+    return job
+
+
+def claim_job(db: Session) -> Optional[Job]:
+    """
+    Mark the next due job as running and commit. Rows locked by another
+    worker are skipped. Returns None when nothing is due.
+    """
+    job = (
+        db.query(Job)
+        .filter(Job.status == JobStatus.queued, Job.run_at <= _now())
+        .order_by(Job.priority.desc(), Job.run_at)
+        .with_for_update(skip_locked=True)
+        .first()
+    )
+    if job is None:
+        return None
+    job.status = JobStatus.running
+    job.attempts += 1
+    job.locked_at = _now()
+    db.commit()
+    return job
+
+
+def retry_delay(attempts: int) -> timedelta:
+    # Capping the exponent keeps the product within timedelta's range.
+    return min(RETRY_BASE_DELAY * 2 ** min(attempts - 1, 20), RETRY_MAX_DELAY)
+
+
+def finish_job(db: Session, job_id: UUID, error: Optional[str] = None) -> Job:
+    """Record the outcome of a run and schedule a retry if it failed."""
+    job = db.get(Job, job_id, with_for_update=True)
+    job.locked_at = None
+    if error is None:
+        job.status = JobStatus.done
+        job.last_error = None
+        job.finished_at = _now()
+    elif job.attempts < job.max_attempts:
+        job.status = JobStatus.queued
+        job.last_error = error
+        job.run_at = _now() + retry_delay(job.attempts)
+    else:
+        job.status = JobStatus.failed
+        job.last_error = error
+        job.finished_at = _now()
+        logger.warning("job %s (%s) failed: %s", job.id, job.kind, error)
+    db.commit()
+    return job
+
+
+def renew_leases(db: Session, job_ids) -> int:
+    """Mark the given running jobs as still alive and commit."""
+    job_ids = list(job_ids)
+    if not job_ids:
+        return 0
+    count = (
+        db.query(Job)
+        .filter(Job.id.in_(job_ids), Job.status == JobStatus.running)
+        .update({Job.locked_at: _now()}, synchronize_session=False)
+    )
+    db.commit()
+    return count
+
+
+def requeue_stale_jobs(db: Session, timeout: timedelta = JOB_TIMEOUT) -> int:
+    """Put running jobs back in the queue once their lease ran out."""
+    count = (
+        db.query(Job)
+        .filter(Job.status == JobStatus.running, Job.locked_at < _now() - timeout)
+        .update(
+            {Job.status: JobStatus.queued, Job.locked_at: None},
+            synchronize_session=False,
+        )
+    )
+    db.commit()
+    return count
+
+
+def purge_finished_jobs(db: Session, retention: timedelta = JOB_RETENTION) -> int:
+    """Delete jobs that completed more than ``retention`` ago and commit."""
+    count = (
+        db.query(Job)
+        .filter(Job.status == JobStatus.done, Job.finished_at < _now() - retention)
+        .delete(synchronize_session=False)
+    )
+    db.commit()
+    return count
+
+
+def run_pending_jobs(db: Session, limit: Optional[int] = None) -> int:
+    """
+    Run due jobs one by one in the calling process, e.g. from tests or a
+    maintenance shell. Returns the number of runs.
+    """
+    runs = 0
+    while limit is None or runs < limit:
+        job = claim_job(db)
+        if job is None:
+            break
+        try:
+            JOB_HANDLERS[job.kind](*job.args)
+            error = None
+        except Exception as exc:
+            error = repr(exc)
+        finish_job(db, job.id, error)
+        runs += 1
+    return runs
+
+
+class JobWorker:
+    """Claims jobs and runs them in a process pool, ``processes`` at a time."""
+
+    def __init__(self, session_factory, processes: Optional[int] = None):
+        self.session_factory = session_factory
+        self.processes = processes or os.cpu_count() or 1
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.processes,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        self.running: dict[Future, UUID] = {}
+
+    def _fill(self, db: Session) -> None:
+        while len(self.running) < self.processes:
+            job = claim_job(db)
+            if job is None:
+                return
+            future = self.executor.submit(JOB_HANDLERS[job.kind], *job.args)
+            self.running[future] = job.id
+
+    def _collect(self, db: Session, done) -> None:
+        for future in done:
+            job_id = self.running.pop(future)
+            exc = future.exception()
+            finish_job(db, job_id, None if exc is None else repr(exc))
+
+    def run(self, poll_interval: float = POLL_INTERVAL) -> None:
+        last_sweep = 0.0
+        last_renewal = time.monotonic()
+        try:
+            while True:
+                with self.session_factory() as db:
+                    now = time.monotonic()
+                    if now - last_renewal > LEASE_RENEW_INTERVAL.total_seconds():
+                        renew_leases(db, self.running.values())
+                        last_renewal = now
+                    if now - last_sweep > JOB_TIMEOUT.total_seconds():
+                        requeue_stale_jobs(db)
+                        purge_finished_jobs(db)
+                        last_sweep = now
+                    self._fill(db)
+                if not self.running:
+                    time.sleep(poll_interval)
+                    continue
+                done, _ = wait(
+                    self.running, timeout=poll_interval, return_when=FIRST_COMPLETED
+                )
+                with self.session_factory() as db:
+                    self._collect(db, done)
+        finally:
+            self.executor.shutdown(wait=True)
+
+
+def main(argv=None) -> None:
+    from app.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--processes", type=int, help="worker processes")
+    parser.add_argument("--poll-interval", type=float, default=POLL_INTERVAL)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    JobWorker(SessionLocal, args.processes).run(args.poll_interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,6 @@
 from uuid import UUID
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session, joinedload
 from app.schemas.link import LinkCreate
 from app.models.link import Link
@@ -6,6 +8,9 @@ from app.models.file import File
 from app.models.folder import Folder
 from app.models.permission import FilePermission, RoleEnum, FolderPermission
 from datetime import datetime, timezone
+from typing import Optional
+
+from app.utils.pagination import DEFAULT_PAGE_SIZE, SortKey, keyset_page
 
 
 def get_user_link(db: Session, user_id: UUID, id: UUID):
@@ -18,14 +23,43 @@ def get_user_link(db: Session, user_id: UUID, id: UUID):
     return link
 
 
-def get_user_links(db: Session, user_id: UUID):
-    links = (
+def _user_links_query(db: Session, user_id: UUID):
+    return (
         db.query(Link)
         .options(joinedload(Link.user), joinedload(Link.folder), joinedload(Link.file))
         .filter(Link.user_id == user_id)
-        .all()
     )
-    return links
+
+
+def get_user_links(db: Session, user_id: UUID):
+    return _user_links_query(db, user_id).all()
+
+
+LINK_SORT_COLUMNS = {SortKey.created_at: Link.created_at}
+
+
+def list_user_links(
+    db: Session,
+    user_id: UUID,
+    sort: SortKey = SortKey.created_at,
+    after: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    descending: bool = False,
+):
+    """
+    One page of the user's links.
+    Returns (page, error_code) where error_code is None, "INVALID_SORT" or
+    "INVALID_CURSOR".
+    """
+    return keyset_page(
+        _user_links_query(db, user_id),
+        Link.id,
+        LINK_SORT_COLUMNS,
+        sort,
+        after,
+        limit,
+        descending,
+    )
 
 
 def get_link(db: Session, token: str):
@@ -33,6 +67,15 @@ def get_link(db: Session, token: str):
     return link
 
 
+async def get_link_async(db: AsyncSession, token: str):
+    """Get the link of a token together with its target."""
+    return await db.scalar(
+        select(Link)
+        .options(joinedload(Link.file), joinedload(Link.folder))
+        .where(Link.token == token)
+    )
+
+
 def get_links_by_file_id(db: Session, user_id: UUID, file_id: UUID):
     # Check if the user has permission to access the file
     file_permission = (
@@ -1,18 +1,227 @@
-from typing import List
+import enum
+from typing import List, Sequence
+from uuid import UUID
+from sqlalchemy import case, func, literal, or_, update
 from sqlalchemy.orm import Session
 from app.models.folder import Folder
 from app.models.file import File
+from app.models.permission import FilePermission, FolderPermission, RoleEnum
 from app.models.user import User
+from app.services.file import check_folder_access
 
+EDIT_ROLES = [RoleEnum.owner, RoleEnum.editor]
 
-def _is_subfolder(source_folder: Folder, destination_folder: Folder) -> bool:
-    """Check if the destination folder is a subfolder of the source folder."""
-    parent = destination_folder.parent
-    while parent:
-        if parent.id == source_folder.id:
-            return True
-        parent = parent.parent
-    return False
+
+class OnConflict(str, enum.Enum):
+    """What a bulk move does with a source named like an entry at the destination."""
+
+    fail = "fail"
+    rename = "rename"
+    skip = "skip"
+
+
+def _colliding(column, names: list, on_conflict: OnConflict):
+    """Filter for destination names that collide with ``names`` or their renames."""
+    if on_conflict == OnConflict.rename:
+        return or_(
+            column.in_(names),
+            *(column.startswith(f"{name} (", autoescape=True) for name in names),
+        )
+    return column.in_(names)
+
+
+def _plan_names(sources, taken: set, on_conflict: OnConflict, error: str):
+    """
+    Pick each source's name at the destination, given the names already taken
+    there. Returns (names, error_code) where ``names`` maps source ids to
+    names; skipped sources are left out.
+    """
+    names = {}
+    for source in sources:
+        name = source.name
+        if name in taken:
+            if on_conflict == OnConflict.fail:
+                return None, error
+            if on_conflict == OnConflict.skip:
+                continue
+            counter = 1
+            while f"{source.name} ({counter})" in taken:
+                counter += 1
+            name = f"{source.name} ({counter})"
+        taken.add(name)
+        names[source.id] = name
+    return names, None
+
+
+def _renamed(column, id_column, sources, names: dict):
+    """``column`` set to the planned name of each renamed source."""
+    whens = [
+        (id_column == source.id, names[source.id])
+        for source in sources
+        if names[source.id] != source.name
+    ]
+    return case(*whens, else_=column) if whens else column
+
+
+def bulk_move_folders(
+    session: Session,
+    user_id: UUID,
+    source_ids: Sequence[UUID],
+    destination_id: UUID,
+    on_conflict: OnConflict = OnConflict.fail,
+):
+    """
+    Move folders, with their subtrees, into the destination folder.
+
+    Access, cycles and name collisions are checked for all sources up front
+    and the move itself is a single UPDATE. Returns (folders, error_code)
+    where ``folders`` are the moved folders in request order, less any
+    skipped, and error_code is None or "NOT_FOUND", "PERMISSION_DENIED",
+    "INVALID_MOVE" or "FOLDER_EXISTS".
+    """
+    error = check_folder_access(session, user_id, destination_id)
+    if error:
+        return None, error
+    destination = session.get(Folder, destination_id)
+
+    ids = list(dict.fromkeys(source_ids))
+    sources = (
+        session.query(Folder)
+        .filter(
+            Folder.id.in_(ids),
+            Folder.permissions.any(
+                (FolderPermission.user_id == user_id)
+                & FolderPermission.role.in_(EDIT_ROLES)
+            ),
+        )
+        .all()
+    )
+    if len(sources) != len(ids):
+        return None, "NOT_FOUND"
+    # The destination's path lists its ancestors.
+    ancestors = set(destination.ancestor_ids)
+    if any(source.id in ancestors for source in sources):
+        return None, "INVALID_MOVE"
+
+    # Folders already in the destination stay as they are.
+    staying = {source.id for source in sources if source.parent_id == destination.id}
+    # Names are planned in request order, so renames are deterministic.
+    by_id = {source.id: source for source in sources}
+    moving = [by_id[id] for id in ids if id not in staying]
+    taken = set()
+    if moving:
+        taken = {
+            name
+            for (name,) in session.query(Folder.name).filter(
+                Folder.parent_id == destination.id,
+                _colliding(
+                    Folder.name, [source.name for source in moving], on_conflict
+                ),
+            )
+        }
+    names, error = _plan_names(moving, taken, on_conflict, "FOLDER_EXISTS")
+    if error:
+        return None, error
+    moving = [source for source in moving if source.id in names]
+
+    if moving:
+        # Each subtree swaps its old parent's path prefix for the destination's;
+        # deeper sources come first so a source moved along with one of its
+        # ancestors keeps its own prefix.
+        prefix_end = case(
+            *(
+                (
+                    Folder.path.startswith(source.path),
+                    len(source.path) - len(f"{source.id}/") + 1,
+                )
+                for source in sorted(moving, key=lambda f: len(f.path), reverse=True)
+            )
+        )
+        session.execute(
+            update(Folder)
+            .where(or_(*(Folder.path.startswith(source.path) for source in moving)))
+            .values(
+                path=literal(destination.path) + func.substr(Folder.path, prefix_end),
+                parent_id=case(
+                    (
+                        Folder.id.in_(list(names)),
+                        literal(destination.id, Folder.parent_id.type),
+                    ),
+                    else_=Folder.parent_id,
+                ),
+                name=_renamed(Folder.name, Folder.id, moving, names),
+            )
+            .execution_options(synchronize_session="fetch")
+        )
+
+    return [by_id[id] for id in ids if id in names or id in staying], None
+
+
+def bulk_move_files(
+    session: Session,
+    user_id: UUID,
+    source_ids: Sequence[UUID],
+    destination_id: UUID,
+    on_conflict: OnConflict = OnConflict.fail,
+):
+    """
+    Move files into the destination folder.
+
+    Access and name collisions are checked for all sources up front and the
+    move itself is a single UPDATE. Returns (files, error_code) where
+    ``files`` are the moved files in request order, less any skipped, and
+    error_code is None or "NOT_FOUND", "PERMISSION_DENIED" or "FILE_EXISTS".
+    """
+    error = check_folder_access(session, user_id, destination_id)
+    if error:
+        return None, error
+
+    ids = list(dict.fromkeys(source_ids))
+    sources = (
+        session.query(File)
+        .filter(
+            File.id.in_(ids),
+            File.permissions.any(
+                (FilePermission.user_id == user_id)
+                & FilePermission.role.in_(EDIT_ROLES)
+            ),
+        )
+        .all()
+    )
+    if len(sources) != len(ids):
+        return None, "NOT_FOUND"
+
+    # Files already in the destination stay as they are.
+    staying = {source.id for source in sources if source.folder_id == destination_id}
+    # Names are planned in request order, so renames are deterministic.
+    by_id = {source.id: source for source in sources}
+    moving = [by_id[id] for id in ids if id not in staying]
+    taken = set()
+    if moving:
+        taken = {
+            name
+            for (name,) in session.query(File.name).filter(
+                File.folder_id == destination_id,
+                _colliding(File.name, [source.name for source in moving], on_conflict),
+            )
+        }
+    names, error = _plan_names(moving, taken, on_conflict, "FILE_EXISTS")
+    if error:
+        return None, error
+    moving = [source for source in moving if source.id in names]
+
+    if moving:
+        session.execute(
+            update(File)
+            .where(File.id.in_(list(names)))
+            .values(
+                folder_id=destination_id,
+                name=_renamed(File.name, File.id, moving, names),
+            )
+            .execution_options(synchronize_session="fetch")
+        )
+
+    return [by_id[id] for id in ids if id in names or id in staying], None
 
 
 def move_folders(
@@ -21,22 +230,31 @@ def move_folders(
     destination_folder: Folder,
     user: User,
 ) -> List[Folder]:
-    """Move a list of folders to a new destination."""
-    moved_folders = []
-    for folder in source_folders:
-        if _is_subfolder(folder, destination_folder):
-            raise ValueError("Cannot move a folder into its own subfolder.")
-        folder.parent_id = destination_folder.id
-        moved_folders.append(folder)
-    return moved_folders
+    """
+    Move a list of folders to a new destination.
+    Wraps ``bulk_move_folders`` and raises ValueError with its error code.
+    """
+    moved, error = bulk_move_folders(
+        session,
+        user.id,
+        [folder.id for folder in source_folders],
+        destination_folder.id,
+    )
+    if error:
+        raise ValueError(error)
+    return moved
 
 
 def move_files(
     session: Session, source_files: List[File], destination_folder: Folder, user: User
 ) -> List[File]:
-    """Move a list of files to a new destination."""
-    moved_files = []
-    for file in source_files:
-        file.folder_id = destination_folder.id
-        moved_files.append(file)
-    return moved_files
+    """
+    Move a list of files to a new destination.
+    Wraps ``bulk_move_files`` and raises ValueError with its error code.
+    """
+    moved, error = bulk_move_files(
+        session, user.id, [file.id for file in source_files], destination_folder.id
+    )
+    if error:
+        raise ValueError(error)
+    return moved
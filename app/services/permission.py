@@ -1,3 +1,4 @@
+from typing import Optional
 from uuid import UUID
 from sqlalchemy.orm import Session, joinedload
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
@@ -10,6 +11,7 @@ from app.schemas.permission import (
 )
 from app.models.permission import FolderPermission, FilePermission, RoleEnum
 from app.services.user import get_user_by_email
+from app.utils.pagination import DEFAULT_PAGE_SIZE, keyset_page
 
 
 def create_folder_permission(db: Session, user_id: UUID, data: CreateFolderPermission):
@@ -335,19 +337,44 @@ def get_file_permissions_by_file_id(db: Session, user_id: UUID, file_id: UUID):
         return None, "INTERNAL_ERROR"
 
 
+def _user_file_permissions_query(db: Session, user_id: UUID):
+    return (
+        db.query(FilePermission)
+        .options(joinedload(FilePermission.file), joinedload(FilePermission.user))
+        .filter(FilePermission.user_id == user_id)
+    )
+
+
 def get_all_file_permissions(db: Session, user_id: UUID):
     try:
-        permissions = (
-            db.query(FilePermission)
-            .options(joinedload(FilePermission.file), joinedload(FilePermission.user))
-            .filter(FilePermission.user_id == user_id)
-            .all()
-        )
+        permissions = _user_file_permissions_query(db, user_id).all()
         return permissions, None
     except SQLAlchemyError:
         return None, "INTERNAL_ERROR"
 
 
+def list_file_permissions(
+    db: Session,
+    user_id: UUID,
+    after: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+):
+    """
+    One page of the user's file permissions, in id order.
+    Returns (page, error_code).
+    """
+    try:
+        return keyset_page(
+            _user_file_permissions_query(db, user_id),
+            FilePermission.id,
+            {},
+            after=after,
+            limit=limit,
+        )
+    except SQLAlchemyError:
+        return None, "INTERNAL_ERROR"
+
+
 def get_folder_permission_by_id(db: Session, user_id: UUID, permission_id: UUID):
     try:
         permission = (
@@ -402,17 +429,42 @@ def get_folder_permissions_by_folder_id(db: Session, user_id: UUID, folder_id: U
         return None, "INTERNAL_ERROR"
 
 
+def _user_folder_permissions_query(db: Session, user_id: UUID):
+    return (
+        db.query(FolderPermission)
+        .options(
+            joinedload(FolderPermission.folder),
+            joinedload(FolderPermission.user),
+        )
+        .filter(FolderPermission.user_id == user_id)
+    )
+
+
 def get_all_folder_permissions(db: Session, user_id: UUID):
     try:
-        permissions = (
-            db.query(FolderPermission)
-            .options(
-                joinedload(FolderPermission.folder),
-                joinedload(FolderPermission.user),
-            )
-            .filter(FolderPermission.user_id == user_id)
-            .all()
-        )
+        permissions = _user_folder_permissions_query(db, user_id).all()
         return permissions, None
     except SQLAlchemyError:
         return None, "INTERNAL_ERROR"
+
+
+def list_folder_permissions(
+    db: Session,
+    user_id: UUID,
+    after: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+):
+    """
+    One page of the user's folder permissions, in id order.
+    Returns (page, error_code).
+    """
+    try:
+        return keyset_page(
+            _user_folder_permissions_query(db, user_id),
+            FolderPermission.id,
+            {},
+            after=after,
+            limit=limit,
+        )
+    except SQLAlchemyError:
+        return None, "INTERNAL_ERROR"
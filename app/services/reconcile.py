@@ -0,0 +1,340 @@
+"""
+Storage reconciler.
+
+Bytes under ``MEDIA_ROOT`` can outlive their rows: uploads that fail after
+being stored, crashes between commit and unlink, and files written before
+blob reference counting existed. The reconciler walks the media tree in
+sorted order, diffs it against ``files.file`` and ``blobs.path`` in batches
+and moves unreferenced files into a quarantine directory. Quarantined files
+are purged once they have sat there for ``QUARANTINE_TTL``; files that
+something references again are restored on the next pass.
+
+Run it once or in a loop with ``python -m app.services.reconcile``.
+"""
+
+import argparse
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Iterator, Optional
+
+from sqlalchemy import select, union
+from sqlalchemy.orm import Session
+
+from app.models.blob import Blob
+from app.models.file import File
+from app.utils.helpers import MEDIA_ROOT
+
+logger = logging.getLogger(__name__)
+
+QUARANTINE_DIR = "quarantine"
+BLOBS_DIR = "blobs"
+# Top-level directories that are not referenced from the database.
+EXCLUDED_DIRS = {QUARANTINE_DIR, "thumbnails", "tmp", "uploads"}
+# Files younger than this may belong to an upload whose row is not committed.
+GRACE_PERIOD = 3600
+QUARANTINE_TTL = 7 * 24 * 3600
+BATCH_SIZE = 500
+# File operations (stat, rename, unlink) per second; 0 disables the limit.
+MAX_OPS_PER_SECOND = 200
+
+
+@dataclass
+class ReconcileReport:
+    dry_run: bool
+    scanned: int = 0
+    orphaned: list[str] = field(default_factory=list)
+    orphaned_bytes: int = 0
+    purged: list[str] = field(default_factory=list)
+    purged_bytes: int = 0
+    restored: list[str] = field(default_factory=list)
+    # Relative path to resume the walk after, None once the tree is done.
+    next_cursor: Optional[str] = None
+
+
+class Throttle:
+    """Sleep between operations to stay under ``rate`` per second."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = time.monotonic()
+
+    def wait(self) -> None:
+        if not self.interval:
+            return
+        now = time.monotonic()
+        if now < self._next:
+            time.sleep(self._next - now)
+            now = self._next
+        self._next = now + self.interval
+
+
+def walk_media(
+    root: str, cursor: Optional[str] = None, excluded=EXCLUDED_DIRS
+) -> Iterator[str]:
+    """
+    Yield the relative paths of regular files under ``root`` in sorted order,
+    starting after ``cursor``. Directories that sort entirely before the
+    cursor are not listed.
+    """
+    after = tuple(cursor.split(os.sep)) if cursor else ()
+
+    def _walk(directory: str, prefix: tuple) -> Iterator[str]:
+        try:
+            entries = sorted(os.scandir(directory), key=lambda e: e.name)
+        except FileNotFoundError:
+            return
+        for entry in entries:
+            parts = prefix + (entry.name,)
+            if not prefix and entry.name in excluded:
+                continue
+            if entry.is_dir(follow_symlinks=False):
+                if parts < after[: len(parts)]:
+                    continue
+                yield from _walk(entry.path, parts)
+            elif entry.is_file(follow_symlinks=False) and parts > after:
+                yield os.sep.join(parts)
+
+    yield from _walk(root, ())
+
+
+def _spellings(root: str, rel: str) -> set[str]:
+    """Forms a stored path to ``root/rel`` may take in the database."""
+    spellings = set()
+    for base in (root, MEDIA_ROOT):
+        path = os.path.join(base, rel)
+        spellings.update((path, os.path.abspath(path), os.path.realpath(path)))
+    return spellings
+
+
+def _relative(root: str, path: str) -> str:
+    return os.path.relpath(os.path.realpath(path), os.path.realpath(root))
+
+
+def referenced_paths(db: Session, root: str, rels: list[str]) -> set[str]:
+    """
+    Return the subset of ``rels``, paths relative to ``root``, referenced by
+    a file or blob row. Stored paths are compared after resolving both sides,
+    so a relative ``MEDIA_ROOT`` and an absolute ``--root`` still match.
+
+    Blobs are looked up by digest, the file name under ``blobs/``; legacy
+    file paths go through the ``files.file`` index.
+    """
+    if not rels:
+        return set()
+    paths = set().union(*(_spellings(root, rel) for rel in rels))
+    digests = {
+        os.path.basename(rel)
+        for rel in rels
+        if rel.split(os.sep, 1)[0] == BLOBS_DIR
+    }
+    stmt = select(File.file).where(File.file.in_(paths))
+    if digests:
+        stmt = union(stmt, select(Blob.path).where(Blob.hash.in_(digests)))
+    return {_relative(root, path) for path in db.scalars(stmt)} & set(rels)
+
+
+def _batches(iterable: Iterator[str], size: int) -> Iterator[list[str]]:
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def quarantine_orphans(
+    db: Session,
+    root: str = MEDIA_ROOT,
+    *,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    dry_run: bool = False,
+    grace_period: float = GRACE_PERIOD,
+    batch_size: int = BATCH_SIZE,
+    throttle: Optional[Throttle] = None,
+    report: Optional[ReconcileReport] = None,
+) -> ReconcileReport:
+    """
+    Move unreferenced files under ``root`` into quarantine.
+
+    At most ``limit`` files are scanned; ``report.next_cursor`` tells where to
+    resume. With ``dry_run`` nothing is moved and the report lists what would
+    have been.
+    """
+    report = report or ReconcileReport(dry_run=dry_run)
+    throttle = throttle or Throttle(MAX_OPS_PER_SECOND)
+    quarantine_root = os.path.join(root, QUARANTINE_DIR)
+    cutoff = time.time() - grace_period
+
+    walk = walk_media(root, cursor)
+    for batch in _batches(islice(walk, limit), batch_size):
+        report.scanned += len(batch)
+        report.next_cursor = batch[-1]
+
+        candidates = {}
+        for rel in batch:
+            throttle.wait()
+            try:
+                stat = os.stat(os.path.join(root, rel))
+            except FileNotFoundError:
+                continue
+            if stat.st_mtime <= cutoff:
+                candidates[rel] = stat.st_size
+
+        referenced = referenced_paths(db, root, list(candidates))
+        for rel, size in candidates.items():
+            if rel in referenced:
+                continue
+            report.orphaned.append(rel)
+            report.orphaned_bytes += size
+            if dry_run:
+                continue
+            throttle.wait()
+            target = os.path.join(quarantine_root, rel)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.replace(os.path.join(root, rel), target)
+            # The mtime records when the file entered quarantine.
+            os.utime(target)
+            logger.info("quarantined %s (%d bytes)", rel, size)
+    if next(walk, None) is None:
+        report.next_cursor = None
+    return report
+
+
+def purge_quarantine(
+    db: Session,
+    root: str = MEDIA_ROOT,
+    *,
+    dry_run: bool = False,
+    ttl: float = QUARANTINE_TTL,
+    batch_size: int = BATCH_SIZE,
+    throttle: Optional[Throttle] = None,
+    report: Optional[ReconcileReport] = None,
+) -> ReconcileReport:
+    """
+    Move quarantined files that have become referenced again back to their
+    original location, and delete the rest once they are older than ``ttl``.
+    """
+    report = report or ReconcileReport(dry_run=dry_run)
+    throttle = throttle or Throttle(MAX_OPS_PER_SECOND)
+    quarantine_root = os.path.join(root, QUARANTINE_DIR)
+    cutoff = time.time() - ttl
+
+    for batch in _batches(walk_media(quarantine_root, excluded=()), batch_size):
+        # Every quarantined file is checked, not only expired ones: a file
+        # that is referenced again must be readable now, not after the TTL.
+        referenced = referenced_paths(db, root, batch)
+        for rel in batch:
+            source = os.path.join(quarantine_root, rel)
+            path = os.path.join(root, rel)
+            if rel in referenced:
+                report.restored.append(rel)
+                if not dry_run and not os.path.exists(path):
+                    throttle.wait()
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    os.replace(source, path)
+                    logger.warning("restored referenced file %s", rel)
+                continue
+            throttle.wait()
+            try:
+                stat = os.stat(source)
+            except FileNotFoundError:
+                continue
+            if stat.st_mtime > cutoff:
+                continue
+            report.purged.append(rel)
+            report.purged_bytes += stat.st_size
+            if not dry_run:
+                throttle.wait()
+                os.remove(source)
+                logger.info("purged %s (%d bytes)", rel, stat.st_size)
+    return report
+
+
+def reconcile(
+    db: Session,
+    root: str = MEDIA_ROOT,
+    *,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    dry_run: bool = False,
+    grace_period: float = GRACE_PERIOD,
+    ttl: float = QUARANTINE_TTL,
+    batch_size: int = BATCH_SIZE,
+    max_ops_per_second: float = MAX_OPS_PER_SECOND,
+) -> ReconcileReport:
+    """Run one quarantine pass followed by a purge of expired quarantine."""
+    throttle = Throttle(max_ops_per_second)
+    report = ReconcileReport(dry_run=dry_run)
+    quarantine_orphans(
+        db,
+        root,
+        cursor=cursor,
+        limit=limit,
+        dry_run=dry_run,
+        grace_period=grace_period,
+        batch_size=batch_size,
+        throttle=throttle,
+        report=report,
+    )
+    purge_quarantine(
+        db,
+        root,
+        dry_run=dry_run,
+        ttl=ttl,
+        batch_size=batch_size,
+        throttle=throttle,
+        report=report,
+    )
+    return report
+
+
+def main(argv=None) -> None:
+    from app.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--root", default=MEDIA_ROOT)
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--limit", type=int, help="files to scan per pass")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--rate", type=float, default=MAX_OPS_PER_SECOND)
+    parser.add_argument(
+        "--interval", type=float, help="keep running, sleeping this many seconds"
+    )
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    cursor = None
+    while True:
+        with SessionLocal() as db:
+            report = reconcile(
+                db,
+                args.root,
+                cursor=cursor,
+                limit=args.limit,
+                dry_run=args.dry_run,
+                batch_size=args.batch_size,
+                max_ops_per_second=args.rate,
+            )
+        cursor = report.next_cursor
+        verb = "would quarantine" if args.dry_run else "quarantined"
+        print(
+            f"scanned {report.scanned}, {verb} {len(report.orphaned)} "
+            f"({report.orphaned_bytes} bytes), purged {len(report.purged)} "
+            f"({report.purged_bytes} bytes), restored {len(report.restored)}"
+        )
+        if args.dry_run:
+            for rel in report.orphaned:
+                print(f"  orphan: {rel}")
+        if args.interval is None:
+            break
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
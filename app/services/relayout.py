@@ -0,0 +1,218 @@
+"""
+Online migration to the sharded media layout.
+
+Moves bytes stored in the old flat layout (``media/<name>`` for files saved
+before content addressing, ``media/blobs/<digest>`` for blobs) into
+fan-out directories, a batch at a time, while the application keeps
+serving them:
+
+1. the bytes are hard-linked (or copied) to the new path,
+2. ``blobs.path`` and ``files.file`` are repointed in one transaction,
+3. the old path is unlinked after the commit.
+
+Readers holding an old path keep working until step 3, and a crash at any
+point leaves either the old or the new path valid. Rows that are already in
+place are skipped, so the tool can be interrupted and re-run.
+
+Run it with ``python -m app.services.relayout``.
+"""
+
+import argparse
+import os
+import shutil
+import time
+from dataclasses import dataclass
+from typing import Optional
+from uuid import uuid4
+
+from sqlalchemy import case, select, update
+from sqlalchemy.orm import Session
+
+from app.models.blob import Blob
+from app.models.file import File
+from app.services import storage
+from app.utils.helpers import MEDIA_ROOT
+
+# Files without a content hash are sharded by their id under this root.
+FILES_ROOT = os.path.join(MEDIA_ROOT, "files")
+BATCH_SIZE = 200
+
+
+@dataclass
+class RelayoutReport:
+    dry_run: bool
+    moved: int = 0
+    missing: int = 0
+    skipped: int = 0
+
+
+def file_path(file_id, old_path: str) -> str:
+    """New location of a file stored before content addressing."""
+    return os.path.join(
+        storage.shard_path(FILES_ROOT, str(file_id)), os.path.basename(old_path)
+    )
+
+
+def _place(old_path: str, new_path: str) -> bool:
+    """
+    Make the bytes at ``old_path`` available at ``new_path`` as well.
+    Returns False if neither path exists.
+    """
+    if os.path.exists(new_path):
+        return True
+    if not os.path.exists(old_path):
+        return False
+    os.makedirs(os.path.dirname(new_path), exist_ok=True)
+    # Unique per call, so concurrent runs never link over each other's temp.
+    tmp_path = f"{new_path}.{uuid4()}.part"
+    try:
+        os.link(old_path, tmp_path)
+    except OSError:
+        shutil.copy2(old_path, tmp_path)
+    os.replace(tmp_path, new_path)
+    return True
+
+
+def _unlink(paths) -> None:
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def _repoint_files(db: Session, moves: dict) -> None:
+    """Point every file row at an old path of ``moves`` to its new path."""
+    if moves:
+        db.execute(
+            update(File)
+            .where(File.file.in_(list(moves)))
+            .values(file=case(moves, value=File.file))
+            .execution_options(synchronize_session=False)
+        )
+
+
+def relayout_blobs(
+    db: Session, batch_size: int = BATCH_SIZE, dry_run: bool = False, report=None
+) -> RelayoutReport:
+    """Move blobs whose path is not the sharded one for their digest."""
+    report = report or RelayoutReport(dry_run=dry_run)
+    last = ""
+    while True:
+        blobs = db.scalars(
+            select(Blob)
+            .where(Blob.hash > last)
+            .order_by(Blob.hash)
+            .limit(batch_size)
+            .with_for_update()
+        ).all()
+        if not blobs:
+            break
+        last = blobs[-1].hash
+
+        moves = {}
+        for blob in blobs:
+            new_path = storage.blob_path(blob.hash)
+            if blob.path == new_path:
+                report.skipped += 1
+                continue
+            if dry_run:
+                report.moved += 1
+                continue
+            if not _place(blob.path, new_path):
+                report.missing += 1
+                continue
+            moves[blob.path] = new_path
+            blob.path = new_path
+            report.moved += 1
+        # One UPDATE per batch repoints the files of every moved blob.
+        _repoint_files(db, moves)
+        db.commit()
+        _unlink(moves)
+    return report
+
+
+def _in_files_root(path: str) -> bool:
+    root = os.path.abspath(FILES_ROOT)
+    return os.path.commonpath([os.path.abspath(path), root]) == root
+
+
+def relayout_files(
+    db: Session, batch_size: int = BATCH_SIZE, dry_run: bool = False, report=None
+) -> RelayoutReport:
+    """
+    Move files stored before content addressing into ``FILES_ROOT``. Copies
+    made before then share their source's path; every row at a moved path
+    is repointed in the same transaction, so its bytes are only unlinked
+    once nothing refers to them.
+    """
+    report = report or RelayoutReport(dry_run=dry_run)
+    last = None
+    while True:
+        stmt = (
+            select(File)
+            .where(File.content_hash.is_(None))
+            .order_by(File.id)
+            .limit(batch_size)
+            .with_for_update()
+        )
+        if last is not None:
+            stmt = stmt.where(File.id > last)
+        files = db.scalars(stmt).all()
+        if not files:
+            break
+        last = files[-1].id
+
+        moves = {}
+        for file in files:
+            if _in_files_root(file.file):
+                report.skipped += 1
+                continue
+            if file.file in moves:
+                # Shares its bytes with a file moved earlier in this batch.
+                report.moved += 1
+                continue
+            new_path = file_path(file.id, file.file)
+            if dry_run:
+                report.moved += 1
+                continue
+            if not _place(file.file, new_path):
+                report.missing += 1
+                continue
+            moves[file.file] = new_path
+            report.moved += 1
+        _repoint_files(db, moves)
+        db.commit()
+        _unlink(moves)
+    return report
+
+
+def relayout(
+    db: Session, batch_size: int = BATCH_SIZE, dry_run: bool = False
+) -> RelayoutReport:
+    report = RelayoutReport(dry_run=dry_run)
+    relayout_blobs(db, batch_size, dry_run, report)
+    relayout_files(db, batch_size, dry_run, report)
+    return report
+
+
+def main(argv: Optional[list] = None) -> None:
+    from app.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args(argv)
+
+    started = time.monotonic()
+    with SessionLocal() as db:
+        report = relayout(db, args.batch_size, args.dry_run)
+    verb = "would move" if args.dry_run else "moved"
+    print(
+        f"{verb} {report.moved}, already in place {report.skipped}, "
+        f"missing {report.missing} in {time.monotonic() - started:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
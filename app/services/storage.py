@@ -0,0 +1,322 @@
+"""
+Content-addressed blob store.
+
+Uploaded bytes are stored once under their SHA-256 digest and shared by every
+``File`` row with the same content. Services never remove bytes themselves:
+they acquire and release references, and the bytes of a blob are unlinked
+after the transaction that drops its last reference commits, unless an upload
+has just written them again.
+
+Uploads go through a single pass (``store_stream``) that sniffs the MIME type,
+hashes and counts bytes while spooling to a temp file, which is renamed into
+the store once the stream is complete.
+
+Blobs are fanned out over ``SHARD_DEPTH`` levels of subdirectories named after
+the leading characters of their digest (``blobs/ab/cd/abcd...``), so no
+directory grows past a few thousand entries.
+"""
+
+import hashlib
+import os
+import time
+from dataclasses import dataclass
+from typing import AsyncIterator, Optional
+from uuid import uuid4
+
+import magic
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from app.database import UPSERT_INSERTS
+from app.models.blob import Blob
+from app.utils.helpers import MEDIA_ROOT
+
+BLOB_ROOT = os.path.join(MEDIA_ROOT, "blobs")
+TMP_ROOT = os.path.join(MEDIA_ROOT, "tmp")
+os.makedirs(BLOB_ROOT, exist_ok=True)
+os.makedirs(TMP_ROOT, exist_ok=True)
+
+# Directory levels and characters per level of the sharded layout.
+SHARD_DEPTH = 2
+SHARD_WIDTH = 2
+
+# Writes start small so tiny uploads stay cheap and double up to the maximum
+# as long as the source keeps filling them.
+MIN_CHUNK_SIZE = 64 * 1024
+MAX_CHUNK_SIZE = 4 * 1024 * 1024
+# Leading bytes handed to libmagic.
+SNIFF_SIZE = 2048
+
+# Session.info key holding blob paths to unlink once the transaction commits.
+_PENDING_UNLINK = "storage.pending_unlink"
+# Released bytes written more recently than this (seconds) may belong to an
+# upload that stored them and has yet to take its reference; they are left to
+# the reconciler instead of being unlinked.
+UNLINK_GRACE = 15 * 60
+
+
+def shard_path(root: str, key: str) -> str:
+    """Return ``root/<k[0:2]>/<k[2:4]>/<key>`` for a hash or id ``key``."""
+    dirs = [key[i * SHARD_WIDTH : (i + 1) * SHARD_WIDTH] for i in range(SHARD_DEPTH)]
+    return os.path.join(root, *dirs, key)
+
+
+def blob_path(digest: str) -> str:
+    return shard_path(BLOB_ROOT, digest)
+
+
+def check_media_root(db: Session) -> None:
+    """
+    Refuse to run with a ``MEDIA_ROOT`` other than the one the stored paths
+    were written under. ``blobs.path`` and ``files.file`` include the root,
+    so moving the media means moving the bytes and rewriting those columns
+    together, never just changing the setting.
+    """
+    path = db.scalar(select(Blob.path).limit(1))
+    if path is None:
+        return
+    root = os.path.abspath(BLOB_ROOT)
+    if os.path.commonpath([os.path.abspath(path), root]) != root:
+        raise RuntimeError(
+            f"Stored blob {path!r} is outside {root!r}; MEDIA_ROOT has changed"
+        )
+
+
+def temp_path() -> str:
+    """Return a fresh path for an in-progress upload."""
+    return os.path.join(TMP_ROOT, f"{uuid4()}.part")
+
+
+def commit_blob(tmp_path: str, digest: str) -> str:
+    """
+    Move a fully written temp file into the store under its digest.
+
+    If the blob already exists it is atomically replaced with identical bytes,
+    so a concurrent reader never observes a partial file. The fresh mtime
+    keeps the bytes from being unlinked by a concurrent release before the
+    caller has taken its reference (see ``UNLINK_GRACE``).
+    """
+    path = blob_path(digest)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    os.replace(tmp_path, path)
+    os.utime(path)
+    return path
+
+
+class BlobTooLarge(Exception):
+    """The stream passed the size limit given to ``BlobWriter``."""
+
+
+@dataclass
+class StoredBlob:
+    path: str
+    content_hash: str
+    size: int
+    mime_type: str
+
+
+class BlobWriter:
+    """
+    Spools one upload to a temp file, hashing, counting and sniffing the
+    bytes as they are written. Blocking; callers on the event loop should
+    run ``write`` and ``commit`` in a worker thread.
+
+    ``write`` raises ``BlobTooLarge`` before the size would pass
+    ``max_size``, e.g. the uploader's remaining quota.
+    """
+
+    def __init__(self, max_size: Optional[int] = None):
+        self.tmp_path = temp_path()
+        self.max_size = max_size
+        self.size = 0
+        self.mime_type: Optional[str] = None
+        self._out = open(self.tmp_path, "wb", buffering=0)
+        self._digest = hashlib.sha256()
+        self._head = b""
+
+    def write(self, data: bytes) -> None:
+        if self.max_size is not None and self.size + len(data) > self.max_size:
+            raise BlobTooLarge(self.max_size)
+        if self.mime_type is None:
+            self._head += data[: SNIFF_SIZE - len(self._head)]
+            if len(self._head) >= SNIFF_SIZE:
+                self.mime_type = magic.from_buffer(self._head, mime=True)
+        self._digest.update(data)
+        self._out.write(data)
+        self.size += len(data)
+
+    def commit(self) -> StoredBlob:
+        """Close the temp file and move it into the store under its digest."""
+        self._out.close()
+        if self.mime_type is None:
+            self.mime_type = magic.from_buffer(self._head, mime=True)
+        content_hash = self._digest.hexdigest()
+        return StoredBlob(
+            path=commit_blob(self.tmp_path, content_hash),
+            content_hash=content_hash,
+            size=self.size,
+            mime_type=self.mime_type,
+        )
+
+    def abort(self) -> None:
+        self._out.close()
+        try:
+            os.remove(self.tmp_path)
+        except OSError:
+            pass
+
+
+async def coalesce(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """
+    Regroup an async byte stream into buffers of adaptive size, so blocking
+    writes are handed to a worker thread a few large buffers at a time
+    instead of one tiny network read at a time.
+    """
+    buffer = bytearray()
+    target = MIN_CHUNK_SIZE
+    async for chunk in chunks:
+        buffer += chunk
+        if len(buffer) >= target:
+            yield bytes(buffer)
+            buffer.clear()
+            target = min(target * 2, MAX_CHUNK_SIZE)
+    if buffer:
+        yield bytes(buffer)
+
+
+async def store_stream(
+    chunks: AsyncIterator[bytes], max_size: Optional[int] = None
+) -> StoredBlob:
+    """
+    Write an async stream of byte chunks into the store in a single pass.
+    The temp file is removed if the stream fails part-way or passes
+    ``max_size`` bytes (``BlobTooLarge``).
+    """
+    writer = BlobWriter(max_size)
+    try:
+        async for data in coalesce(chunks):
+            await run_in_threadpool(writer.write, data)
+        return await run_in_threadpool(writer.commit)
+    except BaseException:
+        writer.abort()
+        raise
+
+
+async def iter_upload(file) -> AsyncIterator[bytes]:
+    """Read an ``UploadFile`` with read sizes that grow while reads stay full."""
+    chunk_size = MIN_CHUNK_SIZE
+    while chunk := await file.read(chunk_size):
+        yield chunk
+        if len(chunk) == chunk_size:
+            chunk_size = min(chunk_size * 2, MAX_CHUNK_SIZE)
+
+
+def acquire_blob(db: Session, digest: str, size: int = 0, refs: int = 1) -> Blob:
+    """
+    Add ``refs`` references to the blob with the given digest, registering it
+    if these are the first. Must be called in the same transaction that
+    inserts the referencing ``File`` rows.
+    """
+    path = blob_path(digest)
+    # The blob may have been released earlier in this transaction.
+    db.info.get(_PENDING_UNLINK, set()).discard(path)
+
+    blob = db.identity_map.get(db.identity_key(Blob, digest))
+    if blob is not None:
+        if blob in db.deleted:
+            db.add(blob)
+        blob.ref_count += refs
+        return blob
+
+    insert = UPSERT_INSERTS.get(db.get_bind().dialect.name)
+    if insert is None:
+        blob = db.get(Blob, digest, with_for_update=True)
+        if blob is None:
+            blob = Blob(hash=digest, path=path, size=size, ref_count=0)
+            db.add(blob)
+            # Sessions do not autoflush; make the row visible to later calls.
+            db.flush([blob])
+        blob.ref_count += refs
+        return blob
+
+    # Concurrent first references of the same digest add up instead of
+    # failing on the primary key.
+    stmt = (
+        insert(Blob)
+        .values(hash=digest, path=path, size=size, ref_count=refs)
+        .on_conflict_do_update(
+            index_elements=[Blob.hash], set_={"ref_count": Blob.ref_count + refs}
+        )
+        .returning(Blob)
+    )
+    return db.scalars(stmt).one()
+
+
+def release_blob(db: Session, digest: Optional[str]) -> None:
+    """
+    Drop a reference to a blob. When the last reference goes away the row is
+    deleted and its bytes are scheduled for removal after commit.
+    """
+    if not digest:
+        return
+    blob = db.get(Blob, digest, with_for_update=True)
+    if blob is None:
+        return
+    blob.ref_count -= 1
+    if blob.ref_count <= 0:
+        db.info.setdefault(_PENDING_UNLINK, set()).add(blob.path)
+        db.delete(blob)
+
+
+def discard_blob(db: Session, digest: Optional[str], path: str) -> None:
+    """
+    Remove the stored bytes of an upload that ended up unreferenced, e.g.
+    because creating its file failed. Bytes a blob row refers to are kept,
+    as are bytes a concurrent upload of the same content has just written
+    and not referenced yet (see ``_unlink_blob``). Call once the failed
+    transaction has been rolled back.
+    """
+    if not digest or db.get(Blob, digest) is not None:
+        return
+    try:
+        _unlink_blob(path)
+    except OSError:
+        pass
+
+
+def _unlink_blob(path: str) -> None:
+    """Remove released bytes unless an upload has just written them again."""
+    doomed = temp_path()
+    try:
+        # Take the file out of the store first so a concurrent upload that
+        # replaces it after the check below is not lost.
+        os.replace(path, doomed)
+    except OSError:
+        return
+    if time.time() - os.stat(doomed).st_mtime < UNLINK_GRACE:
+        # Content-addressed, so putting it back cannot clobber other bytes.
+        os.replace(doomed, path)
+    else:
+        os.remove(doomed)
+
+
+@event.listens_for(Session, "after_commit")
+def _unlink_released_blobs(session: Session) -> None:
+    # Thumbnails import this module.
+    from app.services.thumbnail import remove_thumbnails
+
+    for path in session.info.pop(_PENDING_UNLINK, ()):
+        # Blob files are named after their digest, as are their thumbnails.
+        remove_thumbnails(os.path.basename(path))
+        try:
+            _unlink_blob(path)
+        except OSError:
+            # Nothing references the bytes any more; a failed unlink only
+            # leaks disk space until the reconciler finds it.
+            pass
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_released_blobs(session: Session, previous_transaction) -> None:
+    session.info.pop(_PENDING_UNLINK, None)
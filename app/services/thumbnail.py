@@ -0,0 +1,156 @@
+"""
+Persistent thumbnail store.
+
+Thumbnails are rendered once per (content, size, format) and kept on disk
+under ``THUMBNAIL_ROOT/<ab>/<cd>/<key>/<size>.<format>``, where the key is
+the file's content hash (or its id for files stored before content
+addressing). Files that share bytes therefore share thumbnails. Presets are
+pre-rendered by a background job queued with the upload; on-demand rendering
+runs in the image processing pool, never on the event loop. The image's
+dimensions and EXIF are extracted by a second job into ``metadata.json``
+next to the thumbnails. Thumbnails and metadata of a content hash are
+removed with its blob, when the last reference goes.
+"""
+
+import json
+import os
+import shutil
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from app.services.jobs import PRIORITY_HIGH, enqueue
+from app.services.storage import shard_path
+from app.utils.helpers import MEDIA_ROOT
+from app.utils.imaging import (
+    ImageProcessorBusy,
+    extract_image_metadata,
+    image_processor,
+    render_thumbnail,
+)
+
+THUMBNAIL_ROOT = os.path.join(MEDIA_ROOT, "thumbnails")
+os.makedirs(THUMBNAIL_ROOT, exist_ok=True)
+
+THUMBNAIL_SIZES = {
+    "small": (128, 128),
+    "medium": (256, 256),
+    "large": (1024, 1024),
+}
+THUMBNAIL_FORMATS = {
+    "png": ("PNG", "image/png"),
+    "webp": ("WEBP", "image/webp"),
+    "jpeg": ("JPEG", "image/jpeg"),
+}
+DEFAULT_SIZE = "small"
+DEFAULT_FORMAT = "png"
+# Presets rendered right after upload.
+PREGENERATED = [(size, DEFAULT_FORMAT) for size in THUMBNAIL_SIZES]
+METADATA_NAME = "metadata.json"
+
+
+def is_thumbnailable(mime_type: Optional[str]) -> bool:
+    return bool(mime_type) and mime_type.startswith("image/")
+
+
+def thumbnail_key(file) -> str:
+    return file.content_hash or str(file.id)
+
+
+def thumbnail_path(key: str, size: str, fmt: str) -> str:
+    return os.path.join(shard_path(THUMBNAIL_ROOT, key), f"{size}.{fmt}")
+
+
+def metadata_path(key: str) -> str:
+    return os.path.join(shard_path(THUMBNAIL_ROOT, key), METADATA_NAME)
+
+
+def remove_thumbnails(key: str) -> None:
+    """Delete every rendered thumbnail and the metadata of ``key``."""
+    shutil.rmtree(shard_path(THUMBNAIL_ROOT, key), ignore_errors=True)
+
+
+def _render_args(source_path: str, key: str, size: str, fmt: str) -> tuple:
+    return (
+        source_path,
+        thumbnail_path(key, size, fmt),
+        THUMBNAIL_SIZES[size],
+        THUMBNAIL_FORMATS[fmt][0],
+    )
+
+
+def get_or_create_thumbnail(source_path: str, key: str, size: str, fmt: str) -> str:
+    """Render a thumbnail in the calling process if it is not cached yet."""
+    path = thumbnail_path(key, size, fmt)
+    if not os.path.exists(path):
+        render_thumbnail(*_render_args(source_path, key, size, fmt))
+    return path
+
+
+async def ensure_thumbnail(file, size: str, fmt: str):
+    """
+    Return the path of the requested thumbnail, rendering it in the image
+    processing pool on a cache miss. Returns (path, error) where error is
+    None, "BUSY" when the pool queue is full, or the rendering error.
+    """
+    key = thumbnail_key(file)
+    path = thumbnail_path(key, size, fmt)
+    if os.path.exists(path):
+        return path, None
+    try:
+        await image_processor.run(
+            render_thumbnail, *_render_args(file.file, key, size, fmt)
+        )
+    except ImageProcessorBusy:
+        return None, "BUSY"
+    except Exception as e:
+        return None, str(e)
+    return path, None
+
+
+async def ensure_image_metadata(file):
+    """
+    Return the extracted metadata of an image, extracting it in the image
+    processing pool if the background job has not run yet. Returns
+    (metadata, error) where error is None, "BUSY" or the extraction error.
+    """
+    path = metadata_path(thumbnail_key(file))
+    try:
+        with open(path) as f:
+            return json.load(f), None
+    except FileNotFoundError:
+        pass
+    try:
+        metadata = await image_processor.run(extract_image_metadata, file.file, path)
+    except ImageProcessorBusy:
+        return None, "BUSY"
+    except Exception as e:
+        return None, str(e)
+    return metadata, None
+
+
+def schedule_post_processing(db: Session, file) -> None:
+    """
+    Queue the jobs processing a freshly stored image: rendering the preset
+    thumbnails and extracting its metadata. Call it in the transaction that
+    stores the file; anything not done yet when it is first requested is
+    produced on demand instead.
+    """
+    if not is_thumbnailable(file.mime_type):
+        return
+    key = thumbnail_key(file)
+    targets = [
+        list(_render_args(file.file, key, size, fmt)[1:])
+        for size, fmt in PREGENERATED
+        if not os.path.exists(thumbnail_path(key, size, fmt))
+    ]
+    if targets:
+        enqueue(
+            db,
+            "thumbnails",
+            [file.file, targets],
+            key=f"thumbnails:{key}",
+            priority=PRIORITY_HIGH,
+        )
+    if not os.path.exists(metadata_path(key)):
+        enqueue(db, "metadata", [file.file, metadata_path(key)], key=f"metadata:{key}")
@@ -0,0 +1,213 @@
+"""
+Resumable, chunked upload sessions.
+
+A session fixes the total size and chunk size up front. Chunks may arrive in
+any order and in parallel; each one is written to a temp file and renamed to
+its index once complete, so the set of files in the session directory is
+exactly the set of received chunks. Completing a session streams the chunks
+in order through the blob store and creates the ``File``.
+"""
+
+import os
+import shutil
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, List, Optional
+from uuid import UUID, uuid4
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models.upload_session import UploadSession
+from app.schemas.file import CreateFile
+from app.schemas.upload import UploadSessionCreate
+from app.services.file import check_folder_access, create_file, file_extension
+from app.services.storage import MAX_CHUNK_SIZE, coalesce, store_stream
+from app.services.usage import check_quota
+from app.utils.helpers import MEDIA_ROOT
+
+UPLOAD_ROOT = os.path.join(MEDIA_ROOT, "uploads")
+os.makedirs(UPLOAD_ROOT, exist_ok=True)
+
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+MIN_CHUNK_SIZE = 256 * 1024
+MAX_CHUNK_SIZE_LIMIT = 64 * 1024 * 1024
+SESSION_TTL = timedelta(hours=24)
+
+
+def session_dir(upload_id: UUID) -> str:
+    return os.path.join(UPLOAD_ROOT, str(upload_id))
+
+
+def chunk_path(upload_id: UUID, index: int) -> str:
+    return os.path.join(session_dir(upload_id), str(index))
+
+
+def create_upload_session(db: Session, user_id: UUID, data: UploadSessionCreate):
+    """
+    Open a new upload session.
+    Returns (session, error_code) where error_code is None, "NOT_FOUND",
+    "PERMISSION_DENIED", "QUOTA_EXCEEDED" or "INVALID_CHUNK_SIZE".
+    """
+    chunk_size = data.chunk_size or DEFAULT_CHUNK_SIZE
+    if not MIN_CHUNK_SIZE <= chunk_size <= MAX_CHUNK_SIZE_LIMIT:
+        return None, "INVALID_CHUNK_SIZE"
+
+    error = check_folder_access(db, user_id, data.folder_id) or check_quota(
+        db, user_id, data.size
+    )
+    if error:
+        return None, error
+
+    purge_expired_upload_sessions(db)
+
+    upload = UploadSession(
+        user_id=user_id,
+        folder_id=data.folder_id,
+        name=data.name,
+        size=data.size,
+        chunk_size=chunk_size,
+        expires_at=datetime.now(timezone.utc) + SESSION_TTL,
+    )
+    db.add(upload)
+    db.commit()
+    db.refresh(upload)
+    os.makedirs(session_dir(upload.id), exist_ok=True)
+    return upload, None
+
+
+def get_upload_session(db: Session, user_id: UUID, id: UUID):
+    """
+    Get the user's upload session.
+    Returns (session, error_code) where error_code is None, "NOT_FOUND" or "EXPIRED".
+    """
+    upload = (
+        db.query(UploadSession)
+        .filter(UploadSession.id == id, UploadSession.user_id == user_id)
+        .first()
+    )
+    if not upload:
+        return None, "NOT_FOUND"
+    if upload.is_expired:
+        return None, "EXPIRED"
+    return upload, None
+
+
+async def get_upload_session_async(db: AsyncSession, user_id: UUID, id: UUID):
+    """``get_upload_session`` on an ``AsyncSession``."""
+    upload = await db.scalar(
+        select(UploadSession).where(
+            UploadSession.id == id, UploadSession.user_id == user_id
+        )
+    )
+    if not upload:
+        return None, "NOT_FOUND"
+    if upload.is_expired:
+        return None, "EXPIRED"
+    return upload, None
+
+
+def received_chunks(upload: UploadSession) -> List[int]:
+    """Indexes of the chunks that have been fully written."""
+    try:
+        names = os.listdir(session_dir(upload.id))
+    except FileNotFoundError:
+        return []
+    return sorted(int(name) for name in names if name.isdigit())
+
+
+async def write_chunk(
+    upload: UploadSession, index: int, chunks: AsyncIterator[bytes]
+) -> Optional[str]:
+    """
+    Store chunk ``index`` of the session from a byte stream. Re-sending a
+    chunk replaces it. Returns None or "INVALID_CHUNK" if the index is out of
+    range or the body does not have the expected length.
+    """
+    if not 0 <= index < upload.chunk_count:
+        return "INVALID_CHUNK"
+    expected = upload.chunk_length(index)
+
+    directory = session_dir(upload.id)
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = os.path.join(directory, f"{index}.{uuid4()}.part")
+    written = 0
+    out = open(tmp_path, "wb", buffering=0)
+    try:
+        async for data in coalesce(chunks):
+            written += len(data)
+            if written > expected:
+                break
+            await run_in_threadpool(out.write, data)
+    except BaseException:
+        out.close()
+        os.remove(tmp_path)
+        raise
+    out.close()
+
+    if written != expected:
+        os.remove(tmp_path)
+        return "INVALID_CHUNK"
+    os.replace(tmp_path, chunk_path(upload.id, index))
+    return None
+
+
+async def _read_chunks(upload: UploadSession) -> AsyncIterator[bytes]:
+    for index in range(upload.chunk_count):
+        with open(chunk_path(upload.id, index), "rb") as f:
+            while data := await run_in_threadpool(f.read, MAX_CHUNK_SIZE):
+                yield data
+
+
+async def complete_upload_session(db: Session, upload: UploadSession):
+    """
+    Assemble the received chunks into a ``File`` and close the session.
+    Returns (file, error_code); "INCOMPLETE" if chunks are still missing,
+    otherwise the error codes of ``create_file``. On error the session is
+    kept so the client can retry.
+    """
+    if len(received_chunks(upload)) != upload.chunk_count:
+        return None, "INCOMPLETE"
+
+    blob = await store_stream(_read_chunks(upload))
+    file, error = await run_in_threadpool(
+        create_file,
+        db,
+        upload.user_id,
+        CreateFile(
+            name=upload.name,
+            folder_id=upload.folder_id,
+            file=blob.path,
+            mime_type=blob.mime_type,
+            ext=file_extension(upload.name),
+            size=blob.size,
+            content_hash=blob.content_hash,
+        ),
+    )
+    if error:
+        return None, error
+
+    await run_in_threadpool(delete_upload_session, db, upload)
+    return file, None
+
+
+def delete_upload_session(db: Session, upload: UploadSession) -> None:
+    shutil.rmtree(session_dir(upload.id), ignore_errors=True)
+    db.delete(upload)
+    db.commit()
+
+
+def purge_expired_upload_sessions(db: Session) -> int:
+    """Delete expired sessions and their chunks. Returns the number purged."""
+    expired = (
+        db.query(UploadSession)
+        .filter(UploadSession.expires_at < datetime.now(timezone.utc))
+        .all()
+    )
+    for upload in expired:
+        shutil.rmtree(session_dir(upload.id), ignore_errors=True)
+        db.delete(upload)
+    if expired:
+        db.commit()
+    return len(expired)
@@ -0,0 +1,167 @@
+"""
+Per-user storage usage and quotas.
+
+``user_usage`` holds the total size and number of the files each user owns.
+Every service that creates or deletes files adjusts it with ``add_usage`` in
+the same transaction, so reading usage or checking a quota never sums over
+``files``. ``reconcile_usage`` recomputes the counters from the file table to
+repair drift, e.g. from rows removed outside the services.
+
+Run the reconciliation once or in a loop with ``python -m app.services.usage``.
+"""
+
+import argparse
+import logging
+import time
+from typing import Optional
+from uuid import UUID
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.database import UPSERT_INSERTS
+from app.models.file import File
+from app.models.permission import FilePermission, RoleEnum
+from app.models.user_usage import UserUsage
+
+logger = logging.getLogger(__name__)
+
+
+def get_usage(db: Session, user_id: UUID) -> UserUsage:
+    """Return the user's counters; users without files get an unsaved zero row."""
+    usage = db.get(UserUsage, user_id)
+    if usage is None:
+        usage = UserUsage(user_id=user_id, used_bytes=0, file_count=0)
+    return usage
+
+
+def quota_for(usage: UserUsage) -> Optional[int]:
+    if usage.quota_bytes is not None:
+        return usage.quota_bytes
+    return settings.STORAGE_QUOTA_BYTES
+
+
+def remaining_quota(db: Session, user_id: UUID) -> Optional[int]:
+    """Bytes the user may still store, or None when there is no quota."""
+    usage = get_usage(db, user_id)
+    quota = quota_for(usage)
+    if quota is None:
+        return None
+    return max(quota - usage.used_bytes, 0)
+
+
+def check_quota(db: Session, user_id: UUID, size: int) -> Optional[str]:
+    """Return "QUOTA_EXCEEDED" if ``size`` more bytes do not fit the quota."""
+    remaining = remaining_quota(db, user_id)
+    if remaining is not None and size > remaining:
+        return "QUOTA_EXCEEDED"
+    return None
+
+
+def add_usage(db: Session, user_id: UUID, size: int, files: int = 1) -> UserUsage:
+    """
+    Adjust the user's counters by ``size`` bytes and ``files`` files (negative
+    to release). Must be called in the transaction that writes the files.
+    """
+    usage = db.identity_map.get(db.identity_key(UserUsage, user_id))
+    insert = UPSERT_INSERTS.get(db.get_bind().dialect.name)
+    if usage is not None or insert is None:
+        usage = db.get(UserUsage, user_id, with_for_update=True)
+        if usage is None:
+            usage = UserUsage(user_id=user_id, used_bytes=0, file_count=0)
+            db.add(usage)
+            # Make the row visible to db.get for later calls in this transaction.
+            db.flush()
+        usage.used_bytes += size
+        usage.file_count += files
+        return usage
+
+    # Concurrent first uploads of a user add up instead of failing on the
+    # primary key.
+    stmt = (
+        insert(UserUsage)
+        .values(user_id=user_id, used_bytes=size, file_count=files)
+        .on_conflict_do_update(
+            index_elements=[UserUsage.user_id],
+            set_={
+                "used_bytes": UserUsage.used_bytes + size,
+                "file_count": UserUsage.file_count + files,
+            },
+        )
+        .returning(UserUsage)
+    )
+    return db.scalars(stmt).one()
+
+
+def owned_usage(*where):
+    """Select (user_id, bytes, files) per owner over files matching ``where``."""
+    return (
+        select(
+            FilePermission.user_id,
+            func.coalesce(func.sum(File.size), 0),
+            func.count(File.id),
+        )
+        .join(FilePermission, FilePermission.file_id == File.id)
+        .where(FilePermission.role == RoleEnum.owner, *where)
+        .group_by(FilePermission.user_id)
+    )
+
+
+def reconcile_usage(db: Session) -> int:
+    """
+    Recompute every user's counters from the file table and commit. Counter
+    rows are locked first, so concurrent ``add_usage`` calls wait instead of
+    being overwritten. Returns the number of users whose counters changed.
+    """
+    usages = {
+        usage.user_id: usage
+        for usage in db.query(UserUsage).with_for_update().order_by(UserUsage.user_id)
+    }
+    totals = {
+        user_id: (size, count) for user_id, size, count in db.execute(owned_usage())
+    }
+    changed = 0
+    for user_id in usages.keys() | totals.keys():
+        size, count = totals.get(user_id, (0, 0))
+        usage = usages.get(user_id)
+        if usage is None:
+            usage = UserUsage(user_id=user_id, used_bytes=0, file_count=0)
+            db.add(usage)
+        if (usage.used_bytes, usage.file_count) != (size, count):
+            logger.info(
+                "usage of %s: %s bytes / %s files, recorded %s / %s",
+                user_id,
+                size,
+                count,
+                usage.used_bytes,
+                usage.file_count,
+            )
+            usage.used_bytes = size
+            usage.file_count = count
+            changed += 1
+    db.commit()
+    return changed
+
+
+def main(argv=None) -> None:
+    from app.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--interval", type=float, help="keep running, sleeping this many seconds"
+    )
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    while True:
+        with SessionLocal() as db:
+            changed = reconcile_usage(db)
+        print(f"corrected usage of {changed} users")
+        if args.interval is None:
+            break
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
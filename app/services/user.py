@@ -1,6 +1,9 @@
 from typing import Optional
 from uuid import UUID
 from fastapi import HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
 
@@ -41,6 +44,29 @@ def get_user_by_sub(sub: Optional[str], db: Session):
     return user
 
 
+async def get_user_by_sub_async(sub: Optional[str], db: AsyncSession):
+    user = await db.scalar(select(User).where(User.id == UUID(sub)))
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found",
+        )
+    return user
+
+
+async def authenticate_user_async(
+    email: str, password: str, db: AsyncSession
+) -> Optional[User]:
+    """
+    Return the user with these credentials, or None. The password hash is
+    checked in a worker thread so bcrypt does not stall the event loop.
+    """
+    user = await db.scalar(select(User).where(User.email == email))
+    if not user or not await run_in_threadpool(verify_hash, password, user.password):
+        return None
+    return user
+
+
 def get_user_by_email(email: str, db: Session):
     user = db.query(User).filter(User.email == email).first()
     if not user:
@@ -70,3 +96,24 @@ def change_password(sub: Optional[str], data: UserPasswordChange, db: Session):
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Internal Server Error",
         )
+
+
+async def change_password_async(
+    sub: Optional[str], data: UserPasswordChange, db: AsyncSession
+):
+    user = await get_user_by_sub_async(sub, db)
+    if not await run_in_threadpool(verify_hash, data.old_password, user.password):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid credentials",
+        )
+    user.password = await run_in_threadpool(get_hash, data.new_password)
+    try:
+        await db.commit()
+        return {"message": "Password changed successfully"}
+    except SQLAlchemyError:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Internal Server Error",
+        )
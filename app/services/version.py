@@ -0,0 +1,301 @@
+"""
+File version history.
+
+The current content of a file is always a full blob, so downloads, ranges
+and thumbnails do not change. When a new version is uploaded the previous
+one is demoted: its content is split into content-defined chunks (see
+``app.services.chunks``), only chunks the store does not hold yet are
+written, and its full blob reference is released. Old versions are read
+back by streaming their chunks in order.
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import Iterator, Optional
+from uuid import UUID
+
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.models.blob import Blob
+from app.models.file import File
+from app.models.file_version import FileVersion, FileVersionChunk
+from app.models.permission import FilePermission, RoleEnum
+from app.services.chunks import acquire_chunks, iter_chunk_files, write_chunks
+from app.services.storage import (
+    StoredBlob,
+    acquire_blob,
+    discard_blob,
+    release_blob,
+)
+from app.services.thumbnail import schedule_post_processing
+from app.services.usage import add_usage, check_quota, remaining_quota
+
+# Retention: the newest MAX_VERSIONS versions are kept, older ones only while
+# they are younger than VERSION_MAX_AGE.
+MAX_VERSIONS = 10
+VERSION_MAX_AGE = timedelta(days=30)
+
+
+def _current_version(db: Session, file: File) -> FileVersion:
+    """Return the version row of the current content, creating it if needed."""
+    version = (
+        db.query(FileVersion)
+        .filter(FileVersion.file_id == file.id)
+        .order_by(FileVersion.number.desc())
+        .first()
+    )
+    if version is None:
+        version = FileVersion(
+            file_id=file.id,
+            number=1,
+            content_hash=file.content_hash,
+            size=file.size,
+            mime_type=file.mime_type,
+            created_at=file.updated_at or file.created_at,
+        )
+        db.add(version)
+        db.flush()
+    return version
+
+
+def _release_chunks(db: Session, version: FileVersion) -> None:
+    for chunk in version.chunks:
+        release_blob(db, chunk.chunk_hash)
+
+
+def _file_owner(db: Session, file_id: UUID) -> Optional[UUID]:
+    return (
+        db.query(FilePermission.user_id)
+        .filter(
+            FilePermission.file_id == file_id, FilePermission.role == RoleEnum.owner
+        )
+        .scalar()
+    )
+
+
+def check_version_upload(db: Session, user_id: UUID, file_id: UUID, size: int):
+    """
+    Check that the user may replace the file's content with ``size`` bytes
+    before any are stored. Returns (max_size, error_code): the largest
+    content that still fits the owner's quota (None when unlimited), and
+    None, "NOT_FOUND", "PERMISSION_DENIED" or "QUOTA_EXCEEDED".
+    """
+    file = db.get(File, file_id)
+    if not file:
+        return None, "NOT_FOUND"
+    permission = (
+        db.query(FilePermission)
+        .filter(
+            FilePermission.file_id == file_id,
+            FilePermission.user_id == user_id,
+            FilePermission.role.in_([RoleEnum.owner, RoleEnum.editor]),
+        )
+        .first()
+    )
+    if not permission:
+        return None, "PERMISSION_DENIED"
+    owner_id = _file_owner(db, file_id)
+    remaining = remaining_quota(db, owner_id) if owner_id else None
+    if remaining is None:
+        return None, None
+    # The new content replaces the current one in the owner's usage.
+    max_size = remaining + file.size
+    if size > max_size:
+        return max_size, "QUOTA_EXCEEDED"
+    return max_size, None
+
+
+def add_file_version(db: Session, user_id: UUID, file_id: UUID, blob: StoredBlob):
+    """
+    Make ``blob`` the current content of the file, keeping the previous
+    content as a chunked version. The size difference is charged to the
+    file's owner. Returns (file, error_code) where error_code is None,
+    "NOT_FOUND", "PERMISSION_DENIED", "QUOTA_EXCEEDED" or "INTERNAL_ERROR".
+    On error the bytes of ``blob`` are removed unless something references
+    them.
+
+    The current content is chunked before the file row is locked, so the
+    lock is only held for the database work.
+    """
+    chunked = _chunk_current(db, user_id, file_id, blob)
+    file, error = _add_file_version(db, user_id, file_id, blob, chunked)
+    if error:
+        discard_blob(db, blob.content_hash, blob.path)
+    return file, error
+
+
+def _chunk_current(db: Session, user_id: UUID, file_id: UUID, blob: StoredBlob):
+    """
+    Chunk the content ``blob`` would replace, without holding any lock.
+    Returns (content_hash, manifest), or None if there is nothing to chunk
+    or it failed; ``_add_file_version`` then chunks under the lock instead.
+    """
+    current = (
+        db.query(File.file, File.content_hash)
+        .join(FilePermission, FilePermission.file_id == File.id)
+        .filter(
+            File.id == file_id,
+            FilePermission.user_id == user_id,
+            FilePermission.role.in_([RoleEnum.owner, RoleEnum.editor]),
+        )
+        .first()
+    )
+    # Do not keep the read transaction open while chunking.
+    db.commit()
+    if current is None or current.content_hash == blob.content_hash:
+        return None
+    try:
+        return current.content_hash, write_chunks(current.file)
+    except OSError:
+        return None
+
+
+def _add_file_version(
+    db: Session, user_id: UUID, file_id: UUID, blob: StoredBlob, chunked=None
+):
+    file = db.get(File, file_id, with_for_update=True)
+    if not file:
+        return None, "NOT_FOUND"
+    permission = (
+        db.query(FilePermission)
+        .filter(
+            FilePermission.file_id == file_id,
+            FilePermission.user_id == user_id,
+            FilePermission.role.in_([RoleEnum.owner, RoleEnum.editor]),
+        )
+        .first()
+    )
+    if not permission:
+        return None, "PERMISSION_DENIED"
+    if blob.content_hash == file.content_hash:
+        return file, None
+    owner_id = _file_owner(db, file_id)
+    growth = blob.size - file.size
+    if owner_id and growth > 0 and check_quota(db, owner_id, growth):
+        return None, "QUOTA_EXCEEDED"
+
+    try:
+        previous = _current_version(db, file)
+        if chunked is not None and chunked[0] == file.content_hash:
+            manifest = chunked[1]
+        else:
+            # Another version landed since the content was chunked.
+            manifest = write_chunks(file.file)
+        acquire_chunks(db, manifest)
+        for position, (digest, size) in enumerate(manifest):
+            previous.chunks.append(
+                FileVersionChunk(position=position, chunk_hash=digest, size=size)
+            )
+        acquire_blob(db, blob.content_hash, blob.size)
+        release_blob(db, file.content_hash)
+        if owner_id:
+            add_usage(db, owner_id, growth, 0)
+
+        file.file = blob.path
+        file.content_hash = blob.content_hash
+        file.size = blob.size
+        file.mime_type = blob.mime_type
+        db.add(
+            FileVersion(
+                file_id=file.id,
+                number=previous.number + 1,
+                content_hash=blob.content_hash,
+                size=blob.size,
+                mime_type=blob.mime_type,
+            )
+        )
+        db.flush()
+        prune_versions(db, file.id)
+        schedule_post_processing(db, file)
+        db.commit()
+    except (OSError, SQLAlchemyError):
+        db.rollback()
+        return None, "INTERNAL_ERROR"
+
+    db.refresh(file)
+    return file, None
+
+
+def prune_versions(
+    db: Session,
+    file_id: UUID,
+    keep: int = MAX_VERSIONS,
+    max_age: timedelta = VERSION_MAX_AGE,
+) -> int:
+    """
+    Delete versions outside the retention policy and release their chunks.
+    The current version is never pruned. Returns the number deleted.
+    """
+    versions = (
+        db.query(FileVersion)
+        .filter(FileVersion.file_id == file_id)
+        .order_by(FileVersion.number.desc())
+        .all()
+    )
+    cutoff = datetime.now(timezone.utc) - max_age
+    pruned = 0
+    for index, version in enumerate(versions[1:], start=1):
+        created_at = version.created_at
+        if created_at is not None and created_at.tzinfo is None:
+            created_at = created_at.replace(tzinfo=timezone.utc)
+        if index < keep or (created_at is not None and created_at >= cutoff):
+            continue
+        _release_chunks(db, version)
+        db.delete(version)
+        pruned += 1
+    return pruned
+
+
+def release_file_versions(db: Session, file: File) -> None:
+    """Drop the chunk references of every version of a file being deleted."""
+    for version in file.versions:
+        _release_chunks(db, version)
+
+
+def get_file_versions(db: Session, user_id: UUID, file_id: UUID):
+    """
+    List a file's versions, newest first. Returns (versions, error_code).
+    """
+    permission = (
+        db.query(FilePermission)
+        .filter(FilePermission.file_id == file_id, FilePermission.user_id == user_id)
+        .first()
+    )
+    if not permission:
+        return None, "NOT_FOUND"
+    versions = (
+        db.query(FileVersion)
+        .filter(FileVersion.file_id == file_id)
+        .order_by(FileVersion.number.desc())
+        .all()
+    )
+    return versions, None
+
+
+def get_file_version(db: Session, user_id: UUID, file_id: UUID, number: int):
+    versions, error = get_file_versions(db, user_id, file_id)
+    if error:
+        return None, error
+    version = next((v for v in versions if v.number == number), None)
+    if version is None:
+        return None, "NOT_FOUND"
+    return version, None
+
+
+def iter_version_content(db: Session, version: FileVersion) -> Iterator[bytes]:
+    """
+    Stream the content of a version. Chunk paths are resolved up front so
+    the generator does not need the session while the response is sent.
+    """
+    if not version.chunks:
+        file = db.get(File, version.file_id)
+        paths = [file.file]
+    else:
+        paths = [
+            path
+            for (path,) in db.query(Blob.path)
+            .join(FileVersionChunk, FileVersionChunk.chunk_hash == Blob.hash)
+            .filter(FileVersionChunk.version_id == version.id)
+            .order_by(FileVersionChunk.position)
+        ]
+    return iter_chunk_files(paths)
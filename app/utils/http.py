@@ -0,0 +1,176 @@
+import os
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Mapping, Optional
+from urllib.parse import quote
+
+from fastapi import HTTPException, Request, Response, status
+from fastapi.responses import FileResponse, StreamingResponse
+
+from app.core.config import settings
+from app.services.thumbnail import THUMBNAIL_FORMATS, ensure_thumbnail, thumbnail_key
+from app.utils.zipstream import iter_zip
+
+SENDFILE_HEADERS = {"x-accel-redirect": "X-Accel-Redirect", "x-sendfile": "X-Sendfile"}
+# Thumbnails are keyed by content, so clients may keep them for a week and
+# revalidate cheaply afterwards.
+THUMBNAIL_MAX_AGE = 7 * 24 * 3600
+
+
+class RangeFileResponse(FileResponse):
+    """
+    ``FileResponse`` whose multi-range responses declare the multipart
+    boundary in ``Content-Type``. Starlette 0.46 sends it as ``Content-Range``
+    and keeps the file's own type, which clients cannot parse.
+    """
+
+    async def _handle_multiple_ranges(self, send, ranges, file_size, send_header_only):
+        async def send_with_multipart_type(message):
+            if message["type"] == "http.response.start":
+                headers = []
+                for name, value in message["headers"]:
+                    if name == b"content-type":
+                        continue
+                    if name == b"content-range" and value.startswith(b"multipart/"):
+                        name = b"content-type"
+                    headers.append((name, value))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        await super()._handle_multiple_ranges(
+            send_with_multipart_type, ranges, file_size, send_header_only
+        )
+
+
+def content_etag(content_hash: str) -> str:
+    """Strong ETag for stored content; identical bytes share the same tag."""
+    return f'"{content_hash}"'
+
+
+def declared_length(request: Request) -> int:
+    """The request's ``Content-Length``, or 0 when absent or malformed."""
+    value = request.headers.get("content-length", "")
+    return int(value) if value.isdigit() else 0
+
+
+def http_date(value: datetime) -> str:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def is_not_modified(
+    headers: Mapping[str, str], etag: str, last_modified: Optional[datetime]
+) -> bool:
+    """
+    Evaluate If-None-Match / If-Modified-Since (RFC 9110 section 13.2.2).
+    If-Modified-Since is only consulted when If-None-Match is absent.
+    """
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or etag in tags
+
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since and last_modified:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if last_modified.tzinfo is None:
+            last_modified = last_modified.replace(tzinfo=timezone.utc)
+        return last_modified.replace(microsecond=0) <= since
+    return False
+
+
+def file_response(
+    request: Request, file, cache_control: str = "private, no-cache"
+) -> Response:
+    """
+    Serve a stored file with validators derived from its content hash.
+
+    Conditional requests that match are answered with 304 before the file is
+    opened. Everything else goes to ``send_file``; ``RangeFileResponse`` handles
+    single and multi-part ``Range`` requests and ``If-Range`` against our ETag.
+    """
+    headers = {"cache-control": cache_control}
+    last_modified = file.updated_at or file.created_at
+    if last_modified:
+        headers["last-modified"] = http_date(last_modified)
+
+    if file.content_hash:
+        etag = content_etag(file.content_hash)
+        headers["etag"] = etag
+        if is_not_modified(request.headers, etag, last_modified):
+            return Response(status_code=304, headers=headers)
+
+    headers["content-disposition"] = content_disposition(file.name)
+    return send_file(file.file, file.mime_type, headers)
+
+
+def sendfile_target(header: str, path: str) -> str:
+    """
+    Value of the offload header for ``path``: an internal URI below
+    ``SENDFILE_PREFIX`` for nginx, the absolute path for X-Sendfile.
+    """
+    if header == "X-Sendfile":
+        return os.path.abspath(path)
+    relative = os.path.relpath(path, settings.MEDIA_ROOT).replace(os.sep, "/")
+    return settings.SENDFILE_PREFIX.rstrip("/") + "/" + quote(relative)
+
+
+def send_file(path: str, media_type: Optional[str], headers: dict) -> Response:
+    """
+    Send the bytes at ``path`` without copying them through Python.
+
+    With ``SENDFILE_HEADER`` set the body is left to the proxy, which also
+    answers ``Range`` itself. Otherwise ``RangeFileResponse`` serves it, and
+    servers implementing the ASGI pathsend extension send it with sendfile(2).
+    """
+    header = SENDFILE_HEADERS.get((settings.SENDFILE_HEADER or "").lower())
+    if header:
+        headers = {**headers, header: sendfile_target(header, path)}
+        return Response(media_type=media_type, headers=headers)
+    return RangeFileResponse(path, media_type=media_type, headers=headers)
+
+
+async def thumbnail_response(request: Request, file, size: str, format: str):
+    """
+    Serve a thumbnail under a fixed ETag. Revalidations are answered before
+    anything is rendered.
+    """
+    headers = {
+        "cache-control": f"private, max-age={THUMBNAIL_MAX_AGE}",
+        "etag": f'"{thumbnail_key(file)}-{size}.{format}"',
+    }
+    if is_not_modified(request.headers, headers["etag"], None):
+        return Response(status_code=304, headers=headers)
+
+    path, error = await ensure_thumbnail(file, size, format)
+    if error == "BUSY":
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Thumbnail queue is full, retry later",
+            headers={"Retry-After": "1"},
+        )
+    if error:
+        raise HTTPException(
+            status_code=500, detail=f"Thumbnail generation failed: {error}"
+        )
+    return send_file(path, THUMBNAIL_FORMATS[format][1], headers)
+
+
+def content_disposition(filename: str) -> str:
+    return f"attachment; filename*=utf-8''{quote(filename)}"
+
+
+def zip_response(name: str, entries) -> StreamingResponse:
+    """Stream ``entries`` as ``<name>.zip``; see ``app.utils.zipstream``."""
+    return StreamingResponse(
+        iter_zip(entries),
+        media_type="application/zip",
+        headers={
+            "Content-Disposition": content_disposition(f"{name}.zip"),
+            "Cache-Control": "private, no-store",
+        },
+    )
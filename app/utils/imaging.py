@@ -0,0 +1,263 @@
+"""
+Process-pool image processing.
+
+CPU-heavy decoding and encoding runs in a pool of worker processes so it
+scales across cores instead of holding the GIL of the API worker. The pool
+is bounded: at most ``max_pending`` jobs may be queued or running, and
+callers are told when it is full rather than piling up work.
+
+Worker functions live in this module and only depend on Pillow, so spawned
+workers start without importing the application or the database layer.
+"""
+
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from functools import partial
+from typing import Any, Callable, Optional
+from uuid import uuid4
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Images above this many pixels are refused before decoding.
+MAX_IMAGE_PIXELS = 64 * 1024 * 1024
+
+# EXIF tags kept in the metadata record, by tag id: IFD0, then the Exif IFD.
+EXIF_TAGS = {
+    0x010F: "make",
+    0x0110: "model",
+    0x0112: "orientation",
+    0x0131: "software",
+    0x0132: "datetime",
+}
+EXIF_IFD = 0x8769
+EXIF_IFD_TAGS = {
+    0x829A: "exposure_time",
+    0x829D: "f_number",
+    0x8827: "iso",
+    0x9003: "datetime_original",
+    0x920A: "focal_length",
+}
+
+
+class ImageTooLarge(Exception):
+    pass
+
+
+class ImageProcessorBusy(Exception):
+    pass
+
+
+def _init_worker() -> None:
+    # Pillow raises DecompressionBombError at twice this value; our own check
+    # in ``render_thumbnail`` refuses anything above it.
+    Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
+
+
+def _timed(fn: Callable, *args) -> tuple[Any, float]:
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started
+
+
+def render_thumbnail(
+    source_path: str,
+    dest_path: str,
+    box: tuple[int, int],
+    pil_format: str,
+    max_pixels: int = MAX_IMAGE_PIXELS,
+) -> None:
+    """
+    Render a thumbnail that fits ``box`` and write it atomically to
+    ``dest_path``.
+
+    Only the header is read before the pixel count is checked. ``thumbnail``
+    lets JPEGs decode at a reduced scale (draft mode, kept at least twice
+    the box by the default ``reducing_gap``) and shrinks other formats with
+    ``Image.reduce`` before the final resample.
+    """
+    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+    tmp_path = f"{dest_path}.{uuid4()}.part"
+    try:
+        with Image.open(source_path) as img:
+            if img.width * img.height > max_pixels:
+                raise ImageTooLarge(f"{img.width}x{img.height} exceeds {max_pixels}")
+            img.thumbnail(box)
+            if pil_format == "JPEG" and img.mode not in ("RGB", "L"):
+                img = img.convert("RGB")
+            img.save(tmp_path, format=pil_format)
+        os.replace(tmp_path, dest_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def render_thumbnails(source_path: str, targets: list) -> int:
+    """
+    Render several thumbnails of one image; ``targets`` holds
+    ``[dest_path, [width, height], pil_format]`` entries. Targets that exist
+    already are skipped. Returns the number rendered.
+    """
+    rendered = 0
+    for dest_path, box, pil_format in targets:
+        if not os.path.exists(dest_path):
+            render_thumbnail(source_path, dest_path, tuple(box), pil_format)
+            rendered += 1
+    return rendered
+
+
+def _exif_value(value):
+    """A JSON value for an EXIF entry, or None for binary and odd types."""
+    if isinstance(value, str):
+        return value.strip("\x00 ") or None
+    if isinstance(value, int):
+        return value
+    try:
+        # IFDRational and other numeric types.
+        value = float(value)
+    except (TypeError, ValueError, ZeroDivisionError):
+        return None
+    return value if value == value else None
+
+
+def extract_image_metadata(source_path: str, dest_path: str) -> dict:
+    """
+    Read the dimensions, format and a subset of EXIF of an image and write
+    them as JSON, atomically, to ``dest_path``. Only the header is parsed;
+    no pixels are decoded. Returns the metadata.
+    """
+    with Image.open(source_path) as img:
+        exif = img.getexif()
+        tags = [(exif, EXIF_TAGS), (exif.get_ifd(EXIF_IFD), EXIF_IFD_TAGS)]
+        metadata = {
+            "width": img.width,
+            "height": img.height,
+            "format": img.format,
+            "mode": img.mode,
+            "frames": getattr(img, "n_frames", 1),
+            "exif": {
+                name: value
+                for ifd, names in tags
+                for tag, name in names.items()
+                if (value := _exif_value(ifd.get(tag))) is not None
+            },
+        }
+
+    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+    tmp_path = f"{dest_path}.{uuid4()}.part"
+    try:
+        with open(tmp_path, "w") as f:
+            json.dump(metadata, f)
+        os.replace(tmp_path, dest_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return metadata
+
+
+@dataclass
+class JobStats:
+    count: int = 0
+    failures: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+    total_wait_seconds: float = 0.0
+
+
+class ImageProcessor:
+    """Bounded process pool with per-job timing metrics."""
+
+    def __init__(self, max_workers: Optional[int] = None, max_pending: int = 64):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_pending = max_pending
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._stats: dict[str, JobStats] = {}
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                )
+            return self._executor
+
+    def submit(self, fn: Callable, *args) -> Optional[Future]:
+        """
+        Queue ``fn(*args)`` in a worker process. Returns None when the queue
+        is full. The future resolves to ``(result, run_seconds)``.
+        """
+        with self._lock:
+            if self._pending >= self.max_pending:
+                return None
+            self._pending += 1
+        submitted = time.perf_counter()
+        try:
+            future = self._get_executor().submit(_timed, fn, *args)
+        except BaseException:
+            with self._lock:
+                self._pending -= 1
+            raise
+        future.add_done_callback(partial(self._record, fn.__name__, submitted))
+        return future
+
+    async def run(self, fn: Callable, *args):
+        """Run ``fn(*args)`` in the pool and await its result."""
+        future = self.submit(fn, *args)
+        if future is None:
+            raise ImageProcessorBusy("Image processing queue is full")
+        result, _ = await asyncio.wrap_future(future)
+        return result
+
+    def _record(self, name: str, submitted: float, future: Future) -> None:
+        elapsed = time.perf_counter() - submitted
+        failed = future.cancelled() or future.exception() is not None
+        run_seconds = 0.0 if failed else future.result()[1]
+        with self._lock:
+            self._pending -= 1
+            stats = self._stats.setdefault(name, JobStats())
+            stats.count += 1
+            if failed:
+                stats.failures += 1
+            else:
+                stats.total_seconds += run_seconds
+                stats.max_seconds = max(stats.max_seconds, run_seconds)
+                stats.total_wait_seconds += elapsed - run_seconds
+        logger.debug(
+            "image job %s: run=%.3fs wait=%.3fs failed=%s",
+            name,
+            run_seconds,
+            elapsed - run_seconds,
+            failed,
+        )
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "pending": self._pending,
+                "max_pending": self.max_pending,
+                "jobs": {name: asdict(stats) for name, stats in self._stats.items()},
+            }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+image_processor = ImageProcessor()
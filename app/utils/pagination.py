@@ -0,0 +1,123 @@
+"""
+Keyset pagination.
+
+Lists are ordered by a sort column with the primary key as tiebreaker, and
+each page continues after the (sort value, id) pair of the previous page's
+last row, so deep pages cost the same as the first one. Cursors carry that
+pair, with the sort they belong to, as URL-safe base64 JSON; clients treat
+them as opaque.
+"""
+
+import base64
+import binascii
+import enum
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Generic, Optional, TypeVar
+from uuid import UUID
+
+from sqlalchemy import literal, tuple_
+
+T = TypeVar("T")
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+class SortKey(str, enum.Enum):
+    name = "name"
+    created_at = "created_at"
+    size = "size"
+
+
+@dataclass
+class Page(Generic[T]):
+    items: list[T]
+    # None on the last page.
+    next_cursor: Optional[str]
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _dump(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    return value
+
+
+def _load(column, value):
+    python_type = column.type.python_type
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is UUID:
+        return UUID(value)
+    return python_type(value)
+
+
+def encode_cursor(order: str, values: list) -> str:
+    payload = json.dumps([order, [_dump(value) for value in values]])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, order: str, columns: list) -> list:
+    """Values of ``columns`` a cursor points after; raises InvalidCursor."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_order, values = json.loads(base64.urlsafe_b64decode(padded))
+        if cursor_order != order or len(values) != len(columns):
+            raise InvalidCursor(cursor)
+        return [_load(column, value) for column, value in zip(columns, values)]
+    except (binascii.Error, TypeError, ValueError) as exc:
+        raise InvalidCursor(cursor) from exc
+
+
+def keyset_page(
+    query,
+    id_column,
+    sort_columns: dict,
+    sort: Optional[SortKey] = None,
+    after: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    descending: bool = False,
+):
+    """
+    One page of an ORM query, ordered by ``sort_columns[sort]`` then
+    ``id_column``, or by ``id_column`` alone when ``sort`` is None.
+    Returns (page, error_code) where error_code is None, "INVALID_SORT" or
+    "INVALID_CURSOR".
+    """
+    if sort is None:
+        columns = [id_column]
+    elif sort in sort_columns:
+        columns = [sort_columns[sort], id_column]
+    else:
+        return None, "INVALID_SORT"
+    order = f"{sort.value if sort else 'id'}:{'desc' if descending else 'asc'}"
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    if after is not None:
+        try:
+            values = decode_cursor(after, order, columns)
+        except InvalidCursor:
+            return None, "INVALID_CURSOR"
+        key = tuple_(*columns)
+        bound = tuple_(*(literal(v, c.type) for c, v in zip(columns, values)))
+        query = query.filter(key < bound if descending else key > bound)
+    query = query.order_by(
+        *(column.desc() if descending else column.asc() for column in columns)
+    )
+
+    rows = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(
+            order, [getattr(last, column.key) for column in columns]
+        )
+    return Page(items=rows, next_cursor=next_cursor), None
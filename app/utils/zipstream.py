@@ -0,0 +1,113 @@
+"""
+Streaming ZIP writer.
+
+Archives are produced on the fly into a non-seekable sink, so nothing is
+spooled to disk and memory stays bounded by the read chunk size. ``zipfile``
+switches to data descriptors on unseekable output and to ZIP64 records for
+entries or archives beyond the classic 4 GiB / 65535 entry limits.
+"""
+
+import io
+import zipfile
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Iterable, Iterator, Optional
+
+READ_CHUNK_SIZE = 256 * 1024
+
+# Formats that are already compressed; deflating them costs CPU for nothing.
+STORED_MIME_PREFIXES = ("image/", "video/", "audio/")
+STORED_MIME_TYPES = {
+    "application/gzip",
+    "application/pdf",
+    "application/vnd.rar",
+    "application/x-7z-compressed",
+    "application/x-bzip2",
+    "application/x-gzip",
+    "application/x-rar-compressed",
+    "application/x-xz",
+    "application/zip",
+    "application/zstd",
+}
+# Media types under the prefixes above that are not compressed.
+DEFLATED_MIME_TYPES = {"image/bmp", "image/svg+xml", "image/tiff", "audio/wav"}
+
+
+@dataclass
+class ZipEntry:
+    # Path inside the archive; directories end with "/".
+    name: str
+    path: Optional[str] = None
+    size: int = 0
+    mime_type: Optional[str] = None
+    modified: Optional[datetime] = None
+
+
+def member_segment(name: str) -> str:
+    """
+    Make a file or folder name safe as one segment of a ZIP member name.
+
+    Names are user input; separators, "." and ".." would let an entry land
+    outside the extraction directory.
+    """
+    name = name.replace("/", "_").replace("\\", "_").replace("\0", "_")
+    if name in ("", ".", ".."):
+        return "_" * max(len(name), 1)
+    return name
+
+
+def compress_type(mime_type: Optional[str]) -> int:
+    mime_type = (mime_type or "").lower()
+    if mime_type in DEFLATED_MIME_TYPES:
+        return zipfile.ZIP_DEFLATED
+    if mime_type in STORED_MIME_TYPES or mime_type.startswith(STORED_MIME_PREFIXES):
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
+
+def _zip_time(value: Optional[datetime]) -> tuple:
+    # ZIP timestamps start in 1980.
+    if value is None or value.year < 1980:
+        return (1980, 1, 1, 0, 0, 0)
+    return value.timetuple()[:6]
+
+
+class _Sink(io.RawIOBase):
+    """Write-only buffer drained by the generator after each write."""
+
+    def __init__(self):
+        self._buffer = bytearray()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._buffer += data
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+
+def iter_zip(entries: Iterable[ZipEntry]) -> Iterator[bytes]:
+    """Yield a ZIP archive of ``entries`` chunk by chunk."""
+    sink = _Sink()
+    with zipfile.ZipFile(sink, "w", allowZip64=True) as archive:
+        for entry in entries:
+            info = zipfile.ZipInfo(entry.name, _zip_time(entry.modified))
+            if entry.path is None:
+                archive.writestr(info, b"")
+            else:
+                info.compress_type = compress_type(entry.mime_type)
+                info.file_size = entry.size
+                with open(entry.path, "rb") as src, archive.open(info, "w") as dst:
+                    while chunk := src.read(READ_CHUNK_SIZE):
+                        dst.write(chunk)
+                        if data := sink.drain():
+                            yield data
+            if data := sink.drain():
+                yield data
+    if data := sink.drain():
+        yield data
@@ -1,7 +1,8 @@
 import pytest
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
-from app.database import Base, get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import Base, get_async_db, get_db
 from app.main import app
 import os
 
@@ -27,7 +28,13 @@ def db_session(db_engine):
     def override_get_db():
         yield session
 
+    async def override_get_async_db():
+        # An AsyncSession proxying the test session, so async endpoints see
+        # the same uncommitted transaction.
+        yield AsyncSession(sync_session_class=lambda **kw: session)
+
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
     yield session
     session.rollback()
     session.close()
@@ -48,3 +55,28 @@ def test_user(db_session):
     db_session.commit()
     db_session.refresh(user)
     return user
+
+
+@pytest.fixture(scope="function")
+def media_root(tmp_path, monkeypatch):
+    from app.services import storage, thumbnail, upload
+
+    blob_root = tmp_path / "blobs"
+    tmp_root = tmp_path / "tmp"
+    blob_root.mkdir()
+    tmp_root.mkdir()
+    monkeypatch.setattr(storage, "BLOB_ROOT", str(blob_root))
+    monkeypatch.setattr(storage, "TMP_ROOT", str(tmp_root))
+    # Released test blobs are always fresh; unlink them straight away.
+    monkeypatch.setattr(storage, "UNLINK_GRACE", 0)
+    monkeypatch.setattr(upload, "UPLOAD_ROOT", str(tmp_path / "uploads"))
+    monkeypatch.setattr(thumbnail, "THUMBNAIL_ROOT", str(tmp_path / "thumbnails"))
+    return tmp_path
+
+
+@pytest.fixture(scope="function")
+def auth_headers(test_user):
+    from app.core.auth import create_access_token
+
+    token = create_access_token(data={"sub": str(test_user.id)})
+    return {"Authorization": f"Bearer {token}"}
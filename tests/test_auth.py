@@ -19,3 +19,29 @@ def test_user_login(test_user):
     assert "access_token" in token_data
     assert "refresh_token" in token_data
     assert token_data["token_type"] == "bearer"
+
+
+def test_user_login_rejects_wrong_password(test_user):
+    response = client.post(
+        "/api/v1/token",
+        json={"email": test_user.email, "password": "wrong"},
+    )
+    assert response.status_code == 401
+
+
+def test_read_users_me(test_user, auth_headers):
+    response = client.get("/api/v1/users/me", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json()["email"] == test_user.email
+
+
+def test_async_database_url_uses_asyncio_drivers():
+    from app.database import async_database_url
+
+    assert async_database_url("postgresql://u:p@db/app") == (
+        "postgresql+asyncpg://u:p@db/app"
+    )
+    assert async_database_url("postgresql+psycopg2://db/app") == (
+        "postgresql+asyncpg://db/app"
+    )
+    assert async_database_url("sqlite:///./test.db") == "sqlite+aiosqlite:///./test.db"
@@ -1,10 +1,12 @@
 import pytest
+from sqlalchemy import event
 from sqlalchemy.orm import Session
 from app.models.user import User
 from app.models.folder import Folder
 from app.models.file import File
 from app.models.permission import FolderPermission, FilePermission, RoleEnum
 from app.services.copy import CopyService
+from app.services.usage import get_usage
 
 
 @pytest.fixture
@@ -226,3 +228,72 @@ def test_copy_file_name_conflict(db_session: Session, setup_users, setup_folders
 
     assert copied_file is not None
     assert copied_file.name == "file1 (Copy) (1)"
+
+
+def test_copy_folder_tree_in_constant_statements(
+    db_session: Session, setup_users, setup_folders
+):
+    user1, user2 = setup_users
+    folder1, folder2 = setup_folders
+
+    # folder1 > level0 > level1 > level2, each holding two files.
+    parent = folder1
+    for depth in range(3):
+        child = Folder(name=f"level{depth}")
+        child.place_under(parent)
+        db_session.add(child)
+        db_session.add(
+            FolderPermission(folder=child, user_id=user2.id, role=RoleEnum.viewer)
+        )
+        for index in range(2):
+            file = File(
+                name=f"file{index}",
+                folder=child,
+                file=f"/path/to/{depth}/{index}",
+                mime_type="text/plain",
+                ext="txt",
+                size=10,
+            )
+            db_session.add(file)
+            db_session.add(
+                FilePermission(file=file, user_id=user1.id, role=RoleEnum.owner)
+            )
+        parent = child
+    db_session.commit()
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engine = db_session.connection().engine
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        copied = CopyService(db_session).copy_folder(
+            source_folder=folder1, destination_parent=folder2, user=user1
+        )
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    db_session.commit()
+
+    # Refreshes, subtree reads, usage and one insert per table: the count
+    # does not grow with the tree.
+    assert len(statements) <= 16
+
+    assert copied.name == "folder1 (Copy)"
+    assert copied.path == f"{folder2.path}{copied.id}/"
+    folder = copied
+    for depth in range(3):
+        (child,) = folder.folders
+        assert child.name == f"level{depth}"
+        assert child.path == f"{folder.path}{child.id}/"
+        assert [perm.user_id for perm in child.permissions] == [user2.id]
+        assert sorted(file.name for file in child.files) == [
+            "file0 (Copy)",
+            "file1 (Copy)",
+        ]
+        assert all(file.permissions[0].user_id == user1.id for file in child.files)
+        folder = child
+
+    usage = get_usage(db_session, user1.id)
+    assert (usage.used_bytes, usage.file_count) == (60, 6)
@@ -0,0 +1,274 @@
+import io
+import os
+import zipfile
+
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from app.main import app
+from app.models.blob import Blob
+from app.schemas.folder import FolderCreate
+from app.schemas.link import LinkCreate
+from app.services.folder import create_folder
+from app.services.link import create_link
+
+client = TestClient(app)
+
+
+def test_upload_streams_body_into_blob_store(db_session, media_root, auth_headers):
+    content = b"hello from a raw upload\n" * 1000
+
+    response = client.post(
+        "/f/upload", params={"name": "hello.txt"}, content=content, headers=auth_headers
+    )
+
+    assert response.status_code == 201
+    body = response.json()
+    assert body["name"] == "hello.txt"
+    assert body["size"] == len(content)
+    assert body["mime_type"] == "text/plain"
+    assert body["ext"] == "txt"
+    blob = db_session.query(Blob).one()
+    assert blob.ref_count == 1
+    with open(blob.path, "rb") as f:
+        assert f.read() == content
+
+
+def test_upload_to_missing_folder_writes_nothing(db_session, media_root, auth_headers):
+    response = client.post(
+        "/f/upload",
+        params={"name": "a.txt", "folder_id": "00000000-0000-0000-0000-000000000000"},
+        content=b"data",
+        headers=auth_headers,
+    )
+
+    assert response.status_code == 404
+    assert list((media_root / "blobs").iterdir()) == []
+
+
+def test_failed_upload_removes_its_bytes(
+    db_session, media_root, test_user, auth_headers
+):
+    folder, _ = create_folder(db_session, FolderCreate(name="docs"), test_user.id)
+    params = {"name": "a.txt", "folder_id": str(folder.id)}
+    first = client.post(
+        "/f/upload", params=params, content=b"one", headers=auth_headers
+    )
+    assert first.status_code == 201
+
+    response = client.post(
+        "/f/upload", params=params, content=b"two", headers=auth_headers
+    )
+
+    assert response.status_code == 409
+    stored = [path for path in (media_root / "blobs").rglob("*") if path.is_file()]
+    assert [path.read_bytes() for path in stored] == [b"one"]
+
+
+def _upload(auth_headers, content, name="data.bin", folder_id=None):
+    params = {"name": name}
+    if folder_id:
+        params["folder_id"] = str(folder_id)
+    response = client.post(
+        "/f/upload", params=params, content=content, headers=auth_headers
+    )
+    assert response.status_code == 201
+    return response.json()
+
+
+def test_download_revalidates_with_content_etag(db_session, media_root, auth_headers):
+    content = b"0123456789" * 100
+    file = _upload(auth_headers, content)
+
+    response = client.get(f"/f/{file['id']}", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.content == content
+    etag = response.headers["etag"]
+    assert etag.strip('"') == db_session.query(Blob).one().hash
+
+    response = client.get(
+        f"/f/{file['id']}", headers={**auth_headers, "If-None-Match": etag}
+    )
+    assert response.status_code == 304
+    assert response.content == b""
+
+    response = client.get(
+        f"/f/{file['id']}",
+        headers={
+            **auth_headers,
+            "If-Modified-Since": response.headers["last-modified"],
+        },
+    )
+    assert response.status_code == 304
+
+
+def test_download_serves_byte_ranges(db_session, media_root, auth_headers):
+    content = bytes(range(256)) * 4
+    file = _upload(auth_headers, content)
+
+    response = client.get(
+        f"/f/{file['id']}", headers={**auth_headers, "Range": "bytes=10-19"}
+    )
+    assert response.status_code == 206
+    assert response.content == content[10:20]
+    assert response.headers["content-range"] == f"bytes 10-19/{len(content)}"
+
+    response = client.get(
+        f"/f/{file['id']}", headers={**auth_headers, "Range": "bytes=0-4,100-104"}
+    )
+    assert response.status_code == 206
+    assert response.headers["content-type"].startswith("multipart/byteranges")
+    assert content[100:105] in response.content
+
+
+def _folder_tree(db_session, test_user, auth_headers):
+    root, _ = create_folder(db_session, FolderCreate(name="photos"), test_user.id)
+    trip, _ = create_folder(
+        db_session, FolderCreate(name="trip", parent_id=root.id), test_user.id
+    )
+    create_folder(
+        db_session, FolderCreate(name="empty", parent_id=trip.id), test_user.id
+    )
+    _upload(auth_headers, b"notes " * 500, name="notes.txt", folder_id=root.id)
+    png = io.BytesIO()
+    Image.new("RGB", (8, 8)).save(png, format="PNG")
+    _upload(auth_headers, png.getvalue(), name="a.png", folder_id=trip.id)
+    return root
+
+
+def test_folder_zip_streams_whole_tree(db_session, media_root, test_user, auth_headers):
+    root = _folder_tree(db_session, test_user, auth_headers)
+
+    response = client.get(f"/f/folder/{root.id}/zip", headers=auth_headers)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/zip"
+    assert "photos.zip" in response.headers["content-disposition"]
+    archive = zipfile.ZipFile(io.BytesIO(response.content))
+    assert archive.testzip() is None
+    assert sorted(archive.namelist()) == [
+        "photos/notes.txt",
+        "photos/trip/a.png",
+        "photos/trip/empty/",
+    ]
+    assert archive.read("photos/notes.txt") == b"notes " * 500
+    assert archive.getinfo("photos/notes.txt").compress_type == zipfile.ZIP_DEFLATED
+    assert archive.getinfo("photos/trip/a.png").compress_type == zipfile.ZIP_STORED
+
+
+def test_folder_zip_names_cannot_escape_the_archive(
+    db_session, media_root, test_user, auth_headers
+):
+    root, _ = create_folder(db_session, FolderCreate(name=".."), test_user.id)
+    nested, _ = create_folder(
+        db_session, FolderCreate(name="a/../..", parent_id=root.id), test_user.id
+    )
+    create_folder(db_session, FolderCreate(name="", parent_id=nested.id), test_user.id)
+    _upload(auth_headers, b"x", name="..\\evil.txt", folder_id=root.id)
+    _upload(auth_headers, b"y", name="/etc/passwd", folder_id=nested.id)
+
+    response = client.get(f"/f/folder/{root.id}/zip", headers=auth_headers)
+
+    assert response.status_code == 200
+    archive = zipfile.ZipFile(io.BytesIO(response.content))
+    assert sorted(archive.namelist()) == [
+        "__/.._evil.txt",
+        "__/a_.._../_/",
+        "__/a_.._../_etc_passwd",
+    ]
+
+
+def test_folder_zip_requires_access(db_session, media_root, auth_headers):
+    response = client.get(
+        "/f/folder/00000000-0000-0000-0000-000000000000/zip", headers=auth_headers
+    )
+
+    assert response.status_code == 404
+
+
+def test_shared_folder_zip(db_session, media_root, test_user, auth_headers):
+    root = _folder_tree(db_session, test_user, auth_headers)
+    link, _ = create_link(
+        db_session, LinkCreate(folder_id=root.id, password="secret"), test_user.id
+    )
+
+    assert client.get(f"/api/v1/s/{link.token}/zip").status_code == 401
+    response = client.get(f"/api/v1/s/{link.token}/zip", params={"password": "secret"})
+
+    assert response.status_code == 200
+    archive = zipfile.ZipFile(io.BytesIO(response.content))
+    assert "photos/trip/a.png" in archive.namelist()
+
+
+def test_shared_file_download_serves_ranges(
+    db_session, media_root, test_user, auth_headers
+):
+    content = bytes(range(256)) * 4
+    file = _upload(auth_headers, content, name="shared.bin")
+    link, _ = create_link(
+        db_session, LinkCreate(file_id=file["id"]), test_user.id
+    )
+
+    response = client.get(f"/api/v1/s/{link.token}/download")
+    assert response.status_code == 200
+    assert response.content == content
+    assert "shared.bin" in response.headers["content-disposition"]
+
+    response = client.get(
+        f"/api/v1/s/{link.token}/download", headers={"Range": "bytes=10-19"}
+    )
+    assert response.status_code == 206
+    assert response.content == content[10:20]
+
+    response = client.get(
+        f"/api/v1/s/{link.token}/download",
+        headers={"If-None-Match": response.headers["etag"]},
+    )
+    assert response.status_code == 304
+
+
+def test_shared_file_download_offloads_to_proxy(
+    db_session, media_root, test_user, auth_headers, monkeypatch
+):
+    from app.core.config import settings
+
+    file = _upload(auth_headers, b"offloaded", name="a.txt")
+    link, _ = create_link(
+        db_session, LinkCreate(file_id=file["id"]), test_user.id
+    )
+    monkeypatch.setattr(settings, "SENDFILE_HEADER", "x-accel-redirect")
+    monkeypatch.setattr(settings, "MEDIA_ROOT", str(media_root))
+
+    response = client.get(f"/api/v1/s/{link.token}/download")
+
+    assert response.status_code == 200
+    assert response.content == b""
+    blob = db_session.query(Blob).one()
+    assert response.headers["x-accel-redirect"] == (
+        "/protected/" + os.path.relpath(blob.path, media_root).replace(os.sep, "/")
+    )
+    assert response.headers["content-type"].startswith("text/plain")
+
+    monkeypatch.setattr(settings, "SENDFILE_HEADER", "x-sendfile")
+    response = client.get(f"/api/v1/s/{link.token}/download")
+    assert response.headers["x-sendfile"] == os.path.abspath(blob.path)
+
+
+def test_shared_thumbnail(db_session, media_root, test_user, auth_headers):
+    png = io.BytesIO()
+    Image.new("RGB", (300, 200)).save(png, format="PNG")
+    file = _upload(auth_headers, png.getvalue(), name="a.png")
+    link, _ = create_link(
+        db_session,
+        LinkCreate(file_id=file["id"], password="secret"),
+        test_user.id,
+    )
+
+    assert client.get(f"/api/v1/s/{link.token}/t").status_code == 401
+    response = client.get(
+        f"/api/v1/s/{link.token}/t", params={"password": "secret", "size": "small"}
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/png"
+    assert max(Image.open(io.BytesIO(response.content)).size) == 128
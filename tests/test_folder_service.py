@@ -170,3 +170,52 @@ def test_delete_folder_no_permission(db_session: Session, setup_users):
     )
     assert success is False
     assert error == "FORBIDDEN"
+
+
+def test_folder_summaries(db_session: Session, setup_users):
+    from app.models.file import File
+    from app.models.link import Link
+    from app.models.permission import FolderPermission, RoleEnum
+
+    user1, user2 = setup_users
+    shared, _ = folder_service.create_folder(
+        db_session, FolderCreate(name="shared"), user_id=user1.id
+    )
+    private, _ = folder_service.create_folder(
+        db_session, FolderCreate(name="private"), user_id=user1.id
+    )
+    folder_service.create_folder(
+        db_session, FolderCreate(name="child", parent_id=shared.id), user_id=user1.id
+    )
+    for name, size in (("a.txt", 3), ("b.txt", 4)):
+        db_session.add(
+            File(
+                name=name,
+                folder_id=shared.id,
+                file=f"/blobs/{name}",
+                mime_type="text/plain",
+                ext="txt",
+                size=size,
+            )
+        )
+    db_session.add(
+        FolderPermission(user_id=user2.id, folder_id=shared.id, role=RoleEnum.viewer)
+    )
+    db_session.add(Link(folder_id=private.id, user_id=user1.id))
+    db_session.commit()
+
+    rows = {
+        row.name: row
+        for row in folder_service.get_folder_summaries(db_session, user1.id)
+    }
+
+    assert set(rows) == {"shared", "private"}
+    assert (rows["shared"].folder_count, rows["shared"].file_count) == (1, 2)
+    assert rows["shared"].total_size == 7
+    assert rows["shared"].is_shared and rows["private"].is_shared
+    assert rows["shared"].owner_id == user1.id
+    assert (rows["private"].folder_count, rows["private"].total_size) == (0, 0)
+
+    # user2 only sees the folder shared with them, owned by user1.
+    (row,) = folder_service.get_folder_summaries(db_session, user2.id)
+    assert row.name == "shared" and row.owner_id == user1.id
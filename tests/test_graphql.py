@@ -10,3 +10,25 @@ def test_graphql_endpoint():
     )
     assert response.status_code == 200
     assert "data" in response.json()
+
+
+def test_resolvers_share_one_session_per_request(db_session, test_user, auth_headers):
+    from app.database import get_db
+
+    opened = []
+    override = app.dependency_overrides[get_db]
+
+    def counting_get_db():
+        opened.append(1)
+        yield from override()
+
+    app.dependency_overrides[get_db] = counting_get_db
+    response = client.post(
+        "/graphql",
+        json={"query": "{ folder { getAll { id } } file { getAll { id } } }"},
+        headers=auth_headers,
+    )
+
+    assert response.status_code == 200
+    assert "errors" not in response.json()
+    assert len(opened) == 1
@@ -0,0 +1,52 @@
+import asyncio
+
+import pytest
+from PIL import Image
+
+from app.utils.imaging import ImageProcessor, ImageTooLarge, render_thumbnail
+
+
+def test_render_thumbnail_fits_large_jpeg_in_box(tmp_path):
+    source = tmp_path / "large.jpg"
+    Image.new("RGB", (4000, 3000), (10, 120, 200)).save(source, format="JPEG")
+    dest = tmp_path / "out" / "thumb.png"
+
+    render_thumbnail(str(source), str(dest), (128, 128), "PNG")
+
+    with Image.open(dest) as img:
+        assert img.size == (128, 96)
+
+
+def test_render_thumbnail_refuses_oversized_images(tmp_path):
+    source = tmp_path / "bomb.png"
+    Image.new("L", (1000, 1000)).save(source, format="PNG")
+    dest = tmp_path / "thumb.png"
+
+    with pytest.raises(ImageTooLarge):
+        render_thumbnail(str(source), str(dest), (64, 64), "PNG", max_pixels=10_000)
+    assert not dest.exists()
+    assert list(tmp_path.iterdir()) == [source]
+
+
+def test_processor_runs_jobs_in_worker_processes(tmp_path):
+    source = tmp_path / "image.png"
+    Image.new("RGB", (300, 300)).save(source, format="PNG")
+    processor = ImageProcessor(max_workers=1, max_pending=4)
+    try:
+        asyncio.run(
+            processor.run(
+                render_thumbnail,
+                str(source),
+                str(tmp_path / "thumb.webp"),
+                (32, 32),
+                "WEBP",
+            )
+        )
+    finally:
+        processor.shutdown()
+
+    stats = processor.stats()
+    assert stats["pending"] == 0
+    assert stats["jobs"]["render_thumbnail"]["count"] == 1
+    assert stats["jobs"]["render_thumbnail"]["failures"] == 0
+    assert (tmp_path / "thumb.webp").exists()
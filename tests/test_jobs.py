@@ -0,0 +1,161 @@
+import io
+import os
+from datetime import timedelta
+from uuid import UUID
+
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from app.main import app
+from app.models.file import File
+from app.models.job import Job, JobStatus
+from app.services import jobs, thumbnail
+
+client = TestClient(app)
+
+
+def _png(width, height):
+    buf = io.BytesIO()
+    Image.new("RGB", (width, height), (30, 200, 30)).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def _upload(auth_headers, content, name):
+    response = client.post(
+        "/f/upload", params={"name": name}, content=content, headers=auth_headers
+    )
+    assert response.status_code == 201
+    return response.json()
+
+
+def test_upload_queues_thumbnails_instead_of_rendering(
+    db_session, media_root, auth_headers
+):
+    content = _png(400, 300)
+    file = _upload(auth_headers, content, "a.png")
+    _upload(auth_headers, content, "b.png")
+
+    key = db_session.get(File, UUID(file["id"])).content_hash
+    queued = db_session.query(Job).filter(Job.key.like(f"%:{key}")).all()
+    assert sorted(job.kind for job in queued) == ["metadata", "thumbnails"]
+    assert all(job.status == JobStatus.queued for job in queued)
+    paths = [
+        thumbnail.thumbnail_path(key, size, fmt)
+        for size, fmt in thumbnail.PREGENERATED
+    ]
+    assert not any(os.path.exists(path) for path in paths)
+    assert not os.path.exists(thumbnail.metadata_path(key))
+
+    jobs.run_pending_jobs(db_session)
+
+    for job in queued:
+        db_session.refresh(job)
+        assert job.status == JobStatus.done
+        assert job.attempts == 1
+    assert all(os.path.exists(path) for path in paths)
+
+    response = client.get(f"/f/{file['id']}/metadata", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json() == {
+        "width": 400,
+        "height": 300,
+        "format": "PNG",
+        "mode": "RGB",
+        "frames": 1,
+        "exif": {},
+    }
+
+
+def test_failed_jobs_back_off_then_fail(db_session, media_root):
+    target = [str(media_root / "x.png"), [8, 8], "PNG"]
+    job = jobs.enqueue(
+        db_session,
+        "thumbnails",
+        [str(media_root / "missing.png"), [target]],
+        max_attempts=2,
+    )
+    db_session.commit()
+
+    jobs.run_pending_jobs(db_session)
+    db_session.refresh(job)
+    assert job.status == JobStatus.queued
+    assert job.attempts == 1
+    assert "FileNotFoundError" in job.last_error
+    assert jobs.run_pending_jobs(db_session) == 0
+
+    job.run_at = job.run_at - timedelta(hours=1)
+    db_session.commit()
+    jobs.run_pending_jobs(db_session)
+    db_session.refresh(job)
+    assert job.status == JobStatus.failed
+    assert job.attempts == 2
+
+
+def test_enqueue_is_idempotent_per_key(db_session, media_root):
+    first = jobs.enqueue(db_session, "thumbnails", ["a", []], key="k")
+    second = jobs.enqueue(db_session, "thumbnails", ["a", []], key="k")
+    db_session.commit()
+
+    assert first.id == second.id
+    assert db_session.query(Job).filter(Job.key == "k").count() == 1
+
+
+def test_retry_delay_grows_exponentially():
+    assert jobs.retry_delay(1) == jobs.RETRY_BASE_DELAY
+    assert jobs.retry_delay(3) == jobs.RETRY_BASE_DELAY * 4
+    assert jobs.retry_delay(50) == jobs.RETRY_MAX_DELAY
+
+
+def test_purge_deletes_only_old_completed_jobs(db_session, media_root):
+    target = [str(media_root / "x.png"), [8, 8], "PNG"]
+    done = jobs.enqueue(db_session, "thumbnails", ["a", []], key="done")
+    failed = jobs.enqueue(
+        db_session,
+        "thumbnails",
+        [str(media_root / "missing.png"), [target]],
+        key="failed",
+        max_attempts=1,
+    )
+    db_session.commit()
+    jobs.run_pending_jobs(db_session)
+    db_session.refresh(done)
+    db_session.refresh(failed)
+    assert (done.status, failed.status) == (JobStatus.done, JobStatus.failed)
+
+    assert jobs.purge_finished_jobs(db_session) == 0
+    assert jobs.purge_finished_jobs(db_session, retention=timedelta(0)) == 1
+    assert db_session.query(Job).filter(Job.key == "done").count() == 0
+    assert db_session.query(Job).filter(Job.key == "failed").count() == 1
+
+
+def test_metadata_is_extracted_on_demand(db_session, media_root, auth_headers):
+    buf = io.BytesIO()
+    exif = Image.Exif()
+    exif[0x0110] = "Pixel"
+    exif[0x0112] = 6
+    Image.new("RGB", (64, 48)).save(buf, format="JPEG", exif=exif)
+    file = _upload(auth_headers, buf.getvalue(), "photo.jpg")
+
+    response = client.get(f"/f/{file['id']}/metadata", headers=auth_headers)
+
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["width"], body["height"], body["format"]) == (64, 48, "JPEG")
+    assert body["exif"] == {"model": "Pixel", "orientation": 6}
+
+
+def test_renewed_leases_are_not_requeued(db_session, media_root):
+    alive = jobs.enqueue(db_session, "thumbnails", ["a", []], key="alive")
+    lost = jobs.enqueue(db_session, "thumbnails", ["b", []], key="lost")
+    db_session.commit()
+    jobs.claim_job(db_session)
+    jobs.claim_job(db_session)
+    for job in (alive, lost):
+        job.locked_at = job.locked_at - 2 * jobs.JOB_TIMEOUT
+    db_session.commit()
+
+    assert jobs.renew_leases(db_session, [alive.id]) == 1
+    assert jobs.requeue_stale_jobs(db_session) == 1
+    db_session.refresh(alive)
+    db_session.refresh(lost)
+    assert (alive.status, lost.status) == (JobStatus.running, JobStatus.queued)
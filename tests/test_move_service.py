@@ -4,7 +4,14 @@ from app.models.user import User
 from app.models.folder import Folder
 from app.models.file import File
 from app.models.permission import FolderPermission, FilePermission, RoleEnum
-from app.services.move import move_files, move_folders
+from app.services.move import (
+    OnConflict,
+    bulk_move_files,
+    bulk_move_folders,
+    move_files,
+    move_folders,
+)
+from app.utils.helpers import get_folder_path
 
 
 @pytest.fixture
@@ -56,12 +63,9 @@ def test_move_folder_into_subfolder(db_session: Session, setup_users, setup_fold
     user1, _ = setup_users
     folder1, folder2 = setup_folders
 
-    subfolder = Folder(name="subfolder", parent_id=folder1.id)
-    db_session.add(subfolder)
-    db_session.commit()
-    db_session.refresh(subfolder)
+    subfolder = _owned_folder(db_session, user1, "subfolder", folder1)
 
-    with pytest.raises(ValueError):
+    with pytest.raises(ValueError, match="INVALID_MOVE"):
         move_folders(
             db_session,
             source_folders=[folder1],
@@ -70,6 +74,36 @@ def test_move_folder_into_subfolder(db_session: Session, setup_users, setup_fold
         )
 
 
+def test_move_folder_rewrites_subtree_paths(
+    db_session: Session, setup_users, setup_folders
+):
+    user1, _ = setup_users
+    folder1, folder2 = setup_folders
+    child = _owned_folder(db_session, user1, "child", folder1)
+    grandchild = _owned_folder(db_session, user1, "grandchild", child)
+    assert grandchild.ancestor_ids == [folder1.id, child.id, grandchild.id]
+
+    move_folders(
+        db_session, source_folders=[child], destination_folder=folder2, user=user1
+    )
+    db_session.commit()
+    db_session.refresh(grandchild)
+
+    assert grandchild.ancestor_ids == [folder2.id, child.id, grandchild.id]
+    assert grandchild.is_within(folder2) and not grandchild.is_within(folder1)
+    assert get_folder_path(db_session, grandchild) == [
+        (folder2.id, "folder2"),
+        (child.id, "child"),
+        (grandchild.id, "grandchild"),
+    ]
+
+    # A folder cannot be moved into itself either.
+    with pytest.raises(ValueError, match="INVALID_MOVE"):
+        move_folders(
+            db_session, source_folders=[child], destination_folder=child, user=user1
+        )
+
+
 def test_move_multiple_files(db_session: Session, setup_users, setup_folders):
     user1, _ = setup_users
     folder1, folder2 = setup_folders
@@ -138,3 +172,140 @@ def test_move_multiple_folders(db_session: Session, setup_users, setup_folders):
     assert len(moved_folders) == 2
     assert moved_folders[0].parent_id == folder2.id
     assert moved_folders[1].parent_id == folder2.id
+
+
+def _owned_folder(db_session: Session, user: User, name: str, parent=None):
+    folder = Folder(name=name)
+    folder.place_under(parent)
+    db_session.add(folder)
+    db_session.add(
+        FolderPermission(folder=folder, user_id=user.id, role=RoleEnum.owner)
+    )
+    db_session.commit()
+    return folder
+
+
+def _owned_file(db_session: Session, user: User, name: str, folder: Folder):
+    file = File(
+        name=name,
+        folder_id=folder.id,
+        file=f"/path/to/{name}",
+        mime_type="text/plain",
+        ext="txt",
+        size=1,
+    )
+    db_session.add(file)
+    db_session.add(FilePermission(file=file, user_id=user.id, role=RoleEnum.owner))
+    db_session.commit()
+    return file
+
+
+def test_bulk_move_folders_with_nested_sources(
+    db_session: Session, setup_users, setup_folders
+):
+    user1, _ = setup_users
+    folder1, folder2 = setup_folders
+    child = _owned_folder(db_session, user1, "child", folder1)
+    grandchild = _owned_folder(db_session, user1, "grandchild", child)
+    leaf = _owned_folder(db_session, user1, "leaf", grandchild)
+
+    moved, error = bulk_move_folders(
+        db_session, user1.id, [child.id, grandchild.id], folder2.id
+    )
+    db_session.commit()
+
+    assert error is None
+    assert moved == [child, grandchild]
+    for folder in (child, grandchild, leaf):
+        db_session.refresh(folder)
+    assert child.parent_id == grandchild.parent_id == folder2.id
+    assert child.ancestor_ids == [folder2.id, child.id]
+    assert grandchild.ancestor_ids == [folder2.id, grandchild.id]
+    assert leaf.ancestor_ids == [folder2.id, grandchild.id, leaf.id]
+
+
+def test_bulk_move_folders_rejects_cycles_and_foreign_folders(
+    db_session: Session, setup_users, setup_folders
+):
+    user1, user2 = setup_users
+    folder1, folder2 = setup_folders
+    child = _owned_folder(db_session, user1, "child", folder1)
+    foreign = _owned_folder(db_session, user2, "foreign")
+
+    assert bulk_move_folders(db_session, user1.id, [folder1.id], child.id) == (
+        None,
+        "INVALID_MOVE",
+    )
+    assert bulk_move_folders(
+        db_session, user1.id, [folder1.id, foreign.id], folder2.id
+    ) == (None, "NOT_FOUND")
+    assert bulk_move_folders(db_session, user1.id, [child.id], foreign.id) == (
+        None,
+        "PERMISSION_DENIED",
+    )
+
+
+@pytest.mark.parametrize(
+    "on_conflict, expected",
+    [
+        (OnConflict.fail, "FOLDER_EXISTS"),
+        (OnConflict.skip, ["other"]),
+        (OnConflict.rename, ["other", "dup (2)", "dup (3)"]),
+    ],
+)
+def test_bulk_move_folders_name_conflicts(
+    db_session: Session, setup_users, setup_folders, on_conflict, expected
+):
+    user1, _ = setup_users
+    folder1, folder2 = setup_folders
+    _owned_folder(db_session, user1, "dup", folder2)
+    _owned_folder(db_session, user1, "dup (1)", folder2)
+    other = _owned_folder(db_session, user1, "other", folder1)
+    first = _owned_folder(db_session, user1, "dup", folder1)
+    second = _owned_folder(db_session, user1, "dup")
+
+    moved, error = bulk_move_folders(
+        db_session,
+        user1.id,
+        [other.id, first.id, second.id],
+        folder2.id,
+        on_conflict=on_conflict,
+    )
+    db_session.commit()
+
+    if isinstance(expected, str):
+        assert (moved, error) == (None, expected)
+        return
+    assert error is None
+    assert [folder.name for folder in moved] == expected
+    assert all(folder.parent_id == folder2.id for folder in moved)
+
+
+@pytest.mark.parametrize(
+    "on_conflict, expected",
+    [
+        (OnConflict.fail, "FILE_EXISTS"),
+        (OnConflict.skip, ["b.txt"]),
+        (OnConflict.rename, ["a.txt (1)", "b.txt"]),
+    ],
+)
+def test_bulk_move_files_name_conflicts(
+    db_session: Session, setup_users, setup_folders, on_conflict, expected
+):
+    user1, _ = setup_users
+    folder1, folder2 = setup_folders
+    _owned_file(db_session, user1, "a.txt", folder2)
+    a = _owned_file(db_session, user1, "a.txt", folder1)
+    b = _owned_file(db_session, user1, "b.txt", folder1)
+
+    moved, error = bulk_move_files(
+        db_session, user1.id, [a.id, b.id], folder2.id, on_conflict=on_conflict
+    )
+    db_session.commit()
+
+    if isinstance(expected, str):
+        assert (moved, error) == (None, expected)
+        return
+    assert error is None
+    assert [file.name for file in moved] == expected
+    assert all(file.folder_id == folder2.id for file in moved)
@@ -0,0 +1,81 @@
+from uuid import UUID
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.models.folder import Folder
+from app.models.permission import FolderPermission, RoleEnum
+from app.services.folder import list_folders
+from app.utils.pagination import SortKey, decode_cursor
+
+client = TestClient(app)
+
+
+def _folders(db_session, user, names):
+    for name in names:
+        folder = Folder(name=name)
+        db_session.add(folder)
+        db_session.flush()
+        db_session.add(
+            FolderPermission(user_id=user.id, folder_id=folder.id, role=RoleEnum.owner)
+        )
+    db_session.commit()
+
+
+def _walk(db_session, user_id, **kwargs):
+    names, after = [], None
+    while True:
+        page, error = list_folders(db_session, user_id, after=after, limit=2, **kwargs)
+        assert error is None
+        assert len(page.items) <= 2
+        names += [folder.name for folder in page.items]
+        if page.next_cursor is None:
+            return names
+        after = page.next_cursor
+
+
+def test_keyset_pages_cover_the_list_once(db_session, test_user):
+    _folders(db_session, test_user, list("bdace"))
+
+    assert _walk(db_session, test_user.id) == list("abcde")
+    assert _walk(db_session, test_user.id, descending=True) == list("edcba")
+    by_date = _walk(db_session, test_user.id, sort=SortKey.created_at)
+    assert sorted(by_date) == list("abcde")
+
+
+def test_cursor_is_bound_to_its_sort(db_session, test_user):
+    _folders(db_session, test_user, ["a", "b", "c"])
+    page, _ = list_folders(db_session, test_user.id, limit=1)
+    values = decode_cursor(page.next_cursor, "name:asc", [Folder.name, Folder.id])
+    assert values == ["a", page.items[0].id]
+
+    _, error = list_folders(
+        db_session, test_user.id, after=page.next_cursor, sort=SortKey.created_at
+    )
+    assert error == "INVALID_CURSOR"
+    _, error = list_folders(db_session, test_user.id, after="not a cursor")
+    assert error == "INVALID_CURSOR"
+    _, error = list_folders(db_session, test_user.id, sort=SortKey.size)
+    assert error == "INVALID_SORT"
+
+
+def test_list_folders_endpoint(db_session, test_user, auth_headers):
+    _folders(db_session, test_user, ["x", "y", "z"])
+
+    response = client.get("/f/folders", params={"limit": 2}, headers=auth_headers)
+    assert response.status_code == 200
+    body = response.json()
+    assert [f["name"] for f in body["items"]] == ["x", "y"]
+
+    response = client.get(
+        "/f/folders",
+        params={"limit": 2, "after": body["next_cursor"]},
+        headers=auth_headers,
+    )
+    body = response.json()
+    assert [f["name"] for f in body["items"]] == ["z"]
+    assert body["next_cursor"] is None
+    assert UUID(body["items"][0]["id"])
+
+    response = client.get("/f", params={"after": "bogus"}, headers=auth_headers)
+    assert response.status_code == 400
@@ -0,0 +1,51 @@
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.main import app
+from app.utils.pool import InstrumentedQueuePool, PoolStats, pool_status
+
+client = TestClient(app)
+
+
+def test_pool_stats_histogram():
+    stats = PoolStats(buckets=(0.01, 0.1))
+    stats.observe(0.005)
+    stats.observe(0.05)
+    stats.observe(2.0, timed_out=True)
+
+    snapshot = stats.snapshot()
+    assert snapshot["checkouts"] == 3
+    assert snapshot["timeouts"] == 1
+    assert snapshot["wait_seconds_max"] == 2.0
+    assert snapshot["wait_seconds_buckets"] == {"0.01": 1, "0.1": 2, "+Inf": 3}
+
+
+def test_instrumented_pool_times_checkouts(tmp_path):
+    from sqlalchemy import create_engine
+
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=InstrumentedQueuePool,
+        pool_size=2,
+        max_overflow=0,
+    )
+    with engine.connect(), engine.connect():
+        status = pool_status(engine)
+        assert status["checked_out"] == 2
+    status = pool_status(engine)
+    assert status["checked_out"] == 0
+    assert status["checkouts"] == 2
+    engine.dispose()
+
+
+def test_pool_endpoint_requires_token(monkeypatch):
+    monkeypatch.setattr(settings, "INTERNAL_API_TOKEN", None)
+    assert client.get("/internal/db/pool").status_code == 404
+
+    monkeypatch.setattr(settings, "INTERNAL_API_TOKEN", "secret")
+    response = client.get("/internal/db/pool", headers={"X-Internal-Token": "wrong"})
+    assert response.status_code == 403
+
+    response = client.get("/internal/db/pool", headers={"X-Internal-Token": "secret"})
+    assert response.status_code == 200
+    assert set(response.json()) == {"sync", "async"}
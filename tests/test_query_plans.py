@@ -0,0 +1,256 @@
+"""
+Query plan regression tests.
+
+The hot service queries run against a seeded dataset while their SQL is
+captured; each statement is then explained and must not fall back to a
+full scan of one of the large tables.
+"""
+
+import re
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.models.file import File
+from app.models.folder import Folder
+from app.models.link import Link
+from app.models.permission import FilePermission, FolderPermission, RoleEnum
+from app.models.user import User
+from app.services import file as file_service
+from app.services import folder as folder_service
+from app.services import link as link_service
+from app.services import permission as permission_service
+from app.services import reconcile as reconcile_service
+from app.services import version as version_service
+
+USERS = 50
+ROOT_FOLDERS = 4
+CHILD_FOLDERS = 5
+FILES_PER_FOLDER = 4
+
+LARGE_TABLES = {
+    "users",
+    "blobs",
+    "folders",
+    "files",
+    "links",
+    "file_permissions",
+    "folder_permissions",
+    "file_versions",
+}
+
+
+def _insert(db: Session, model, rows: list) -> None:
+    db.execute(model.__table__.insert(), rows)
+
+
+@pytest.fixture
+def dataset(db_session: Session):
+    users, folders, files, links = [], [], [], []
+    folder_perms, file_perms = [], []
+    for u in range(USERS):
+        user_id = uuid.uuid4()
+        users.append(
+            {"id": user_id, "email": f"plan{u}@example.com", "password": "x"}
+        )
+        for r in range(ROOT_FOLDERS):
+            root_id = uuid.uuid4()
+            root_path = f"{root_id}/"
+            folders.append(
+                {
+                    "id": root_id,
+                    "name": f"root{r}",
+                    "parent_id": None,
+                    "path": root_path,
+                }
+            )
+            # Shares point at folders as well as files.
+            link = {"file_id": None, "folder_id": root_id, "user_id": user_id}
+            links.append({"id": uuid.uuid4(), **link})
+            for c in range(CHILD_FOLDERS):
+                child_id = uuid.uuid4()
+                folders.append(
+                    {
+                        "id": child_id,
+                        "name": f"child{c}",
+                        "parent_id": root_id,
+                        "path": f"{root_path}{child_id}/",
+                    }
+                )
+                for f in range(FILES_PER_FOLDER):
+                    file_id = uuid.uuid4()
+                    files.append(
+                        {
+                            "id": file_id,
+                            "folder_id": child_id,
+                            "file": f"/blobs/{file_id}",
+                            "name": f"file{f}.txt",
+                            "mime_type": "text/plain",
+                            "ext": "txt",
+                            "size": 1,
+                        }
+                    )
+                    file_perms.append(
+                        {
+                            "id": uuid.uuid4(),
+                            "user_id": user_id,
+                            "file_id": file_id,
+                            "role": RoleEnum.owner,
+                        }
+                    )
+                    if f == 0:
+                        link = {
+                            "file_id": file_id,
+                            "folder_id": None,
+                            "user_id": user_id,
+                        }
+                        links.append({"id": uuid.uuid4(), **link})
+        for folder in folders[-ROOT_FOLDERS * (CHILD_FOLDERS + 1) :]:
+            folder_perms.append(
+                {
+                    "id": uuid.uuid4(),
+                    "user_id": user_id,
+                    "folder_id": folder["id"],
+                    "role": RoleEnum.owner,
+                }
+            )
+
+    _insert(db_session, User, users)
+    _insert(db_session, Folder, folders)
+    _insert(db_session, File, files)
+    _insert(db_session, Link, links)
+    _insert(db_session, FolderPermission, folder_perms)
+    _insert(db_session, FilePermission, file_perms)
+    # Give the planner real statistics.
+    db_session.connection().exec_driver_sql("ANALYZE")
+
+    return SimpleNamespace(
+        user_id=users[0]["id"],
+        root_id=folders[0]["id"],
+        child_id=folders[1]["id"],
+        file_id=files[0]["id"],
+    )
+
+
+QUERIES = {
+    "get_folder": lambda db, d: folder_service.get_folder(db, d.user_id, d.root_id),
+    "get_folders_root": lambda db, d: folder_service.get_folders(
+        db, d.user_id
+    ).all(),
+    "get_folders_child": lambda db, d: folder_service.get_folders(
+        db, d.user_id, d.root_id
+    ).all(),
+    "get_folder_summaries": lambda db, d: folder_service.get_folder_summaries(
+        db, d.user_id, d.root_id
+    ).all(),
+    "get_user_file": lambda db, d: file_service.get_user_file(
+        db, d.user_id, d.file_id
+    ),
+    "get_user_file_meta": lambda db, d: file_service.get_user_file_meta(
+        db, d.user_id, d.file_id
+    ),
+    "get_user_files": lambda db, d: file_service.get_user_files(
+        db, d.user_id, d.child_id
+    ),
+    "check_folder_access": lambda db, d: file_service.check_folder_access(
+        db, d.user_id, d.child_id
+    ),
+    "get_user_links": lambda db, d: link_service.get_user_links(db, d.user_id),
+    "get_links_by_file_id": lambda db, d: link_service.get_links_by_file_id(
+        db, d.user_id, d.file_id
+    ),
+    "get_links_by_folder_id": lambda db, d: link_service.get_links_by_folder_id(
+        db, d.user_id, d.child_id
+    ),
+    "get_file_permissions_by_file_id": (
+        lambda db, d: permission_service.get_file_permissions_by_file_id(
+            db, d.user_id, d.file_id
+        )
+    ),
+    "get_folder_permissions_by_folder_id": (
+        lambda db, d: permission_service.get_folder_permissions_by_folder_id(
+            db, d.user_id, d.child_id
+        )
+    ),
+    "get_all_folder_permissions": (
+        lambda db, d: permission_service.get_all_folder_permissions(db, d.user_id)
+    ),
+    "get_file_versions": lambda db, d: version_service.get_file_versions(
+        db, d.user_id, d.file_id
+    ),
+    "referenced_paths": lambda db, d: reconcile_service.referenced_paths(
+        db, "/", [f"blobs/{d.file_id}", "legacy/report.pdf"]
+    ),
+}
+
+
+def _capture(db: Session, call) -> list:
+    statements = []
+    engine = db.connection().engine
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        call()
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    return statements
+
+
+def _aliases(statement: str) -> dict[str, str]:
+    """Map the aliases in ``statement`` to the tables they stand for."""
+    return {
+        alias: table
+        for table, alias in re.findall(r"\b(\w+) AS (\w+)", statement)
+        if table in LARGE_TABLES
+    }
+
+
+def _full_scans(plan: list[str], aliases: dict[str, str]) -> list[str]:
+    """Plan details scanning a large table without an index."""
+    scans = []
+    for detail in plan:
+        match = re.match(r"SCAN (\w+)(.*)", detail)
+        if not match or re.search(r"\bUSING .*INDEX\b", match.group(2)):
+            continue
+        if aliases.get(match.group(1), match.group(1)) in LARGE_TABLES:
+            scans.append(detail)
+    return scans
+
+
+@pytest.mark.parametrize("name", QUERIES)
+def test_service_query_uses_indexes(db_session: Session, dataset, name):
+    statements = _capture(db_session, lambda: QUERIES[name](db_session, dataset))
+    assert statements
+
+    connection = db_session.connection()
+    for statement, parameters in statements:
+        plan = [
+            row[-1]
+            for row in connection.exec_driver_sql(
+                f"EXPLAIN QUERY PLAN {statement}", parameters
+            )
+        ]
+        assert not _full_scans(plan, _aliases(statement)), "\n".join(
+            [statement, *plan]
+        )
+
+
+def test_full_scans_resolve_aliases_and_skip_index_scans():
+    aliases = _aliases("SELECT f.id FROM files AS f JOIN files_meta AS m ON 1")
+    plan = [
+        "SCAN f",
+        "SCAN m",
+        "SCAN files USING COVERING INDEX ix_files_folder_name",
+        "SCAN users USING INDEX sqlite_autoindex_users_1",
+        "SCAN folders",
+        "SEARCH links USING INDEX ix_links_user_id (user_id=?)",
+    ]
+
+    assert _full_scans(plan, aliases) == ["SCAN f", "SCAN folders"]
@@ -0,0 +1,117 @@
+import os
+import time
+
+import pytest
+from sqlalchemy.orm import Session
+
+from app.models.user import User
+from app.services import reconcile
+from tests.test_storage_service import _upload
+
+OLD = time.time() - 2 * reconcile.GRACE_PERIOD
+
+
+@pytest.fixture
+def owner(db_session: Session):
+    user = User(email="gc_owner@example.com", password="password")
+    db_session.add(user)
+    db_session.commit()
+    return user
+
+
+def _write(path, content=b"orphan", mtime=OLD):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(content)
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def _age(path, mtime=OLD):
+    os.utime(path, (mtime, mtime))
+
+
+def test_walk_media_is_sorted_and_resumable(tmp_path):
+    for rel in ["b/2", "a/1", "c", "b/1", "thumbnails/x", "quarantine/y", "tmp/z"]:
+        _write(tmp_path / rel)
+
+    assert list(reconcile.walk_media(str(tmp_path))) == ["a/1", "b/1", "b/2", "c"]
+    assert list(reconcile.walk_media(str(tmp_path), cursor="b/1")) == ["b/2", "c"]
+
+
+def test_dry_run_reports_without_moving(db_session, media_root, owner):
+    live = _upload(db_session, owner, "live.txt", b"live bytes")
+    _age(live.file)
+    orphan = _write(media_root / "blobs" / "deadbeef", b"x" * 10)
+
+    report = reconcile.reconcile(db_session, str(media_root), dry_run=True)
+
+    assert report.orphaned == ["blobs/deadbeef"]
+    assert report.orphaned_bytes == 10
+    assert orphan.exists()
+    assert os.path.exists(live.file)
+
+
+def test_orphans_are_quarantined_then_purged(db_session, media_root, owner):
+    live = _upload(db_session, owner, "live.txt", b"live bytes")
+    _age(live.file)
+    orphan = _write(media_root / "blobs" / "deadbeef")
+    fresh = _write(media_root / "tmp" / "upload.part", mtime=time.time())
+
+    report = reconcile.reconcile(db_session, str(media_root))
+
+    assert report.orphaned == ["blobs/deadbeef"]
+    assert report.next_cursor is None
+    assert not orphan.exists()
+    assert fresh.exists()
+    assert os.path.exists(live.file)
+    quarantined = media_root / "quarantine" / "blobs" / "deadbeef"
+    assert quarantined.exists()
+
+    report = reconcile.purge_quarantine(db_session, str(media_root), ttl=0)
+
+    assert report.purged == ["blobs/deadbeef"]
+    assert not quarantined.exists()
+
+
+def test_purge_restores_files_referenced_again(db_session, media_root, owner):
+    live = _upload(db_session, owner, "live.txt", b"live bytes")
+    rel = os.path.relpath(live.file, media_root)
+    quarantined = media_root / "quarantine" / rel
+    quarantined.parent.mkdir(parents=True)
+    os.replace(live.file, quarantined)
+
+    # Restored straight away, not once the quarantine TTL has passed.
+    report = reconcile.purge_quarantine(db_session, str(media_root))
+
+    assert report.restored == [rel]
+    assert os.path.exists(live.file)
+
+
+def test_root_spelling_does_not_orphan_referenced_files(
+    db_session, media_root, owner
+):
+    live = _upload(db_session, owner, "live.txt", b"live bytes")
+    _age(live.file)
+    root = os.path.relpath(media_root) + os.sep
+
+    report = reconcile.reconcile(db_session, root)
+
+    assert report.orphaned == []
+    assert os.path.exists(live.file)
+
+
+def test_limit_returns_resume_cursor(db_session, media_root):
+    for name in ["a", "b", "c"]:
+        _write(media_root / "blobs" / name)
+
+    report = reconcile.quarantine_orphans(
+        db_session, str(media_root), limit=2, dry_run=True
+    )
+    assert report.orphaned == ["blobs/a", "blobs/b"]
+    assert report.next_cursor == "blobs/b"
+
+    report = reconcile.quarantine_orphans(
+        db_session, str(media_root), cursor=report.next_cursor, dry_run=True
+    )
+    assert report.orphaned == ["blobs/c"]
+    assert report.next_cursor is None
@@ -0,0 +1,112 @@
+import os
+from uuid import uuid4
+
+import pytest
+from sqlalchemy.orm import Session
+
+from app.models.blob import Blob
+from app.models.file import File
+from app.models.user import User
+from app.services import relayout, storage
+from tests.test_storage_service import _upload
+
+
+@pytest.fixture
+def owner(db_session: Session):
+    user = User(email="layout_owner@example.com", password="password")
+    db_session.add(user)
+    db_session.commit()
+    return user
+
+
+@pytest.fixture
+def files_root(media_root, monkeypatch):
+    root = media_root / "files"
+    monkeypatch.setattr(relayout, "FILES_ROOT", str(root))
+    return root
+
+
+def test_blobs_are_stored_in_shard_directories(db_session, media_root, owner):
+    file = _upload(db_session, owner, "a.txt", b"sharded")
+    digest = file.content_hash
+
+    assert file.file == str(media_root / "blobs" / digest[:2] / digest[2:4] / digest)
+    assert os.path.exists(file.file)
+
+
+def test_relayout_moves_flat_blobs_and_legacy_files(
+    db_session, media_root, files_root, owner
+):
+    digest = "ab" * 32
+    flat_blob = media_root / "blobs" / digest
+    flat_blob.write_bytes(b"blob bytes")
+    legacy = media_root / "legacy.bin"
+    legacy.write_bytes(b"legacy bytes")
+    db_session.add(Blob(hash=digest, path=str(flat_blob), size=10, ref_count=1))
+    db_session.flush()
+    shared = File(
+        id=uuid4(),
+        name="shared.txt",
+        file=str(flat_blob),
+        content_hash=digest,
+        mime_type="text/plain",
+        ext="txt",
+        size=10,
+    )
+    old = File(
+        id=uuid4(),
+        name="legacy.bin",
+        file=str(legacy),
+        mime_type="application/octet-stream",
+        ext="bin",
+        size=12,
+    )
+    db_session.add_all([shared, old])
+    db_session.commit()
+
+    report = relayout.relayout(db_session, dry_run=True)
+    assert report.moved == 2
+    assert flat_blob.exists() and legacy.exists()
+
+    report = relayout.relayout(db_session, batch_size=1)
+
+    assert report.moved == 2 and report.missing == 0
+    assert not flat_blob.exists() and not legacy.exists()
+    new_blob = storage.blob_path(digest)
+    assert db_session.get(Blob, digest).path == new_blob
+    assert db_session.get(File, shared.id).file == new_blob
+    assert open(new_blob, "rb").read() == b"blob bytes"
+    moved = db_session.get(File, old.id).file
+    assert moved == relayout.file_path(old.id, str(legacy))
+    assert moved.startswith(str(files_root / str(old.id)[:2]))
+    assert open(moved, "rb").read() == b"legacy bytes"
+
+    assert relayout.relayout(db_session).moved == 0
+
+
+def test_relayout_keeps_legacy_copies_sharing_a_path(
+    db_session, media_root, files_root, owner
+):
+    legacy = media_root / "legacy.bin"
+    legacy.write_bytes(b"shared bytes")
+    files = [
+        File(
+            id=uuid4(),
+            name=name,
+            file=str(legacy),
+            mime_type="application/octet-stream",
+            ext="bin",
+            size=12,
+        )
+        for name in ("a.bin", "a (Copy).bin")
+    ]
+    db_session.add_all(files)
+    db_session.commit()
+
+    report = relayout.relayout_files(db_session, batch_size=1)
+
+    assert report.missing == 0
+    assert not legacy.exists()
+    paths = {db_session.get(File, file.id).file for file in files}
+    assert len(paths) == 1
+    assert open(paths.pop(), "rb").read() == b"shared bytes"
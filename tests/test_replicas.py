@@ -0,0 +1,100 @@
+from types import SimpleNamespace
+
+from sqlalchemy import Column, Integer, String, create_engine, select, text
+from sqlalchemy.orm import declarative_base
+from starlette.requests import Request
+
+from app.database import (
+    READ_PRIMARY_COOKIE,
+    RoutingSession,
+    remember_writer,
+    use_replicas,
+)
+
+Base = declarative_base()
+
+
+class Item(Base):
+    __tablename__ = "items"
+    id = Column(Integer, primary_key=True)
+    name = Column(String)
+
+
+def _engines(tmp_path):
+    primary = create_engine(f"sqlite:///{tmp_path / 'primary.db'}")
+    replica = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    for engine, name in ((primary, "primary"), (replica, "replica")):
+        Base.metadata.create_all(engine)
+        with engine.begin() as conn:
+            conn.execute(Item.__table__.insert(), {"id": 1, "name": name})
+    return primary, replica
+
+
+def _request(cookies="", user_id=None):
+    headers = [(b"cookie", cookies.encode())] if cookies else []
+    return Request(
+        {"type": "http", "headers": headers, "state": {"user_id": user_id}}
+    )
+
+
+def test_reads_go_to_replica_until_the_session_writes(tmp_path):
+    primary, replica = _engines(tmp_path)
+    request = _request()
+    with RoutingSession(bind=primary, replicas=[replica]) as db:
+        db.info["request"] = request
+        assert db.get(Item, 1).name == "primary"
+
+        use_replicas(db)
+        db.expunge_all()
+        assert db.get(Item, 1).name == "replica"
+        assert not getattr(request.state, "db_wrote", False)
+
+        db.add(Item(id=2, name="new"))
+        db.flush()
+        assert request.state.db_wrote
+        db.expunge_all()
+        assert db.get(Item, 1).name == "primary"
+        assert db.get(Item, 2).name == "new"
+
+
+def test_raw_sql_goes_to_primary(tmp_path):
+    primary, replica = _engines(tmp_path)
+    with RoutingSession(bind=primary, replicas=[replica]) as db:
+        db.info["read_only"] = True
+        assert db.scalar(text("SELECT name FROM items")) == "primary"
+
+
+def test_recent_writer_reads_from_primary(tmp_path):
+    primary, replica = _engines(tmp_path)
+    with RoutingSession(bind=primary, replicas=[replica]) as db:
+        db.info["request"] = _request(f"{READ_PRIMARY_COOKIE}=1")
+        use_replicas(db)
+        assert db.get(Item, 1).name == "primary"
+
+    # Without a request, e.g. in a worker, replicas are allowed.
+    db = SimpleNamespace(info={})
+    use_replicas(db)
+    assert db.info["read_only"]
+
+
+def test_session_reads_from_a_single_replica(tmp_path):
+    primary, replica = _engines(tmp_path)
+    other = create_engine(f"sqlite:///{tmp_path / 'other.db'}")
+    with RoutingSession(bind=primary, replicas=[replica, other]) as db:
+        use_replicas(db)
+        binds = {db.get_bind(clause=select(Item)) for _ in range(20)}
+        assert binds == {db.replica}
+
+
+def test_recent_writer_is_recognised_without_cookie(tmp_path):
+    primary, replica = _engines(tmp_path)
+    remember_writer("writer")
+    with RoutingSession(bind=primary, replicas=[replica]) as db:
+        db.info["request"] = _request(user_id="writer")
+        use_replicas(db)
+        assert db.get(Item, 1).name == "primary"
+
+    with RoutingSession(bind=primary, replicas=[replica]) as db:
+        db.info["request"] = _request(user_id="reader")
+        use_replicas(db)
+        assert db.get(Item, 1).name == "replica"
@@ -0,0 +1,287 @@
+import asyncio
+import os
+import uuid
+
+import pytest
+from sqlalchemy.orm import Session
+
+from app.models.blob import Blob
+from app.models.file import File
+from app.models.folder import Folder
+from app.models.permission import FolderPermission, RoleEnum
+from app.models.user import User
+from app.schemas.file import CreateFile
+from app.services import file as file_service
+from app.services import folder as folder_service
+from app.services import storage
+from app.services.copy import CopyService
+
+
+class MockUpload:
+    def __init__(self, filename, content):
+        self.filename = filename
+        self.content = content
+
+    async def read(self, size=-1):
+        if size < 0:
+            size = len(self.content)
+        chunk, self.content = self.content[:size], self.content[size:]
+        return chunk
+
+
+@pytest.fixture
+def owner(db_session: Session):
+    user = User(email="blob_owner@example.com", password="password")
+    db_session.add(user)
+    db_session.commit()
+    db_session.refresh(user)
+    return user
+
+
+def _upload(db_session, user, name, content, folder_id=None):
+    file_path, mime_type, ext, size, content_hash = asyncio.run(
+        file_service.save_uploaded_file(MockUpload(name, content))
+    )
+    file, error = file_service.create_file(
+        db_session,
+        user.id,
+        CreateFile(
+            name=name,
+            folder_id=folder_id,
+            file=file_path,
+            mime_type=mime_type,
+            ext=ext,
+            size=size,
+            content_hash=content_hash,
+        ),
+    )
+    assert error is None
+    return file
+
+
+def test_identical_uploads_share_a_blob(db_session: Session, media_root, owner):
+    first = _upload(db_session, owner, "a.txt", b"same bytes")
+    second = _upload(db_session, owner, "b.txt", b"same bytes")
+
+    assert first.content_hash == second.content_hash
+    assert first.file == second.file
+    assert len(os.listdir(media_root / "blobs")) == 1
+    assert db_session.get(Blob, first.content_hash).ref_count == 2
+
+
+def test_delete_keeps_bytes_until_last_reference(
+    db_session: Session, media_root, owner
+):
+    first = _upload(db_session, owner, "a.txt", b"payload")
+    second = _upload(db_session, owner, "b.txt", b"payload")
+    path = first.file
+
+    ok, error = file_service.delete_file(db_session, owner.id, first.id)
+    assert ok and error is None
+    assert os.path.exists(path)
+
+    ok, error = file_service.delete_file(db_session, owner.id, second.id)
+    assert ok and error is None
+    assert not os.path.exists(path)
+    assert db_session.get(Blob, second.content_hash) is None
+
+
+def test_delete_folder_releases_subtree_blobs(db_session: Session, media_root, owner):
+    root = Folder(name="root")
+    db_session.add(root)
+    db_session.flush()
+    child = Folder(name="child", parent_id=root.id)
+    db_session.add(child)
+    db_session.flush()
+    for folder in (root, child):
+        db_session.add(
+            FolderPermission(user_id=owner.id, folder_id=folder.id, role=RoleEnum.owner)
+        )
+    db_session.commit()
+    nested = _upload(db_session, owner, "nested.txt", b"nested", folder_id=child.id)
+    kept = _upload(db_session, owner, "kept.txt", b"nested")
+
+    ok, error = folder_service.delete_folder(db_session, owner.id, root.id)
+
+    assert ok and error is None
+    assert db_session.get(Blob, kept.content_hash).ref_count == 1
+    file_service.delete_file(db_session, owner.id, kept.id)
+    assert not os.path.exists(nested.file)
+
+
+def test_copy_takes_a_blob_reference(db_session: Session, media_root, owner):
+    folder = Folder(name="dest")
+    db_session.add(folder)
+    db_session.flush()
+    db_session.add(
+        FolderPermission(folder_id=folder.id, user_id=owner.id, role=RoleEnum.owner)
+    )
+    db_session.commit()
+
+    source = _upload(db_session, owner, "a.txt", b"copied bytes")
+    copied = CopyService(db_session).copy_file(source, folder, user=owner)
+    db_session.commit()
+
+    assert copied.content_hash == source.content_hash
+    assert db_session.get(Blob, source.content_hash).ref_count == 2
+
+    file_service.delete_file(db_session, owner.id, source.id)
+    assert os.path.exists(copied.file)
+    assert db_session.get(File, copied.id) is not None
+
+
+def test_acquire_sees_blobs_pending_in_the_session(db_session: Session, media_root):
+    storage.acquire_blob(db_session, "a" * 64, 10)
+    storage.acquire_blob(db_session, "a" * 64, 10, refs=2)
+    db_session.commit()
+
+    assert db_session.get(Blob, "a" * 64).ref_count == 3
+
+
+def test_acquire_after_release_in_one_transaction_keeps_the_blob(
+    db_session: Session, media_root, owner
+):
+    file = _upload(db_session, owner, "a.txt", b"kept")
+    db_session.delete(file)
+    storage.release_blob(db_session, file.content_hash)
+    storage.acquire_blob(db_session, file.content_hash, file.size)
+    db_session.commit()
+
+    assert db_session.get(Blob, file.content_hash).ref_count == 1
+    assert os.path.exists(file.file)
+
+
+def test_release_leaves_freshly_written_bytes(
+    db_session: Session, media_root, owner, monkeypatch
+):
+    monkeypatch.setattr(storage, "UNLINK_GRACE", 60)
+    file = _upload(db_session, owner, "a.txt", b"just written")
+
+    file_service.delete_file(db_session, owner.id, file.id)
+
+    assert db_session.get(Blob, file.content_hash) is None
+    # A concurrent upload of the same bytes may be about to reference them.
+    assert os.path.exists(file.file)
+    assert os.listdir(media_root / "tmp") == []
+
+
+def test_discard_leaves_bytes_another_upload_just_wrote(
+    db_session: Session, media_root, monkeypatch
+):
+    # A concurrent upload of the same content has committed the bytes and is
+    # about to acquire them.
+    blob = asyncio.run(storage.store_stream(_chunks([b"racing"])))
+    monkeypatch.setattr(storage, "UNLINK_GRACE", 60)
+
+    storage.discard_blob(db_session, blob.content_hash, blob.path)
+
+    assert os.path.exists(blob.path)
+    assert os.listdir(media_root / "tmp") == []
+
+
+def test_check_media_root_rejects_a_moved_root(
+    db_session: Session, media_root, owner, monkeypatch
+):
+    _upload(db_session, owner, "a.txt", b"rooted")
+    storage.check_media_root(db_session)
+
+    monkeypatch.setattr(storage, "BLOB_ROOT", str(media_root / "elsewhere"))
+    with pytest.raises(RuntimeError):
+        storage.check_media_root(db_session)
+
+
+async def _chunks(parts):
+    for part in parts:
+        yield part
+
+
+def test_store_stream_single_pass(media_root):
+    content = b"%PDF-1.4\n" + b"x" * 300_000
+    parts = [content[i : i + 1000] for i in range(0, len(content), 1000)]
+
+    blob = asyncio.run(storage.store_stream(_chunks(parts)))
+
+    assert blob.size == len(content)
+    assert blob.mime_type == "application/pdf"
+    with open(blob.path, "rb") as f:
+        assert f.read() == content
+    assert os.listdir(media_root / "tmp") == []
+
+
+def test_store_stream_removes_temp_file_on_failure(media_root):
+    async def failing():
+        yield b"partial"
+        raise ConnectionError("client went away")
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(storage.store_stream(failing()))
+
+    assert os.listdir(media_root / "tmp") == []
+    assert os.listdir(media_root / "blobs") == []
+
+
+class FailingUpload(MockUpload):
+    async def read(self, size=-1):
+        raise OSError("connection reset")
+
+
+def test_batch_upload_creates_files_in_one_transaction(
+    db_session: Session, media_root, owner
+):
+    folder = Folder(name="batch")
+    db_session.add(folder)
+    db_session.flush()
+    db_session.add(
+        FolderPermission(folder_id=folder.id, user_id=owner.id, role=RoleEnum.owner)
+    )
+    db_session.commit()
+    _upload(db_session, owner, "taken.txt", b"old", folder_id=folder.id)
+
+    uploads = [
+        MockUpload("a.txt", b"same"),
+        MockUpload("b.txt", b"same"),
+        FailingUpload("c.txt", b""),
+        MockUpload("taken.txt", b"new"),
+        MockUpload("a.txt", b"duplicate name"),
+    ]
+    saved = asyncio.run(file_service.save_uploaded_files(uploads, limit=2))
+    assert isinstance(saved[2], OSError)
+    items = [
+        None
+        if isinstance(result, BaseException)
+        else CreateFile(
+            name=upload.filename,
+            file=result[0],
+            mime_type=result[1],
+            ext=result[2],
+            size=result[3],
+            content_hash=result[4],
+        )
+        for upload, result in zip(uploads, saved)
+    ]
+
+    results, error = file_service.create_files(db_session, owner.id, folder.id, items)
+
+    assert error is None
+    assert [error for _, error in results] == [
+        None,
+        None,
+        "FILE_UPLOAD_ERROR",
+        "FILE_EXISTS",
+        "FILE_EXISTS",
+    ]
+    first, second = results[0][0], results[1][0]
+    assert (first.name, second.name) == ("a.txt", "b.txt")
+    assert first.permissions[0].user_id == owner.id
+    assert first.permissions[0].role == RoleEnum.owner
+    assert db_session.get(Blob, first.content_hash).ref_count == 2
+    assert db_session.query(File).filter(File.folder_id == folder.id).count() == 3
+
+
+def test_batch_upload_checks_folder_access(db_session: Session, media_root, owner):
+    results, error = file_service.create_files(
+        db_session, owner.id, uuid.uuid4(), [None]
+    )
+
+    assert results is None
+    assert error == "NOT_FOUND"
@@ -0,0 +1,86 @@
+import io
+import os
+from uuid import UUID
+
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from app.main import app
+from app.services import thumbnail
+from app.services.file import delete_file
+
+client = TestClient(app)
+
+
+def _png(width, height):
+    buf = io.BytesIO()
+    Image.new("RGB", (width, height), (200, 30, 30)).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def test_thumbnails_are_rendered_once(tmp_path, media_root):
+    source = tmp_path / "source.png"
+    source.write_bytes(_png(800, 400))
+
+    path = thumbnail.get_or_create_thumbnail(str(source), "abc", "small", "webp")
+    with Image.open(path) as img:
+        assert img.format == "WEBP"
+        assert img.size == (128, 64)
+
+    mtime = os.stat(path).st_mtime_ns
+    assert (
+        thumbnail.get_or_create_thumbnail(str(source), "abc", "small", "webp") == path
+    )
+    assert os.stat(path).st_mtime_ns == mtime
+
+
+def test_thumbnail_endpoint_serves_cached_presets(db_session, media_root, auth_headers):
+    response = client.post(
+        "/f/upload",
+        params={"name": "photo.png"},
+        content=_png(600, 600),
+        headers=auth_headers,
+    )
+    file = response.json()
+
+    response = client.get(
+        f"/f/t/{file['id']}", params={"size": "medium"}, headers=auth_headers
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/png"
+    assert "max-age" in response.headers["cache-control"]
+    with Image.open(io.BytesIO(response.content)) as img:
+        assert img.size == (256, 256)
+
+    response = client.get(
+        f"/f/t/{file['id']}",
+        params={"size": "medium"},
+        headers={**auth_headers, "If-None-Match": response.headers["etag"]},
+    )
+    assert response.status_code == 304
+
+    response = client.get(
+        f"/f/t/{file['id']}", params={"size": "huge"}, headers=auth_headers
+    )
+    assert response.status_code == 400
+
+
+def test_thumbnails_go_with_the_last_reference(
+    db_session, media_root, test_user, auth_headers
+):
+    file = client.post(
+        "/f/upload",
+        params={"name": "photo.png"},
+        content=_png(300, 300),
+        headers=auth_headers,
+    ).json()
+    response = client.get(f"/f/t/{file['id']}", headers=auth_headers)
+    assert response.status_code == 200
+    key = response.headers["etag"].strip('"').split("-")[0]
+    thumbnails = thumbnail.shard_path(thumbnail.THUMBNAIL_ROOT, key)
+    assert os.listdir(thumbnails)
+
+    ok, error = delete_file(db_session, test_user.id, UUID(file["id"]))
+
+    assert ok and error is None
+    assert not os.path.exists(thumbnails)
@@ -0,0 +1,92 @@
+from datetime import datetime, timedelta, timezone
+from uuid import UUID
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.models.upload_session import UploadSession
+from app.services import upload as upload_service
+
+client = TestClient(app)
+
+CHUNK = upload_service.MIN_CHUNK_SIZE
+
+
+def _create(auth_headers, size, name="big.bin"):
+    response = client.post(
+        "/f/uploads",
+        json={"name": name, "size": size, "chunk_size": CHUNK},
+        headers=auth_headers,
+    )
+    assert response.status_code == 201
+    return response.json()
+
+
+def test_chunks_out_of_order_then_complete(db_session, media_root, auth_headers):
+    content = bytes(range(256)) * (CHUNK * 3 // 256) + b"tail"
+    session = _create(auth_headers, len(content))
+    assert session["chunk_count"] == 4
+
+    for index in (3, 1, 0):
+        part = content[index * CHUNK : (index + 1) * CHUNK]
+        response = client.put(
+            f"/f/uploads/{session['id']}/{index}", content=part, headers=auth_headers
+        )
+        assert response.status_code == 204
+
+    status = client.get(f"/f/uploads/{session['id']}", headers=auth_headers).json()
+    assert status["received"] == [0, 1, 3]
+
+    response = client.post(f"/f/uploads/{session['id']}/complete", headers=auth_headers)
+    assert response.status_code == 409
+
+    client.put(
+        f"/f/uploads/{session['id']}/2",
+        content=content[2 * CHUNK : 3 * CHUNK],
+        headers=auth_headers,
+    )
+    response = client.post(f"/f/uploads/{session['id']}/complete", headers=auth_headers)
+    assert response.status_code == 200
+    file = response.json()
+    assert file["size"] == len(content)
+    with open(file["file"], "rb") as f:
+        assert f.read() == content
+    assert db_session.get(UploadSession, UUID(session["id"])) is None
+    assert not (media_root / "uploads" / session["id"]).exists()
+
+
+def test_chunk_with_wrong_length_is_rejected(db_session, media_root, auth_headers):
+    session = _create(auth_headers, CHUNK + 10)
+
+    response = client.put(
+        f"/f/uploads/{session['id']}/1", content=b"short", headers=auth_headers
+    )
+
+    assert response.status_code == 400
+    status = client.get(f"/f/uploads/{session['id']}", headers=auth_headers).json()
+    assert status["received"] == []
+
+
+def test_expired_sessions_are_purged(db_session, media_root, auth_headers):
+    session = _create(auth_headers, 10)
+    upload = db_session.get(UploadSession, UUID(session["id"]))
+    upload.expires_at = datetime.now(timezone.utc) - timedelta(minutes=1)
+    db_session.commit()
+
+    response = client.get(f"/f/uploads/{session['id']}", headers=auth_headers)
+    assert response.status_code == 410
+
+    assert upload_service.purge_expired_upload_sessions(db_session) == 1
+    assert not (media_root / "uploads" / session["id"]).exists()
+
+
+def test_is_expired_converts_aware_times_to_utc():
+    ahead = timezone(timedelta(hours=5))
+    upload = UploadSession(expires_at=datetime.now(ahead) + timedelta(hours=1))
+    assert not upload.is_expired
+
+    upload.expires_at = datetime.now(ahead) - timedelta(minutes=1)
+    assert upload.is_expired
+
+    upload.expires_at = datetime.now(timezone.utc).replace(tzinfo=None)
+    assert upload.is_expired
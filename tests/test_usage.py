@@ -0,0 +1,176 @@
+from uuid import UUID
+
+from fastapi.testclient import TestClient
+
+from app.api.v1.endpoints import file as file_endpoints
+from app.core.config import settings
+from app.main import app
+from app.models.user_usage import UserUsage
+from app.schemas.folder import FolderCreate
+from app.services.copy import CopyService
+from app.services.file import delete_file, get_user_file
+from app.services import storage
+from app.services.folder import create_folder, delete_folder
+from app.services.usage import add_usage, get_usage, reconcile_usage
+
+client = TestClient(app)
+
+
+def _upload(auth_headers, content, name="data.bin", folder_id=None):
+    params = {"name": name}
+    if folder_id:
+        params["folder_id"] = str(folder_id)
+    response = client.post(
+        "/f/upload", params=params, content=content, headers=auth_headers
+    )
+    assert response.status_code == 201
+    return response.json()
+
+
+def test_usage_follows_uploads_copies_and_deletes(
+    db_session, media_root, test_user, auth_headers
+):
+    folder, _ = create_folder(db_session, FolderCreate(name="docs"), test_user.id)
+    first = _upload(auth_headers, b"a" * 100, name="a.txt", folder_id=folder.id)
+    _upload(auth_headers, b"b" * 50, name="b.txt", folder_id=folder.id)
+    assert get_usage(db_session, test_user.id).used_bytes == 150
+
+    source, _ = get_user_file(db_session, test_user.id, UUID(first["id"]))
+    CopyService(db_session).copy_file(source, folder)
+    db_session.commit()
+    usage = get_usage(db_session, test_user.id)
+    assert (usage.used_bytes, usage.file_count) == (250, 3)
+
+    response = client.get("/api/v1/users/me/usage", headers=auth_headers)
+    assert response.json() == {
+        "used_bytes": 250,
+        "file_count": 3,
+        "quota_bytes": None,
+    }
+
+    delete_file(db_session, test_user.id, UUID(first["id"]))
+    assert get_usage(db_session, test_user.id).used_bytes == 150
+
+    delete_folder(db_session, test_user.id, folder.id)
+    usage = get_usage(db_session, test_user.id)
+    assert (usage.used_bytes, usage.file_count) == (0, 0)
+
+
+def test_upload_over_quota_is_rejected_before_storing(
+    db_session, media_root, test_user, auth_headers, monkeypatch
+):
+    monkeypatch.setattr(settings, "STORAGE_QUOTA_BYTES", 100)
+    _upload(auth_headers, b"x" * 60, name="a.bin")
+
+    response = client.post(
+        "/f/upload",
+        params={"name": "b.bin"},
+        content=b"y" * 60,
+        headers=auth_headers,
+    )
+
+    assert response.status_code == 413
+    assert response.json()["detail"] == "QUOTA_EXCEEDED"
+    assert list((media_root / "tmp").iterdir()) == []
+
+    response = client.post(
+        "/f/uploads", json={"name": "c.bin", "size": 60}, headers=auth_headers
+    )
+    assert response.status_code == 413
+
+
+def test_upload_without_length_is_cut_off_at_quota(
+    db_session, media_root, test_user, auth_headers, monkeypatch
+):
+    monkeypatch.setattr(settings, "STORAGE_QUOTA_BYTES", 100)
+
+    def body():
+        for _ in range(10):
+            yield b"z" * 20
+
+    response = client.post(
+        "/f/upload", params={"name": "big.bin"}, content=body(), headers=auth_headers
+    )
+
+    assert response.status_code == 413
+    assert list((media_root / "tmp").iterdir()) == []
+    assert list((media_root / "blobs").iterdir()) == []
+
+
+def test_upload_chunks_are_refused_once_over_quota(
+    db_session, media_root, test_user, auth_headers, monkeypatch
+):
+    monkeypatch.setattr(settings, "STORAGE_QUOTA_BYTES", 100)
+    response = client.post(
+        "/f/uploads", json={"name": "c.bin", "size": 60}, headers=auth_headers
+    )
+    session = response.json()
+    _upload(auth_headers, b"x" * 60, name="a.bin")
+
+    response = client.put(
+        f"/f/uploads/{session['id']}/0", content=b"y" * 60, headers=auth_headers
+    )
+
+    assert response.status_code == 413
+
+
+def test_new_version_over_quota_is_rejected_before_storing(
+    db_session, media_root, test_user, auth_headers, monkeypatch
+):
+    monkeypatch.setattr(settings, "STORAGE_QUOTA_BYTES", 100)
+    file = _upload(auth_headers, b"x" * 60, name="a.bin")
+
+    response = client.put(
+        f"/f/{file['id']}", content=b"y" * 80, headers=auth_headers
+    )
+    assert response.status_code == 200
+
+    limits = []
+
+    async def store_stream(chunks, max_size=None):
+        limits.append(max_size)
+        return await storage.store_stream(chunks, max_size=max_size)
+
+    monkeypatch.setattr(file_endpoints, "store_stream", store_stream)
+    response = client.put(
+        f"/f/{file['id']}", content=b"z" * 120, headers=auth_headers
+    )
+    assert response.status_code == 413
+    assert limits == []
+
+    def body():
+        for _ in range(6):
+            yield b"z" * 20
+
+    response = client.put(f"/f/{file['id']}", content=body(), headers=auth_headers)
+
+    assert response.status_code == 413
+    assert response.json()["detail"] == "QUOTA_EXCEEDED"
+    assert limits == [100]
+    assert list((media_root / "tmp").iterdir()) == []
+    assert get_usage(db_session, test_user.id).used_bytes == 80
+
+
+def test_add_usage_accumulates_without_a_loaded_row(db_session, test_user):
+    add_usage(db_session, test_user.id, 10)
+    db_session.expunge_all()
+
+    usage = add_usage(db_session, test_user.id, 5)
+
+    assert (usage.used_bytes, usage.file_count) == (15, 2)
+    assert add_usage(db_session, test_user.id, -15, files=-2).used_bytes == 0
+
+
+def test_reconcile_repairs_drifted_counters(
+    db_session, media_root, test_user, auth_headers
+):
+    _upload(auth_headers, b"z" * 70)
+    usage = db_session.get(UserUsage, test_user.id)
+    usage.used_bytes = 1
+    usage.file_count = 9
+    db_session.commit()
+
+    assert reconcile_usage(db_session) >= 1
+
+    usage = get_usage(db_session, test_user.id)
+    assert (usage.used_bytes, usage.file_count) == (70, 1)
@@ -0,0 +1,125 @@
+import hashlib
+import io
+import random
+from datetime import timedelta
+from uuid import UUID
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.models.blob import Blob
+from app.models.file_version import FileVersion
+from app.services import chunks
+from app.services.file import delete_file
+from app.services.version import prune_versions
+
+client = TestClient(app)
+
+
+def _content(size=1024 * 1024, seed=0):
+    return random.Random(seed).randbytes(size)
+
+
+def _chunk_hashes(data):
+    return [hashlib.sha256(c).hexdigest() for c in chunks.iter_chunks(io.BytesIO(data))]
+
+
+def test_chunk_boundaries_follow_content():
+    data = _content()
+    pieces = list(chunks.iter_chunks(io.BytesIO(data)))
+
+    assert b"".join(pieces) == data
+    assert all(len(p) <= chunks.MAX_CHUNK_SIZE for p in pieces)
+    assert all(len(p) >= chunks.MIN_CHUNK_SIZE for p in pieces[:-1])
+
+    # Inserting bytes near the start only changes the chunks around the edit.
+    edited = data[:1000] + b"inserted" + data[1000:]
+    before, after = _chunk_hashes(data), _chunk_hashes(edited)
+    assert len(set(after) - set(before)) <= 2
+
+
+def _upload(auth_headers, content, name="data.bin"):
+    response = client.post(
+        "/f/upload", params={"name": name}, content=content, headers=auth_headers
+    )
+    assert response.status_code == 201
+    return response.json()
+
+
+def test_new_version_keeps_old_content_as_chunks(db_session, media_root, auth_headers):
+    original = _content()
+    edited = original[:500_000] + b"a small edit" + original[500_000:]
+    file = _upload(auth_headers, original)
+
+    response = client.put(f"/f/{file['id']}", content=edited, headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json()["size"] == len(edited)
+
+    response = client.get(f"/f/{file['id']}/versions", headers=auth_headers)
+    assert [v["number"] for v in response.json()] == [2, 1]
+
+    response = client.get(f"/f/{file['id']}/versions/1", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.content == original
+    response = client.get(f"/f/{file['id']}/versions/2", headers=auth_headers)
+    assert response.content == edited
+    assert client.get(f"/f/{file['id']}", headers=auth_headers).content == edited
+
+    # Only the full blob of the current version and the chunks of the old one
+    # are stored; the old full blob is gone.
+    chunk_count = len(_chunk_hashes(original))
+    assert db_session.query(Blob).count() == chunk_count + 1
+
+    # A third version only adds the chunks around the new edit.
+    again = edited[:100_000] + b"another edit" + edited[100_000:]
+    client.put(f"/f/{file['id']}", content=again, headers=auth_headers)
+    new_chunks = db_session.query(Blob).count() - (chunk_count + 1)
+    assert new_chunks <= 4
+
+
+def test_prune_and_delete_release_chunks(
+    db_session, media_root, test_user, auth_headers
+):
+    file_id = UUID(_upload(auth_headers, _content(seed=1))["id"])
+    for seed in (2, 3):
+        client.put(f"/f/{file_id}", content=_content(seed=seed), headers=auth_headers)
+    assert db_session.query(FileVersion).count() == 3
+
+    pruned = prune_versions(db_session, file_id, keep=2, max_age=timedelta(0))
+    db_session.commit()
+    assert pruned == 1
+    assert [v.number for v in db_session.query(FileVersion)] == [2, 3]
+
+    ok, error = delete_file(db_session, test_user.id, file_id)
+
+    assert ok and error is None
+    assert db_session.query(Blob).count() == 0
+    assert [p for p in (media_root / "blobs").rglob("*") if p.is_file()] == []
+
+
+def test_versions_of_content_with_repeated_chunks(
+    db_session, media_root, auth_headers
+):
+    original = _content(size=512 * 1024, seed=4) * 4
+    hashes = _chunk_hashes(original)
+    assert len(set(hashes)) < len(hashes)
+    file = _upload(auth_headers, original)
+
+    response = client.put(f"/f/{file['id']}", content=b"new", headers=auth_headers)
+
+    assert response.status_code == 200
+    response = client.get(f"/f/{file['id']}/versions/1", headers=auth_headers)
+    assert response.content == original
+    for digest in set(hashes):
+        assert db_session.get(Blob, digest).ref_count == hashes.count(digest)
+
+
+def test_prune_keeps_newest_versions_past_max_age(
+    db_session, media_root, auth_headers
+):
+    file_id = UUID(_upload(auth_headers, _content(seed=1))["id"])
+    for seed in (2, 3):
+        client.put(f"/f/{file_id}", content=_content(seed=seed), headers=auth_headers)
+
+    assert prune_versions(db_session, file_id, max_age=timedelta(0)) == 0
+    assert prune_versions(db_session, file_id, keep=2, max_age=timedelta(0)) == 1